@@ -0,0 +1,568 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains non-blocking versions of the Content, Captcha and
+# Feedback API calls, running on an asyncio event loop
+# ---------------------------------------------------------------------
+
+"""Non-blocking Mollom API calls.
+
+The calls return futures that resolve to the same values the blocking API
+returns, so many checks can be in flight on a single event loop without a
+thread per request. Requests are signed and encoded exactly like the blocking
+calls, and go through the same retry policy, circuit breakers, rate limiter,
+compression, deadline and metrics, see API.Internals.service. Calls are not
+hedged. The connections are kept open between requests, see AsyncConnectionPool.
+
+Cancelling the future of a call, e.g. through asyncio.wait_for, aborts the
+request in flight and closes its connection.
+
+This requires asyncio, or the trollius backport on Python 2.
+"""
+
+import json
+import time
+import weakref
+
+try:
+    import asyncio
+except ImportError:
+    import trollius as asyncio
+
+from Content import CONTENT_ENCODER, ContentResponse
+from Metrics import CallRecord
+from PyMollom import DeadlineExceededError
+from Internals import sign_request
+from Internals import compression, default_deadline, metrics, rate_limiter, retry_policy
+
+_ensure_future = getattr(asyncio, 'ensure_future', None) or getattr(asyncio, 'async')
+
+
+class _HTTPProtocol(asyncio.Protocol):
+    """An HTTP/1.1 connection carrying one request at a time.
+
+    The future passed to send is resolved with a tuple (status, headers, body) once
+    the complete response has been read, or with the error when the exchange fails.
+    The connection then goes back to its pool, unless the server closes it.
+    """
+
+    def __init__(self, pool, key):
+        self.pool = pool
+        self.key = key
+        self.transport = None
+        self.future = None
+        self.closed = False
+        self.used = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, request, future):
+        self.future = future
+        self.buffer = []
+        self.received = 0
+        self.status = None
+        self.headers = {}
+        self.length = None
+        self.chunked = False
+        self.used += 1
+        self.transport.write(request)
+
+    def data_received(self, data):
+        if self.future is None:
+            return
+        self.buffer.append(data)
+        self.received += len(data)
+        if self.status is None:
+            raw = ''.join(self.buffer)
+            if '\r\n\r\n' not in raw:
+                return
+            (header, rest) = raw.split('\r\n\r\n', 1)
+            self.buffer = [rest]
+            self.received = len(rest)
+            lines = header.split('\r\n')
+            self.status = int(lines[0].split(' ', 2)[1])
+            for line in lines[1:]:
+                (name, _, value) = line.partition(':')
+                self.headers[name.strip().lower()] = value.strip()
+            if 'content-length' in self.headers:
+                self.length = int(self.headers['content-length'])
+            elif 'chunked' in self.headers.get('transfer-encoding', '').lower():
+                self.chunked = True
+            elif self.status in (204, 304):
+                self.length = 0
+        if self.chunked:
+            body = _dechunk(''.join(self.buffer))
+            if body is not None:
+                self.__finish(body)
+        elif self.length is not None and self.received >= self.length:
+            self.__finish(''.join(self.buffer)[:self.length])
+
+    def __finish(self, body):
+        (future, self.future) = (self.future, None)
+        if self.headers.get('connection', '').lower() == 'close':
+            self.close()
+        else:
+            self.pool.release(self)
+        if not future.done():
+            future.set_result((self.status, self.headers, body))
+
+    def connection_lost(self, exc):
+        self.closed = True
+        self.pool.discard(self)
+        (future, self.future) = (self.future, None)
+        if future is None or future.done():
+            return
+        if self.status is not None and self.length is None and not self.chunked:
+            # the body runs until the connection is closed
+            future.set_result((self.status, self.headers, ''.join(self.buffer)))
+        else:
+            future.set_exception(exc or IOError("Connection closed before the response was complete"))
+
+    def close(self):
+        self.closed = True
+        self.pool.discard(self)
+        self.transport.close()
+
+
+def _dechunk(body):
+    """Decode a body sent with chunked transfer encoding.
+
+    @returns the decoded body, or None when the final chunk has not been received yet
+    """
+    chunks = []
+    while True:
+        (size, separator, rest) = body.partition('\r\n')
+        if not separator:
+            return None
+        size = int(size.split(';')[0], 16)
+        if size == 0:
+            return ''.join(chunks) if rest.endswith('\r\n') else None
+        if len(rest) < size + 2:
+            return None
+        chunks.append(rest[:size])
+        body = rest[size + 2:]
+
+
+class AsyncConnectionPool(object):
+    """Keeps the idle keep-alive connections of an event loop, per (scheme, host, port).
+
+    @type loop: the event loop the connections belong to
+    @type max_idle: int -- the number of idle connections kept per server; more are closed
+    """
+
+    def __init__(self, loop, max_idle=10):
+        self.loop = loop
+        self.max_idle = max_idle
+        self.idle = {}
+
+    def acquire(self, scheme, host, port, fresh=False):
+        """Take an idle connection to the server, or open a new one.
+
+        @type fresh: bool -- always open a new connection
+
+        @returns a future resolving to the connection, see _HTTPProtocol
+        """
+        key = (scheme, host, port)
+        future = asyncio.Future(loop=self.loop)
+        idle = self.idle.get(key)
+        while idle and not fresh:
+            protocol = idle.pop()
+            if not protocol.closed:
+                future.set_result(protocol)
+                return future
+        ssl = scheme == 'https'
+        connecting = _ensure_future(self.loop.create_connection( lambda: _HTTPProtocol(self, key)
+                                                               , host
+                                                               , port or (ssl and 443 or 80)
+                                                               , ssl=ssl)
+                                   , loop=self.loop)
+
+        def connected(f):
+            if future.cancelled():
+                if not f.cancelled() and f.exception() is None:
+                    f.result()[0].close()
+            elif f.cancelled():
+                future.cancel()
+            elif f.exception() is not None:
+                future.set_exception(f.exception())
+            else:
+                future.set_result(f.result()[1])
+        connecting.add_done_callback(connected)
+        future.add_done_callback(lambda f: f.cancelled() and connecting.cancel())
+        return future
+
+    def release(self, protocol):
+        """Take back a connection that completed its request."""
+        idle = self.idle.setdefault(protocol.key, [])
+        if protocol.closed or protocol in idle:
+            return
+        if len(idle) < self.max_idle:
+            idle.append(protocol)
+        else:
+            protocol.close()
+
+    def discard(self, protocol):
+        """Forget a connection that was closed."""
+        idle = self.idle.get(protocol.key)
+        if idle and protocol in idle:
+            idle.remove(protocol)
+
+    def close(self):
+        """Close the idle connections."""
+        for idle in self.idle.values():
+            for protocol in list(idle):
+                protocol.close()
+        self.idle.clear()
+
+
+# the connection pool of every event loop, see connection_pool
+_pools = weakref.WeakKeyDictionary()
+
+
+def connection_pool(loop):
+    """Returns the connection pool shared by the clients on the event loop, creating it on first use."""
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = AsyncConnectionPool(loop)
+    return pool
+
+
+class _ServiceCall(object):
+    """The state of a non-blocking API call across its attempts, see AsyncClient._service.
+
+    Each attempt goes through the circuit breaker, the rate limiter, signing,
+    sending and reading; the breaker is settled on every way out of an attempt,
+    and the call is recorded in the metrics once its future is done.
+    """
+
+    def __init__(self, client, method, path, data, parse, policy, deadline):
+        self.client = client
+        self.loop = client.loop
+        self.method = method
+        self.path = path
+        self.data = data
+        self.parse = parse
+        self.policy = policy or retry_policy()
+        self.breaker = self.policy.breaker(path.split('/', 1)[0])
+        self.registry = metrics()
+        self.limiter = rate_limiter()
+        self.settings = compression()
+        self.record = self.registry is not None and CallRecord(method, path) or None
+        self.result = asyncio.Future(loop=self.loop)
+        self.attempt = 0
+        self.settled = True       # the breaker learnt the outcome of the current attempt
+        self.pending = None       # the future of the connection or response being waited for
+        self.protocol = None      # the connection carrying the request in flight
+        self.timer = None
+        self.deadline_timer = None
+        if deadline is None:
+            deadline = default_deadline()
+        self.expires = deadline is not None and time.time() + deadline or None
+        if deadline is not None:
+            self.deadline_timer = self.loop.call_later(deadline, self.__expire)
+        self.result.add_done_callback(self.__done)
+        self.__start()
+
+    def __start(self):
+        self.timer = None
+        if self.result.done():
+            return
+        if not self.breaker.allow():
+            self.__finish(None, 'CircuitOpen')
+            return
+        self.settled = False
+        self.throttled = time.time()
+        self.__throttle()
+
+    def __throttle(self):
+        """Take a token from the rate limiter, polling for one when it has to wait."""
+        self.timer = None
+        if self.result.done():
+            return
+        limiter = self.limiter
+        if limiter is not None and not limiter.try_acquire(self.client.public_key):
+            waited = time.time() - self.throttled
+            if not limiter.block or (limiter.timeout is not None and waited >= limiter.timeout):
+                self.__finish(None, 'RateLimited')
+            else:
+                self.timer = self.loop.call_later(1.0 / limiter.rate, self.__throttle)
+            return
+        if self.record is not None:
+            self.record.throttle_time += time.time() - self.throttled
+        self.__send()
+
+    def __send(self):
+        start = time.time()
+        (self.scheme, self.host, self.port, request_path, body, headers) = sign_request( self.client.public_key
+                                                                                      , self.client.private_key
+                                                                                      , self.method, self.path, self.data)
+        headers['Host'] = self.port is not None and '%s:%d' % (self.host, self.port) or self.host
+        self.plain = body
+        if self.settings is not None:
+            body = self.settings.encode((self.host, self.port), body, headers)
+        (self.request_path, self.body, self.headers) = (request_path, body, headers)
+        if self.record is not None:
+            self.record.sign_time += time.time() - start
+        self.__transmit()
+
+    def __transmit(self, fresh=False):
+        self.headers['Content-Length'] = str(len(self.body or ''))
+        self.request = "%s %s HTTP/1.1\r\n%s\r\n\r\n%s" % ( self.method
+                                                        , self.request_path
+                                                        , '\r\n'.join("%s: %s" % h for h in self.headers.iteritems())
+                                                        , self.body or '')
+        self.sent = time.time()
+        self.pending = self.client.pool.acquire(self.scheme, self.host, self.port, fresh)
+        self.pending.add_done_callback(self.__connected)
+
+    def __connected(self, f):
+        if f.cancelled():
+            return
+        if self.result.done():
+            if f.exception() is None:
+                # the connection was ready before it could be cancelled, it is still good
+                self.client.pool.release(f.result())
+            return
+        if f.exception() is not None:
+            self.__network_time()
+            self.__failed(f.exception())
+            return
+        self.protocol = f.result()
+        reused = self.protocol.used > 0
+        self.pending = asyncio.Future(loop=self.loop)
+        self.pending.add_done_callback(lambda f: self.__answered(f, reused))
+        self.protocol.send(self.request, self.pending)
+
+    def __network_time(self):
+        if self.record is not None:
+            self.record.network_time += time.time() - self.sent
+
+    def __answered(self, f, reused):
+        if f.cancelled() or self.result.done():
+            return
+        self.protocol = None
+        self.__network_time()
+        if f.exception() is not None:
+            if reused and isinstance(f.exception(), EnvironmentError):
+                # the server closed the idle connection, send the request on a new one
+                self.__transmit(fresh=True)
+            else:
+                self.__failed(f.exception())
+            return
+        (status, headers, content) = f.result()
+        if self.record is not None:
+            self.record.bytes_sent += len(self.body or '')
+            self.record.bytes_received += len(content)
+        if self.settings is not None and status == 415 and self.body is not self.plain:
+            # the server does not take compressed bodies, send this one and the next ones as they are
+            self.settings.refused((self.host, self.port))
+            self.body = self.plain
+            del self.headers['Content-Encoding']
+            self.__transmit()
+            return
+        if self.settings is not None:
+            try:
+                content = self.settings.decode(content, headers.get('content-encoding'))
+            except IOError as err:
+                self.__failed(err)
+                return
+        self.__answer(status, content)
+
+    def __failed(self, err):
+        if self.record is not None:
+            (self.record.status, self.record.error) = (None, err.__class__.__name__)
+        # trollius raises OSError subclasses for the network errors the blocking calls see as IOError
+        network = isinstance(err, EnvironmentError) and self.policy.retryable_error(IOError())
+        if not (network or self.policy.retryable_error(err)):
+            self.result.set_exception(err)
+            return
+        self.breaker.record_failure()
+        self.settled = True
+        self.__retry()
+
+    def __answer(self, status, content):
+        if self.record is not None:
+            (self.record.status, self.record.error) = (status, None)
+        if self.policy.retryable_status(status):
+            self.breaker.record_failure()
+            self.settled = True
+            self.__retry()
+            return
+        self.breaker.record_success()
+        self.settled = True
+        if status != 200:
+            self.__finish(None)
+            return
+        start = time.time()
+        try:
+            value = self.parse(json.loads(content))
+        except Exception as err:
+            self.result.set_exception(err)
+            return
+        finally:
+            if self.record is not None:
+                self.record.decode_time = time.time() - start
+        self.__finish(value)
+
+    def __retry(self):
+        if self.attempt >= self.policy.max_retries:
+            self.__finish(None)
+            return
+        pause = self.policy.delay(self.attempt)
+        if self.expires is not None and time.time() + pause >= self.expires:
+            # the back off would use up the rest of the deadline
+            self.__expire()
+            return
+        self.attempt += 1
+        if self.record is not None:
+            self.record.retries = self.attempt
+        self.timer = self.loop.call_later(pause, self.__start)
+
+    def __expire(self):
+        self.deadline_timer = None
+        if self.result.done():
+            return
+        if not self.settled and (self.protocol is not None or self.pending is not None and not self.pending.done()):
+            # the server did not answer in time, which counts against it
+            self.breaker.record_failure()
+            self.settled = True
+        if self.record is not None:
+            self.record.error = 'DeadlineExceeded'
+        self.result.set_exception(DeadlineExceededError(DeadlineExceededError.REQUEST_TIMEOUT,
+                                                        "The deadline for %s passed before Mollom answered" % (self.path)))
+
+    def __finish(self, value, error=None):
+        if self.result.done():
+            return
+        if error is not None and self.record is not None:
+            self.record.error = error
+        self.result.set_result(value)
+
+    def __done(self, result):
+        """Clean up once the call is complete, failed, timed out or was cancelled."""
+        for timer in (self.timer, self.deadline_timer):
+            if timer is not None:
+                timer.cancel()
+        if self.pending is not None and not self.pending.done():
+            self.pending.cancel()
+        if self.protocol is not None:
+            # the response is not read to the end, so the connection cannot be reused
+            self.protocol.close()
+            self.protocol = None
+        if result.cancelled() and self.record is not None:
+            self.record.error = 'Cancelled'
+        if not self.settled:
+            self.breaker.release()
+        if self.record is not None:
+            self.registry.record(self.record)
+
+
+class AsyncClient(object):
+    """Base class for the non-blocking API classes, sending signed requests on an event loop.
+
+    @type loop: the event loop, defaults to asyncio.get_event_loop()
+    @type pool: AsyncConnectionPool -- defaults to the one shared on the loop, see connection_pool
+    """
+
+    def __init__(self, public_key, private_key, loop=None, pool=None):
+        self.public_key = public_key
+        self.private_key = private_key
+        self.loop = loop or asyncio.get_event_loop()
+        self.pool = pool or connection_pool(self.loop)
+
+    def _service(self, method, path, data, parse, policy=None, deadline=None):
+        """Like API.Internals.service: the future resolves to the parsed answer on a
+        200 response and to None otherwise, and fails with DeadlineExceededError when
+        the deadline passes.
+
+        @type parse: function taking the decoded JSON answer
+        @type policy: API.Retry.RetryPolicy, defaults to API.Internals.retry_policy()
+        @type deadline: float -- the number of seconds the call may take, defaults to
+                        API.Internals.default_deadline()
+        """
+        return _ServiceCall(self, method, path, data, parse, policy, deadline).result
+
+
+class AsyncContent(AsyncClient):
+    """Non-blocking counterpart of API.Content.Content.
+
+    The keyword arguments of the calls are those of Content.checkContent.
+    """
+
+    def check_content(self, deadline=None, **arguments):
+        """Submit content to the Mollom service to have it checked for spaminess.
+
+        @returns a future resolving to a ContentResponse, or None
+        """
+        return self._service('POST', 'content', CONTENT_ENCODER.encode(arguments),
+                             lambda js: ContentResponse.fromJSON(js['content']), deadline=deadline)
+
+    def update_content(self, content_id, deadline=None, **arguments):
+        """Submit updated content for a content ID obtained through check_content.
+
+        @returns a future resolving to a ContentResponse, or None
+        """
+        data = CONTENT_ENCODER.encode(arguments)
+        return self._service('POST', 'content/%s' % (content_id), data,
+                             lambda js: ContentResponse.fromJSON(js['content']), deadline=deadline)
+
+
+class AsyncCaptcha(AsyncClient):
+    """Non-blocking counterpart of API.Captcha.Captcha."""
+
+    def create_captcha(self, type, content_id=None, ssl=None, deadline=None):
+        """Request a new CAPTCHA.
+
+        @type type: one of API.Captcha.Type
+        @type content_id: string -- the content the CAPTCHA is requested for, if any
+
+        @returns a future resolving to a dict with the id and url of the CAPTCHA, or None
+        """
+        data = {'type': type}
+        if content_id is not None: data['contentId'] = content_id
+        if ssl is not None: data['ssl'] = ssl
+        return self._service('POST', 'captcha', data, lambda js: js['captcha'], deadline=deadline)
+
+    def verify_captcha(self, captcha_id, solution, author_ip=None, deadline=None):
+        """Verify the solution given to a CAPTCHA.
+
+        @returns a future resolving to a dict with the captcha fields (solved, reason, ...), or None
+        """
+        data = {'solution': solution}
+        if author_ip is not None: data['authorIp'] = author_ip
+        return self._service('POST', 'captcha/%s' % (captcha_id), data, lambda js: js['captcha'], deadline=deadline)
+
+
+class AsyncFeedback(AsyncClient):
+    """Non-blocking counterpart of API.Feedback.Feedback."""
+
+    def send(self, reason, content_id=None, captcha_id=None, type=None, deadline=None):
+        """Send feedback about content or a CAPTCHA.
+
+        @type reason: string -- spam, profanity, quality, unwanted, approve or delete
+
+        @returns a future resolving to True when Mollom accepted the feedback
+        """
+        data = {'reason': reason}
+        if content_id is not None: data['contentId'] = content_id
+        if captcha_id is not None: data['captchaId'] = captcha_id
+        if type is not None: data['type'] = type
+        return self._service('POST', 'feedback', data, lambda js: True, deadline=deadline)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains a sliding-window count-min sketch, used to track
+# how fast each author posts without a counter per author
+# ---------------------------------------------------------------------
+
+import hashlib
+import struct
+import threading
+import time
+from array import array
+
+
+class SlidingCountMin(object):
+    """Counts events per key over a sliding time window, in a fixed amount of memory.
+
+    The window is split into slices, each holding a count-min sketch of depth rows
+    of width counters, kept together in one array. The count of a key is the smallest,
+    over the rows, of its counters summed over the slices, so it is never too low, and
+    too high by at most e * N / width with probability 1 - e ** -depth, N being the
+    number of events in the window. Counters are raised conservatively, which keeps
+    the overestimate well below that bound in practice.
+
+    When time moves past a slice, its counters are cleared, so the count covers
+    between window - window / slices and window seconds.
+
+    The defaults take 6 * 4 * 65536 * 4 bytes, or 6MB, however many keys are counted.
+    """
+
+    def __init__(self, window=60.0, slices=6, width=65536, depth=4):
+        """
+        @type window: float -- the number of seconds events are counted for
+        @type slices: int -- the number of parts the window is split into
+        @type width: int -- the number of counters per row; the error shrinks as it grows
+        @type depth: int -- the number of rows, at most 8; the error gets less likely as it grows
+        """
+        if not 1 <= depth <= 8:
+            raise ValueError("depth must be between 1 and 8, got %d" % (depth))
+        self.window = float(window)
+        self.slices = slices
+        self.width = width
+        self.depth = depth
+        self.slice_length = self.window / slices
+        self.slice_size = width * depth
+        self.counters = array('I', [0]) * (slices * self.slice_size)
+        self.empty = array('I', [0]) * self.slice_size
+        self.current = None    # the number of the slice counted in, since the epoch
+        self.lock = threading.Lock()
+
+    def __columns(self, key):
+        """The counter of the key in each row, derived from a single digest by double hashing."""
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        (h1, h2) = struct.unpack('<QQ', hashlib.md5(key).digest())
+        h2 |= 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in xrange(self.depth)]
+
+    def __advance(self, now):
+        """Clear the slices time has moved past, and return the offset of the current slice."""
+        number = int(now // self.slice_length)
+        if self.current is None or number - self.current >= self.slices:
+            self.counters = array('I', [0]) * (self.slices * self.slice_size)
+        elif number > self.current:
+            for skipped in xrange(self.current + 1, number + 1):
+                offset = (skipped % self.slices) * self.slice_size
+                self.counters[offset:offset + self.slice_size] = self.empty
+        if self.current is None or number > self.current:
+            self.current = number
+        return (self.current % self.slices) * self.slice_size
+
+    def __estimate(self, columns):
+        counters = self.counters
+        return int(min(sum(counters[s * self.slice_size + c] for s in xrange(self.slices)) for c in columns))
+
+    def add(self, key, count=1, now=None):
+        """Count count events for the key.
+
+        @returns the number of events for the key in the window, including these
+        """
+        columns = self.__columns(key)
+        with self.lock:
+            offset = self.__advance(time.time() if now is None else now)
+            counters = self.counters
+            raised = min(counters[offset + c] for c in columns) + count
+            for c in columns:
+                if counters[offset + c] < raised:
+                    counters[offset + c] = raised
+            return self.__estimate(columns)
+
+    def count(self, key, now=None):
+        """The number of events for the key in the window."""
+        columns = self.__columns(key)
+        with self.lock:
+            self.__advance(time.time() if now is None else now)
+            return self.__estimate(columns)
+
+    def rate(self, key, now=None):
+        """The number of events for the key per second, averaged over the window."""
+        return self.count(key, now) / self.window
+
+    def memory(self):
+        """The number of bytes taken by the counters."""
+        return len(self.counters) * self.counters.itemsize
+
+
+class AuthorRate(object):
+    """An API.PreFilter.PreFilter stage classifying the content of authors posting too fast.
+
+    Every submission is counted under each of the author fields it has, by default the
+    IP address and the author ID, and once an author has made more than max_posts
+    submissions in the window, their content gets the classification: spam to reject
+    the flood, or unsure to flag it, e.g. to show a CAPTCHA. Rejected submissions are
+    counted too, so an author stays flagged until they slow down.
+
+    Stages before this one that classify the content keep it from being counted, so
+    put it first in the chain to count every submission.
+    """
+
+    def __init__(self, max_posts=20, window=60.0, fields=('authorIp', 'authorId'), classification='spam',
+                 sketch=None):
+        """
+        @type max_posts: int -- the number of submissions an author may make in the window
+        @type window: float -- in seconds
+        @type fields: tuple of field names, as sent to Mollom -- the fields identifying an author
+        @type classification: string -- spam or unsure
+        @type sketch: SlidingCountMin -- the counters, defaults to a SlidingCountMin over the window
+        """
+        self.max_posts = max_posts
+        self.fields = fields
+        self.classification = classification
+        self.sketch = sketch if sketch is not None else SlidingCountMin(window)
+
+    def __call__(self, data):
+        flooding = None
+        for field in self.fields:
+            value = data.get(field)
+            if value:
+                if self.sketch.add('%s:%s' % (field, value)) > self.max_posts and flooding is None:
+                    flooding = field
+        if flooding is not None:
+            return (self.classification, 'rate %s' % (flooding))
+        return None
@@ -20,6 +20,15 @@ __author__ = "Andy Georges"
 __date__ = "$Feb 8, 2012$"
 # This module contains the class file for the Mollom Blacklist API
 # ---------------------------------------------------------------------
+
+import threading
+import time
+
+from Encoder import text
+from Internals import service, cat_maybe_values
+from Internals import paginate, parallel_map
+
+
 class Reason(object):
     SPAM = "spam"
     PROFANITY = "profanity"
@@ -42,28 +51,236 @@ class Match(object):
     CONTAINS = "contains"
 
 
-class Blacklist(object):
+def entry_key(entry):
+    """Returns the key identifying a blacklist entry: Mollom matches the value case
+    insensitively, within the context and in the way given by match. Byte strings are
+    taken to be UTF-8, so they match the unicode values Mollom returns.
+    """
+    return ( text(entry['value']).lower()
+           , entry.get('context') or Context.ALL_FIELDS
+           , entry.get('match') or Match.CONTAINS
+           )
+
+
+class SyncReport(object):
+    """The operations needed to bring the blacklist in line with the desired entries.
+
+    creates   -- list of the desired entries that are not on the blacklist
+    updates   -- list of (remote entry, dict of the changed fields)
+    deletes   -- list of the remote entries that are not desired, or are duplicates
+    unchanged -- the number of desired entries that are on the blacklist as they are
+    failed    -- list of (operation, entry, exception or None) for the operations that
+                 failed; empty for a dry run
+    """
+
     def __init__(self):
-        pass
+        self.creates = []
+        self.updates = []
+        self.deletes = []
+        self.unchanged = 0
+        self.failed = []
+
+    def operations(self):
+        """Returns the list of operations, as tuples ('create', entry), ('update', (entry, changes))
+        and ('delete', entry).
+        """
+        return ( [('create', entry) for entry in self.creates]
+               + [('update', update) for update in self.updates]
+               + [('delete', entry) for entry in self.deletes])
+
+    def __repr__(self):
+        return "SyncReport(creates=%d, updates=%d, deletes=%d, unchanged=%d, failed=%d)" % (
+            len(self.creates), len(self.updates), len(self.deletes), self.unchanged, len(self.failed))
+
+
+class Blacklist(object):
+    """Implementation of the API calls for the blacklist of a site.
+
+    Every call takes an optional deadline, the number of seconds it may take (per page
+    for the iterators), see API.Internals.service. It defaults to
+    API.Internals.default_deadline().
+    """
+
+    # the fields of an entry that update_entry can change without changing its key
+    SYNC_FIELDS = ('reason', 'status', 'note')
+
+    def __init__(self, public_key, private_key):
+        self.public_key = public_key
+        self.private_key = private_key
+
+
+    def __entry(self, answer):
+        # for now, we check for a None, this should be fixed when we throw exceptions
+        if answer == None:
+            return None
+        return answer['entry']
+
+
+    def create_entry(self, value, reason=Reason.SPAM, context=Context.ALL_FIELDS, match=Match.CONTAINS, status=None, note=None, deadline=None):
+        """Add an entry to the blacklist.
+
+        @type value: string -- the blacklisted value
+        @type reason: string -- one of Reason
+        @type context: string -- one of Context
+        @type match: string -- one of Match
+        @type status: int -- 1 for an active entry, 0 for an inactive one
+        @type note: string
+
+        @returns dict with the entry fields (id, value, reason, context, match, ...)
+        """
+        data = cat_maybe_values({ 'value': value
+                                , 'reason': reason
+                                , 'context': context
+                                , 'match': match
+                                , 'status': status
+                                , 'note': note})
+        path = 'blacklist/%s' % (self.public_key)
+        return self.__entry(service(self.public_key, self.private_key, 'POST', path, data, decode=True, deadline=deadline))
+
+
+    def update_entry(self, entry_id, value=None, reason=None, context=None, match=None, status=None, note=None, deadline=None):
+        """Update the fields of a blacklist entry. Fields that are not given are left unchanged.
+
+        @returns dict with the entry fields
+        """
+        data = cat_maybe_values({ 'value': value
+                                , 'reason': reason
+                                , 'context': context
+                                , 'match': match
+                                , 'status': status
+                                , 'note': note})
+        path = 'blacklist/%s/%s' % (self.public_key, entry_id)
+        return self.__entry(service(self.public_key, self.private_key, 'POST', path, data, decode=True, deadline=deadline))
+
+
+    def delete_entry(self, entry_id, deadline=None):
+        """Remove an entry from the blacklist.
+
+        @returns True if the entry was removed
+        """
+        path = 'blacklist/%s/%s/delete' % (self.public_key, entry_id)
+        return service(self.public_key, self.private_key, 'POST', path, deadline=deadline) != None
+
+
+    def list_entries(self, offset=None, count=None, deadline=None):
+        """List the entries on the blacklist.
+
+        @type offset: int -- the index of the first entry to return
+        @type count: int -- the maximal number of entries to return
+
+        @returns list of dicts with the entry fields
+        """
+        answer = self.__list(offset, count, deadline)
+        if answer == None:
+            return None
+        return answer['list']
+
+
+    def iter_entries(self, page_size=100, prefetch=True, deadline=None):
+        """Iterate over all entries on the blacklist, fetching them page by page,
+        see API.Internals.paginate.
+
+        @type page_size: int -- the number of entries fetched per call
+        @type prefetch: bool -- fetch the next page while the current one is consumed
+
+        @returns generator of dicts with the entry fields
+        """
+        return paginate(lambda offset, count: self.__list(offset, count, deadline), page_size, prefetch)
+
+
+    def __list(self, offset, count, deadline=None):
+        data = cat_maybe_values({'offset': offset, 'count': count})
+        path = 'blacklist/%s' % (self.public_key)
+        return service(self.public_key, self.private_key, 'GET', path, data, decode=True, hedge=True,
+                       deadline=deadline)
+
 
+    def read_entry(self, entry_id, deadline=None):
+        """Get a single blacklist entry.
 
-    def create_entry(self):
-        pass
+        @returns dict with the entry fields
+        """
+        path = 'blacklist/%s/%s' % (self.public_key, entry_id)
+        return self.__entry(service(self.public_key, self.private_key, 'GET', path, decode=True, hedge=True,
+                                    deadline=deadline))
 
 
-    def update_entry(self):
-        pass
+    def sync(self, desired_entries, concurrency=8, dry_run=False, page_size=1000, rate=None):
+        """Make the blacklist hold exactly the desired entries, with as few calls as possible.
 
+        The current entries are fetched once. Entries are matched on their value (case
+        insensitively), context and match, see entry_key: desired entries that are missing
+        are created, matched entries whose reason, status or note differ are updated, and
+        the remaining entries are deleted. The operations run on concurrency threads and
+        go through the service layer, so they are held to the rate limiter, see
+        API.Internals.set_rate_limiter. With a rate, they are also spread out so the sync
+        does not take more of the request rate of the key pair than that.
 
-    def delete_entry(self):
-        pass
+        Keyword arguments:
+        desired_entries            -- An iterable of dicts with the keyword arguments of create_entry.
+                                      Fields that are left out are not compared.
+        concurrency     (optional) -- The number of operations in flight at the same time. Defaults to 8.
+        dry_run         (optional) -- Only compute the operations. Defaults to False.
+        page_size       (optional) -- The number of entries fetched per list call. Defaults to 1000.
+        rate            (optional) -- The maximal number of operations started per second. Defaults to None,
+                                      which does not limit them beyond the rate limiter.
 
+        Returns:
+        A SyncReport with the operations, and the ones that failed.
+        """
+        remote = {}
+        report = SyncReport()
+        for entry in self.iter_entries(page_size):
+            key = entry_key(entry)
+            if key in remote:
+                report.deletes.append(entry)
+            else:
+                remote[key] = entry
 
-    def list_entries(self):
-        pass
+        desired = set()
+        for entry in desired_entries:
+            key = entry_key(entry)
+            if key in desired:
+                continue
+            desired.add(key)
+            current = remote.get(key)
+            if current is None:
+                report.creates.append(entry)
+                continue
+            changes = dict((field, entry[field]) for field in self.SYNC_FIELDS
+                           if entry.get(field) is not None and text(entry[field]) != text(current.get(field)))
+            if changes:
+                report.updates.append((current, changes))
+            else:
+                report.unchanged += 1
+        report.deletes.extend(entry for (key, entry) in remote.iteritems() if key not in desired)
 
+        if dry_run:
+            return report
 
-    def read_entry(self):
-        pass
+        pace = threading.Lock()
+        next_start = [time.time()]
 
+        def apply(operation):
+            if rate:
+                # every operation gets the next start time, 1 / rate seconds after the previous one
+                with pace:
+                    now = time.time()
+                    start = max(now, next_start[0])
+                    next_start[0] = start + 1.0 / rate
+                time.sleep(start - now)
+            (kind, argument) = operation
+            if kind == 'create':
+                fields = ('value', 'reason', 'context', 'match', 'status', 'note')
+                return self.create_entry(**dict((f, argument[f]) for f in fields if f in argument)) is not None
+            if kind == 'update':
+                (entry, changes) = argument
+                return self.update_entry(entry['id'], **changes) is not None
+            return self.delete_entry(argument['id'])
 
+        operations = report.operations()
+        for (index, done, error) in parallel_map(apply, operations, concurrency, ordered=False):
+            if not done:
+                (kind, argument) = operations[index]
+                report.failed.append((kind, argument, error))
+        return report
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains a local mirror of the site blacklist, used to
+# reject blacklisted content without a call to Mollom
+# ---------------------------------------------------------------------
+
+import re
+
+from Blacklist import Context, Match
+from Encoder import text
+from Mirror import Mirror
+
+# the content fields that are matched against each blacklist context; links are
+# taken from the post body and the author URL
+CONTEXT_FIELDS = { Context.AUTHOR_IP: ('authorIp',)
+                 , Context.AUTHOR_ID: ('authorId',)
+                 , Context.AUTHOR_NAME: ('authorName',)
+                 , Context.AUTHOR_MAIL: ('authorMail',)
+                 , Context.POST_TITLE: ('postTitle',)
+                 , Context.LINKS: ('links',)
+                 , Context.ALL_FIELDS: ( 'postTitle', 'postBody', 'authorName', 'authorUrl', 'authorMail'
+                                       , 'authorOpenid', 'authorIp', 'authorId')
+                 }
+
+LINK_RE = re.compile(r"""(?:https?://|www\.)[^\s"'<>]+""", re.IGNORECASE)
+
+
+class AhoCorasick(object):
+    """Matches a fixed set of patterns against a text in a single pass.
+
+    Patterns are added with add, after which compile builds the failure links.
+    Each pattern carries a value that is returned when the pattern is found.
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+    def add(self, pattern, value):
+        state = 0
+        for c in pattern:
+            next = self.goto[state].get(c)
+            if next is None:
+                next = len(self.goto)
+                self.goto[state][c] = next
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next
+        self.output[state].append(value)
+
+    def compile(self):
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for c, next in self.goto[state].iteritems():
+                queue.append(next)
+                fallback = self.fail[state]
+                while fallback and c not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(c, 0)
+                self.fail[next] = target if target != next else 0
+                self.output[next] = self.output[next] + self.output[self.fail[next]]
+        return self
+
+    def search(self, text):
+        """Returns the value of the first pattern found in the text, or None."""
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for c in text:
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            if output[state]:
+                return output[state][0]
+        return None
+
+
+class BlacklistIndex(object):
+    """The blacklist entries compiled per content field.
+
+    For every content field, one automaton holds the values of the 'contains'
+    entries whose context covers the field, and one dict the 'exact' entries.
+    Matching is case insensitive, like the matching done by Mollom.
+    """
+
+    def __init__(self, entries):
+        contains = {}
+        self.exact = {}
+        for entry in entries:
+            if str(entry.get('status', 1)) == '0' or not entry.get('value'):
+                continue
+            value = entry['value'].lower()
+            for field in CONTEXT_FIELDS.get(entry.get('context', Context.ALL_FIELDS), ()):
+                if entry.get('match') == Match.EXACT:
+                    self.exact.setdefault(field, {}).setdefault(value, entry)
+                else:
+                    contains.setdefault(field, AhoCorasick()).add(value, entry)
+        self.contains = dict((field, automaton.compile()) for (field, automaton) in contains.iteritems())
+        self.size = len(entries)
+
+    def match(self, data):
+        """Find a blacklist entry matching the content.
+
+        @type data: dict -- the content fields, as sent to Mollom (postTitle, authorMail, ...)
+
+        @returns the matching entry or None
+        """
+        values = dict((field, [text(value).lower()]) for (field, value) in data.iteritems()
+                      if value is not None and field in CONTEXT_FIELDS[Context.ALL_FIELDS])
+        if 'links' in self.contains or 'links' in self.exact:
+            values['links'] = [link.lower() for link in LINK_RE.findall(text(data.get('postBody') or ''))]
+            if data.get('authorUrl'):
+                values['links'].append(text(data['authorUrl']).lower())
+
+        for (field, texts) in values.iteritems():
+            exact = self.exact.get(field)
+            automaton = self.contains.get(field)
+            for value in texts:
+                if exact and value in exact:
+                    return exact[value]
+                if automaton:
+                    entry = automaton.search(value)
+                    if entry is not None:
+                        return entry
+        return None
+
+
+class BlacklistMirror(Mirror):
+    """A locally synced copy of the site blacklist.
+
+    All entries are fetched through Blacklist.iter_entries, page by page, and
+    compiled into a BlacklistIndex, see API.Mirror.Mirror for the refreshing.
+    """
+
+    def __init__(self, blacklist, refresh_interval=300, page_size=1000):
+        """
+        @type blacklist: API.Blacklist.Blacklist
+        @type refresh_interval: the number of seconds after which the mirror is refreshed
+        @type page_size: int -- the number of entries fetched per call
+        """
+        self.blacklist = blacklist
+        self.page_size = page_size
+        super(BlacklistMirror, self).__init__(self.fetch_entries, refresh_interval)
+
+    def fetch_entries(self):
+        """Returns all entries on the blacklist, or None when a page cannot be fetched."""
+        try:
+            return list(self.blacklist.iter_entries(self.page_size))
+        except IOError:
+            return None
+
+    def build_index(self, entries):
+        return BlacklistIndex(entries)
@@ -21,7 +21,7 @@ __date__ = "$Feb 8, 2012$"
 # This module contains the class file for the Mollom Captcha API
 # ---------------------------------------------------------------------
 
-
+from Internals import service, cat_maybe_values
 
 
 class Type(object):
@@ -30,14 +30,50 @@ class Type(object):
 
 
 class Captcha(object):
+    """Implementation of the API calls for CAPTCHAs.
+    """
 
-    def __init__(self):
+    def __init__(self, public_key, private_key):
+        self.public_key = public_key
+        self.private_key = private_key
         self.captchaId = None
 
-    def createCaptcha(self):
-        pass
+    def createCaptcha(self, type=Type.IMAGE, content_id=None, ssl=None, deadline=None):
+        """Request a new CAPTCHA from Mollom.
+
+        @type type: string -- one of Type
+        @type content_id: string -- the content the CAPTCHA is shown for, if any
+        @type ssl: bool -- return an https URL for the CAPTCHA
+        @type deadline: float -- the number of seconds the call may take, see API.Internals.service
+
+        @returns dict with the id and url of the CAPTCHA, or None
+        """
+        data = cat_maybe_values({ 'type': type
+                                , 'contentId': content_id
+                                , 'ssl': ssl is not None and int(ssl) or None})
+        answer = service(self.public_key, self.private_key, 'POST', 'captcha', data, decode=True, deadline=deadline)
+        # for now, we check for a None, this should be fixed when we throw exceptions
+        if answer == None:
+            return None
+        self.captchaId = answer['captcha']['id']
+        return answer['captcha']
 
-    def verifyCaptcha(self):
-        pass
+    def verifyCaptcha(self, solution, captcha_id=None, author_ip=None, deadline=None):
+        """Verify the solution the user gave for a CAPTCHA.
 
+        @type solution: string
+        @type captcha_id: string -- defaults to the CAPTCHA created last by this object
+        @type author_ip: string
+        @type deadline: float -- the number of seconds the call may take, see API.Internals.service
 
+        @returns dict with the CAPTCHA fields, where solved is 1 for a correct solution, or None
+        """
+        captcha_id = captcha_id or self.captchaId
+        data = cat_maybe_values({'solution': solution, 'authorIp': author_ip})
+        path = 'captcha/%s' % (captcha_id)
+        # a duplicate verification is refused as already processed, but a hedged call prefers the answer with status 200
+        answer = service(self.public_key, self.private_key, 'POST', path, data, decode=True, hedge=True,
+                         deadline=deadline)
+        if answer == None:
+            return None
+        return answer['captcha']
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains a pool of pre-created CAPTCHAs, so a form can
+# be rendered without waiting for Mollom
+# ---------------------------------------------------------------------
+
+import collections
+import copy
+import threading
+import time
+
+from Captcha import Type
+
+
+class CaptchaPool(object):
+    """Keeps CAPTCHAs of each type created ahead of time.
+
+    A background thread refills a type up to the high watermark as soon as it
+    drops below the low watermark. CAPTCHAs that are older than max_age are
+    discarded, so none is handed out that Mollom would answer with
+    CaptchaError.CAPTCHA_EXPIRED (410) by the time it is solved. Handing out a
+    CAPTCHA is a local pop; only when the pool of a type is empty is one created
+    on the spot, as are CAPTCHAs of a type the pool does not keep.
+
+    The CAPTCHAs are created through a copy of captcha, so the CAPTCHA it verifies
+    by default (the one its caller created last) is not changed by the pool.
+
+    Keyword arguments:
+    captcha                  -- The API.Captcha.Captcha used to create the CAPTCHAs.
+    types         (optional) -- The CAPTCHA types to keep. Defaults to image and audio.
+    low_watermark (optional) -- Refill a type when fewer CAPTCHAs are left. Defaults to 5.
+    high_watermark (optional) -- The number of CAPTCHAs kept per type. Defaults to 20.
+    max_age       (optional) -- The number of seconds after which a CAPTCHA is discarded. It should
+                                leave the user enough time to solve it before Mollom expires it.
+                                Defaults to 600.
+    """
+
+    def __init__(self, captcha, types=(Type.IMAGE, Type.AUDIO), low_watermark=5, high_watermark=20, max_age=600):
+        self.captcha = captcha
+        self.__creator = copy.copy(captcha)
+        self.types = tuple(types)
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.max_age = max_age
+
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+        self.__pools = dict((type, collections.deque()) for type in self.types)    # type -> deque of (created, captcha)
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Condition(self.__lock)
+        self.__stopped = False
+        self.__thread = threading.Thread(target=self.__run)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __purge(self, type):
+        """Drop the expired CAPTCHAs of a type. Must be called with the lock held."""
+        pool = self.__pools[type]
+        oldest = time.time() - self.max_age
+        while pool and pool[0][0] < oldest:
+            pool.popleft()
+            self.discarded += 1
+
+    def get(self, type=Type.IMAGE):
+        """Hand out a CAPTCHA of the given type.
+
+        @returns dict with the id and url of the CAPTCHA, or None if none could be created
+        """
+        with self.__lock:
+            entry = None
+            if type in self.__pools:
+                self.__purge(type)
+                pool = self.__pools[type]
+                # the oldest usable CAPTCHA goes first, before it expires
+                entry = pool and pool.popleft() or None
+                if len(pool) < self.low_watermark:
+                    self.__wakeup.notify()
+            if entry is not None:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return self.__creator.createCaptcha(type)
+
+    def size(self, type=Type.IMAGE):
+        """Returns the number of CAPTCHAs of the type that are ready."""
+        return len(self.__pools.get(type, ()))
+
+    def __refill(self, type):
+        while True:
+            with self.__lock:
+                if self.__stopped or len(self.__pools[type]) >= self.high_watermark:
+                    return True
+            created = time.time()
+            captcha = self.__creator.createCaptcha(type)
+            if captcha is None:
+                return False
+            with self.__lock:
+                self.__pools[type].append((created, captcha))
+
+    def __run(self):
+        while True:
+            with self.__lock:
+                if self.__stopped:
+                    return
+                for type in self.types:
+                    self.__purge(type)
+                if all(len(pool) >= self.low_watermark for pool in self.__pools.values()):
+                    # wake up in time to replace the CAPTCHAs that are about to expire
+                    self.__wakeup.wait(self.max_age / 10.0)
+                    continue
+            failed = False
+            for type in self.types:
+                if not self.__refill(type):
+                    failed = True
+            if failed:
+                # Mollom is not answering, try again later rather than hammering it
+                with self.__lock:
+                    self.__wakeup.wait(1.0)
+
+    def close(self):
+        """Stop refilling the pool."""
+        with self.__lock:
+            self.__stopped = True
+            self.__wakeup.notify()
+        self.__thread.join()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the compression of request bodies and the
+# decompression of responses for the calls to the Mollom service
+# ---------------------------------------------------------------------
+
+"""Compressed request and response bodies.
+
+A Compression compresses request bodies of at least threshold bytes with gzip
+or deflate, and asks for compressed responses with Accept-Encoding. Small
+bodies are sent as they are, since compressing them costs more CPU time than
+the bytes saved are worth.
+
+Not every server accepts compressed request bodies. A server that refuses one
+with 415 (Unsupported Media Type) is remembered by host and port, and is sent
+plain bodies from then on.
+"""
+
+import threading
+import zlib
+
+GZIP = 'gzip'
+DEFLATE = 'deflate'
+
+# the window bits selecting the gzip and zlib (HTTP deflate) formats, and detecting either
+WBITS = {GZIP: 16 + zlib.MAX_WBITS, DEFLATE: zlib.MAX_WBITS}
+AUTO_WBITS = 32 + zlib.MAX_WBITS
+
+UNSUPPORTED_MEDIA_TYPE = 415
+
+
+class Compression(object):
+    """Decides which bodies are compressed, and how.
+
+    Keyword arguments:
+    encoding   -- GZIP or DEFLATE for the request bodies, None to only accept compressed responses
+    threshold  -- the size in bytes below which request bodies are sent uncompressed
+    level      -- the zlib compression level, 1 (fastest) to 9 (smallest)
+    accept     -- ask for gzip or deflate compressed responses
+    """
+
+    def __init__(self, encoding=GZIP, threshold=2048, level=6, accept=True):
+        if encoding not in (None, GZIP, DEFLATE):
+            raise ValueError("Unsupported encoding %s" % (encoding))
+        self.encoding = encoding
+        self.threshold = threshold
+        self.level = level
+        self.accept = accept
+        self.unsupported = set()    # the (host, port) pairs that refused a compressed body
+        self.lock = threading.Lock()
+
+    def encode(self, server, body, headers):
+        """Compress the request body for the server when it is worth it.
+
+        @type server: tuple (host, port)
+        @type headers: dict -- updated with the Content-Encoding and Accept-Encoding headers
+
+        @returns the body to send
+        """
+        if self.accept:
+            headers['Accept-Encoding'] = 'gzip, deflate'
+        if self.encoding is None or not body or len(body) < self.threshold or server in self.unsupported:
+            return body
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, WBITS[self.encoding])
+        compressed = compressor.compress(body) + compressor.flush()
+        if len(compressed) >= len(body):
+            return body
+        headers['Content-Encoding'] = self.encoding
+        return compressed
+
+    def refused(self, server):
+        """Remember that the server, a (host, port) tuple, does not accept compressed request bodies."""
+        with self.lock:
+            self.unsupported.add(server)
+
+    def decode(self, content, encoding):
+        """Decompress a response body.
+
+        @type encoding: string -- the Content-Encoding of the response, or None
+        """
+        encoding = (encoding or '').strip().lower()
+        if encoding in ('', 'identity'):
+            return content
+        if encoding not in (GZIP, 'x-gzip', DEFLATE):
+            raise IOError("Unsupported response encoding %s" % (encoding))
+        try:
+            return zlib.decompress(content, AUTO_WBITS)
+        except zlib.error:
+            if encoding != DEFLATE:
+                raise IOError("Malformed %s response body" % (encoding))
+        # some servers send raw deflate data, without the zlib header
+        try:
+            return zlib.decompress(content, -zlib.MAX_WBITS)
+        except zlib.error:
+            raise IOError("Malformed deflate response body")
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains a pool of keep-alive HTTP connections shared by
+# the calls to the Mollom REST API
+# ---------------------------------------------------------------------
+
+import httplib
+import socket
+import threading
+import time
+
+
+class PoolTimeoutError(socket.timeout):
+    """No connection to the endpoint became available in time.
+
+    The wait happens in the pool, before anything is sent, so unlike other
+    timeouts it says nothing about the server.
+    """
+
+
+class ConnectionPool(object):
+    """A bounded pool of keep-alive HTTP(S) connections.
+
+    Connections are kept per endpoint, i.e., per (scheme, host, port) triple, and
+    are handed out again to the next call for that endpoint, so the TCP (and TLS)
+    handshake is only paid when no idle connection is available.
+
+    The pool has the following knobs:
+
+      size          -- The maximal number of idle connections kept over all endpoints.
+      max_per_host  -- The maximal number of connections that may be open to a single
+                       endpoint at the same time. Callers block until a connection
+                       is returned when the limit is reached.
+      idle_timeout  -- The number of seconds an idle connection is kept before it is
+                       closed rather than reused.
+      timeout       -- The socket timeout in seconds for new connections (None uses
+                       the global default).
+
+    The hits and misses counters record how many requests reused an idle connection
+    and how many had to open a new one.
+    """
+
+    def __init__(self, size=10, max_per_host=4, idle_timeout=30.0, timeout=None):
+        self.size = size
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self.hits = 0
+        self.misses = 0
+
+        self.__idle = {}    # endpoint -> [(connection, time it was returned)]
+        self.__open = {}    # endpoint -> number of connections in use or idle
+        self.__idle_count = 0
+        self.__condition = threading.Condition(threading.Lock())
+
+
+    def __connect(self, scheme, host, port):
+        if scheme == 'https':
+            return httplib.HTTPSConnection(host, port, timeout=self.timeout)
+        return httplib.HTTPConnection(host, port, timeout=self.timeout)
+
+
+    def __evict_oldest(self):
+        """Close the idle connection that has been waiting longest. Must hold the lock."""
+        oldest = None
+        for endpoint, idle in self.__idle.iteritems():
+            if idle and (oldest is None or idle[0][1] < self.__idle[oldest][0][1]):
+                oldest = endpoint
+        if oldest is not None:
+            connection, _ = self.__idle[oldest].pop(0)
+            self.__idle_count -= 1
+            self.__open[oldest] -= 1
+            connection.close()
+
+
+    def acquire(self, scheme, host, port=None, timeout=None):
+        """Get a connection to the given endpoint.
+
+        @type scheme: string -- http or https
+        @type host: string
+        @type port: int
+        @type timeout: float -- the maximal number of seconds to wait for a connection to the
+                       endpoint to be returned, when max_per_host are in use
+
+        @returns a tuple (connection, reused), where reused indicates if the connection
+                 was taken from the idle connections.
+
+        @raises PoolTimeoutError when no connection became available within the timeout
+        """
+        endpoint = (scheme, host, port)
+        now = time.time()
+        expires = timeout is not None and now + timeout or None
+        with self.__condition:
+            while True:
+                idle = self.__idle.get(endpoint, [])
+                while idle:
+                    connection, returned = idle.pop()
+                    self.__idle_count -= 1
+                    if now - returned <= self.idle_timeout:
+                        self.hits += 1
+                        return connection, True
+                    self.__open[endpoint] -= 1
+                    connection.close()
+                if self.__open.get(endpoint, 0) < self.max_per_host:
+                    break
+                if expires is None:
+                    self.__condition.wait()
+                    continue
+                remaining = expires - time.time()
+                if remaining <= 0:
+                    raise PoolTimeoutError("No connection to %s://%s became available" % (scheme, host))
+                self.__condition.wait(remaining)
+            self.__open[endpoint] = self.__open.get(endpoint, 0) + 1
+            self.misses += 1
+        return self.__connect(scheme, host, port), False
+
+
+    def release(self, connection, scheme, host, port=None, reusable=True):
+        """Return a connection obtained through acquire to the pool.
+
+        Connections that are not reusable, e.g., because the server asked to close them
+        or the exchange failed, are closed. So are connections that do not fit in the
+        pool anymore.
+        """
+        endpoint = (scheme, host, port)
+        with self.__condition:
+            if reusable and self.size > 0:
+                if self.__idle_count >= self.size:
+                    self.__evict_oldest()
+                self.__idle.setdefault(endpoint, []).append((connection, time.time()))
+                self.__idle_count += 1
+            else:
+                self.__open[endpoint] -= 1
+                connection.close()
+            self.__condition.notify()
+
+
+    def __set_timeout(self, connection, timeout):
+        """Apply the socket timeout for the next exchange, or the one of the pool when that is shorter."""
+        if timeout is None or (self.timeout is not None and self.timeout < timeout):
+            timeout = self.timeout
+        connection.timeout = timeout if timeout is not None else socket._GLOBAL_DEFAULT_TIMEOUT
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout if timeout is not None else socket.getdefaulttimeout())
+
+
+    def request(self, scheme, host, port, method, path, body=None, headers=None, timeout=None):
+        """Perform a single HTTP exchange over a pooled connection.
+
+        A reused connection may have been closed by the server in the meantime. In
+        that case the request is sent once more over a fresh connection.
+
+        @type timeout: float -- the socket timeout for this exchange, used for waiting on a
+                       connection, connecting, sending and every read; the timeout of the
+                       pool applies when it is shorter
+
+        @returns a tuple (status, response headers as a dict, response body)
+        """
+        headers = headers or {}
+        while True:
+            connection, reused = self.acquire(scheme, host, port, timeout)
+            self.__set_timeout(connection, timeout)
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                content = response.read()
+            except (httplib.HTTPException, socket.error) as err:
+                self.release(connection, scheme, host, port, reusable=False)
+                # a timeout is a slow server rather than a stale connection, so it is not sent again
+                if reused and not isinstance(err, socket.timeout):
+                    continue
+                raise
+            except BaseException:
+                # e.g. a certificate mismatch, which is a ValueError, or a KeyboardInterrupt: the
+                # connection is in an unknown state, and must not keep its place at the endpoint
+                self.release(connection, scheme, host, port, reusable=False)
+                raise
+            self.release(connection, scheme, host, port, reusable=not response.will_close)
+            return response.status, dict(response.getheaders()), content
+
+
+    def stats(self):
+        """Returns a dict with the hit and miss counts and the current pool occupation."""
+        with self.__condition:
+            return { 'hits': self.hits
+                   , 'misses': self.misses
+                   , 'idle': self.__idle_count
+                   , 'open': sum(self.__open.values())
+                   , 'size': self.size
+                   , 'max_per_host': self.max_per_host
+                   , 'idle_timeout': self.idle_timeout
+                   }
+
+
+    def close(self):
+        """Close all idle connections."""
+        with self.__condition:
+            for endpoint, idle in self.__idle.iteritems():
+                for connection, _ in idle:
+                    self.__open[endpoint] -= 1
+                    connection.close()
+            self.__idle = {}
+            self.__idle_count = 0
+            self.__condition.notify_all()
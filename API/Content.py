@@ -21,9 +21,11 @@ __date__ = "$Feb 8, 2012$"
 # This module contains the class file for the Mollom Content API
 # ---------------------------------------------------------------------
 
-import urllib
-
-from Internals import __service, __cat_maybe_values
+from Encoder import Encoder
+from Internals import service
+from Internals import parallel_map
+from Response import Response, compact
+from PyMollom import MollomError, DeadlineExceededError
 
 class Check(object):
     """Representing the checks Mollom is requested to make on a submitted piece of content:
@@ -43,20 +45,128 @@ class Strictness(object):
     RELAXED = "relaxed"
 
 
-class ContentError(MollomFault):
+class ContentError(MollomError):
     pass
 
 
+# maps the keyword arguments of the content calls onto the fields of the REST API
+CONTENT_FIELDS = ( ('post_title', 'postTitle')
+                 , ('post_body', 'postBody')
+                 , ('author_name', 'authorName')
+                 , ('author_url', 'authorUrl')
+                 , ('author_mail', 'authorMail')
+                 , ('author_open_id', 'authorOpenid')
+                 , ('author_ip', 'authorIp')
+                 , ('author_id', 'authorId')
+                 , ('checks', 'checks')
+                 , ('unsure', 'unsure')
+                 , ('strictness', 'strictness')
+                 , ('rate_limit', 'rateLimit')
+                 , ('honeypot', 'honeypot')
+                 , ('stored', 'stored')
+                 , ('url', 'url')
+                 , ('context_url', 'contextUrl')
+                 , ('context_title', 'contextTitle')
+                 )
+
+
+# the precompiled encoder for the arguments of checkContent and updateContent; the
+# content ID of an update is part of the path, content/<contentId>
+CONTENT_ENCODER = Encoder(CONTENT_FIELDS)
+
+
+class ContentResponse(Response):
+    """The verdict of Mollom on a piece of content.
+
+    Only the verdict is kept, not the submitted fields Mollom echoes back, so
+    large numbers of verdicts can be held in memory. The languages are a tuple of
+    (language code, score) pairs.
+    """
+
+    __slots__ = ( 'id', 'spam_score', 'spam_classification', 'profanity_score', 'quality_score'
+                , 'sentiment_score', 'reason', 'languages')
+    FIELDS = ( ('id', 'id')
+             , ('spamScore', 'spam_score')
+             , ('spamClassification', 'spam_classification')
+             , ('profanityScore', 'profanity_score')
+             , ('qualityScore', 'quality_score')
+             , ('sentimentScore', 'sentiment_score')
+             , ('reason', 'reason')
+             , ('languages', 'languages')
+             )
+
+    @classmethod
+    def fromJSON(cls, js):
+        response = super(ContentResponse, cls).fromJSON(dict(js, languages=None))
+        if js.get('languages') is not None:
+            languages = tuple((compact(l.get('languageCode')), l.get('languageScore')) for l in js['languages'])
+            object.__setattr__(response, 'languages', languages)
+        return response
+
+    def to_dict(self):
+        fields = super(ContentResponse, self).to_dict()
+        if self.languages is not None:
+            fields['languages'] = [{'languageCode': code, 'languageScore': score} for (code, score) in self.languages]
+        return fields
+
+    def spam(self):
+        return self.spam_classification == 'spam'
+
+    def ham(self):
+        return self.spam_classification == 'ham'
+
+    def unsure(self):
+        return self.spam_classification == 'unsure'
+
+
+def local_verdict(classification, reason, spam_score=None):
+    """Build the answer for content that was classified without calling Mollom.
+
+    It has the fields of the Mollom answer that can be known locally. There is no
+    content ID, since Mollom has not seen the content.
+
+    @type classification: string -- spam, ham or unsure
+    @type reason: string -- why the content was classified locally
+    @type spam_score: float -- defaults to 1.0 for spam and 0.0 otherwise
+    """
+    if spam_score is None:
+        spam_score = classification == 'spam' and 1.0 or 0.0
+    return ContentResponse( spam_classification=classification
+                          , spam_score=spam_score
+                          , reason=reason)
+
+
 class Content(object):
-    def __init__(self):
+    def __init__(self, public_key, private_key, blacklist=None, whitelist=None, verdict_cache=None, fallback=None,
+                 prefilter=None):
+        """
+        @type public_key: string
+        @type private_key: string
+        @type blacklist: API.BlacklistMirror.BlacklistMirror -- when given, content matching a local
+                         copy of the blacklist is rejected without calling Mollom
+        @type whitelist: API.WhitelistIndex.WhitelistMirror -- when given, content from authors on a
+                         local copy of the whitelist is accepted without calling Mollom
+        @type verdict_cache: API.VerdictCache.VerdictCache -- when given, content that was checked
+                             before gets the cached verdict, including the content ID Mollom
+                             assigned on the first submission
+        @type fallback: API.Fallback.NaiveBayes -- when given, it learns from the verdicts of Mollom,
+                        and classifies the content when the call to Mollom fails
+        @type prefilter: API.PreFilter.PreFilter -- when given, its stages run before anything
+                         else, and content one of them classifies is not sent to Mollom
+        """
+        self.public_key = public_key
+        self.private_key = private_key
+        self.blacklist = blacklist
+        self.whitelist = whitelist
+        self.verdict_cache = verdict_cache
+        self.fallback = fallback
+        self.prefilter = prefilter
         self.contentId = None
 
     def __parseContentResponse(self, js):
-        """Parses the returned answer from a Content API call.
-
-        For now, this simply returns a dict with the fields as keys
+        """Parses the returned answer from a Content API call into a ContentResponse.
         """
-        return js['content']
+        return ContentResponse.fromJSON(js['content'])
 
 
     def checkContent( self
@@ -76,7 +186,8 @@ class Content(object):
                     , stored=None
                     , url=None
                     , context_url=None
-                    , context_title=None):
+                    , context_title=None
+                    , deadline=None):
         """Submit content to the Mollom service to have it checked for spaminess.
 
         Keyword arguments:
@@ -88,7 +199,7 @@ class Content(object):
         author_open_id (optional) -- The Open ID of the content author.
         author_ip      (optional) -- The IP address of the content author.
         author_id      (optional) -- The ID the content author has on the website where the posting takes place.
-        checks         (optional) --
+        checks         (optional) -- A list of Check values; each is sent as a separate checks parameter.
         unsure         (optional) --
         strictness     (optional) --
         rate_limit     (optional) --
@@ -97,38 +208,68 @@ class Content(object):
         url            (optional) --
         context_url    (optional) --
         context_title  (optional) --
+        deadline       (optional) -- The number of seconds the call may take, see API.Internals.service.
+                                     Defaults to API.Internals.default_deadline().
 
         Returns:
-        A dictionary with following keys if succesful
+        A ContentResponse if succesful, which can also be indexed like the answer dict, with keys
             id                  -- the content ID corresponding to the submission
             spamScore           -- only returned when the check included SPAM
+        Content classified by the pre-filter, accepted by the local whitelist or rejected by
+        the local blacklist gets a local_verdict, without an id. So does content classified by the fallback classifier
+        when Mollom could not be reached, or not within the deadline, with reason 'fallback'.
+        Without a fallback verdict, DeadlineExceededError is raised when the deadline passes.
         """
 
-        tuples = {'postTitle': post_title
-            , 'postBody': post_body
-            , 'authorName': author_name
-            , 'authorUrl': author_url
-            , 'authorMail': author_mail
-            , 'authorOpenid': author_open_id
-            , 'authorIp': author_ip
-            , 'authorId': author_id
-            , 'checks': checks #FIXME: these should be concatenated
-            , 'unsure': unsure
-            , 'strictness': strictness
-            , 'rateLimit': rate_limit
-            , 'honeypot': honeypot
-            , 'stored': stored
-            , 'url': url
-            , 'contextUrl': context_url
-            , 'contextTitle': context_title}
-        data = __cat_maybe_values(tuples)
-        answer = __service('POST', 'content', data, 22)
+        request = CONTENT_ENCODER.encode(locals())
+        data = request.fields
+        if self.prefilter is not None:
+            result = self.prefilter.check(data)
+            if result is not None:
+                return local_verdict(*result)
+        if self.whitelist is not None and self.whitelist.match(data) is not None:
+            return local_verdict('ham', 'whitelist')
+        if self.blacklist is not None:
+            entry = self.blacklist.match(data)
+            if entry is not None:
+                return local_verdict('spam', entry.get('reason'))
+        if self.verdict_cache is not None:
+            verdict = self.verdict_cache.get(data)
+            if verdict is not None:
+                return ContentResponse.fromJSON(verdict)
+
+        try:
+            answer = service(self.public_key, self.private_key, 'POST', 'content', request, decode=True,
+                             deadline=deadline)
+        except DeadlineExceededError:
+            verdict = self.__fallback_verdict(data)
+            if verdict is None:
+                raise
+            return verdict
 
         # for now, we check for a None, this should be fixed when we throw exceptions
         if answer == None:
-            return None
+            return self.__fallback_verdict(data)
+
+        verdict = self.__parseContentResponse(answer)
+        if self.verdict_cache is not None:
+            self.verdict_cache.put(data, verdict.to_dict())
+        if self.fallback is not None:
+            self.fallback.train(data, verdict.spam_classification, verdict.id)
+        return verdict
 
-        return self.__parseContentResponse(json.loads(answer))
+    def __fallback_verdict(self, data):
+        """Classify the content locally, when Mollom could not do it.
+
+        @returns a local_verdict, or None without a fallback classifier or when it has learnt too little
+        """
+        if self.fallback is None:
+            return None
+        guess = self.fallback.classify(data)
+        if guess is None:
+            return None
+        (classification, probability) = guess
+        return local_verdict(classification, 'fallback', probability)
 
     def updateContent( self
                      , post_title=None
@@ -148,6 +289,7 @@ class Content(object):
                      , url=None
                      , context_url=None
                      , context_title=None
+                     , deadline=None
     ):
         """Submit content to the Mollom service to have it updated. The contentId is
         taken from the calling object, so you should not use this unless you called
@@ -162,7 +304,7 @@ class Content(object):
         author_open_id (optional) -- The Open ID of the content author.
         author_ip      (optional) -- The IP address of the content author.
         author_id      (optional) -- The ID the content author has on the website where the posting takes place.
-        checks         (optional) --
+        checks         (optional) -- A list of Check values; each is sent as a separate checks parameter.
         unsure         (optional) --
         strictness     (optional) --
         rate_limit     (optional) --
@@ -171,41 +313,53 @@ class Content(object):
         url            (optional) --
         context_url    (optional) --
         context_title  (optional) --
+        deadline       (optional) -- The number of seconds the call may take, see API.Internals.service.
+                                     Defaults to API.Internals.default_deadline().
 
         Returns:
-        A dictionary with following keys if succesful
-          spam       -- 1 for ham, 2 for spam, 3 for unsure
-          quality    -- Mollom's assesment of the content quality [0,1]
-          session_id -- The session ID for communicating with Mollom about this chunk of content
+        A ContentResponse if succesful. When the fallback classifier classified the content
+        instead, a local_verdict, as for checkContent.
         """
 
         # FIXME: throw an exception
         if self.contentId == None:
             return None
 
-        tuples = {'contentId': self.contentId
-            , 'post_title': post_title
-            , 'post_body': post_body
-            , 'author_name': author_name
-            , 'author_url': author_url
-            , 'authorMail': author_mail
-            , 'authorOpenid': author_open_id
-            , 'authorIp': author_ip
-            , 'authorId': author_id
-            , 'checks': checks #FIXME: these should be concatenated
-            , 'unsure': unsure
-            , 'strictness': strictness
-            , 'rateLimit': rate_limit
-            , 'honeypot': honeypot
-            , 'stored': stored
-            , 'url': url
-            , 'contextUrl': context_url
-            , 'contextTitle': context_title}
-        data = __cat_maybe_values(tuples)
-        answer = __service('POST', 'content', data, 2)
+        request = CONTENT_ENCODER.encode(locals())
+        # checking known content again is idempotent, unlike checkContent, which creates the content
+        try:
+            answer = service(self.public_key, self.private_key, 'POST', 'content/%s' % (self.contentId), request,
+                             decode=True, hedge=True, deadline=deadline)
+        except DeadlineExceededError:
+            verdict = self.__fallback_verdict(request.fields)
+            if verdict is None:
+                raise
+            return verdict
 
         # for now, we check for a None, this should be fixed when we throw exceptions
         if answer == None:
-            return None
+            return self.__fallback_verdict(request.fields)
+
+        verdict = self.__parseContentResponse(answer)
+        if self.fallback is not None:
+            self.fallback.train(request.fields, verdict.spam_classification, verdict.id)
+        return verdict
+
+
+    def check_many(self, posts, concurrency=4, ordered=True):
+        """Submit a batch of content to the Mollom service, running several checkContent
+        calls in parallel.
 
-        return self.__parseContentResponse(json.loads(answer))
+        Keyword arguments:
+        posts                     -- An iterable of dicts with the keyword arguments of checkContent.
+                                     It is consumed lazily, so it can be a generator over a large backlog.
+        concurrency    (optional) -- The number of checks in flight at the same time. Defaults to 4.
+        ordered        (optional) -- Yield the results in the order of the posts. When False, results
+                                     are yielded as soon as they complete. Defaults to True.
+
+        Returns:
+        A generator of tuples (index, result, error) where index is the position of the post in the
+        input, result is what checkContent returned for it and error is the exception raised while
+        checking the post, or None. A failing post does not abort the batch.
+        """
+        return parallel_map(lambda post: self.checkContent(**post), posts, concurrency, ordered)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the precompiled request encoders for the API
+# calls with many optional parameters
+# ---------------------------------------------------------------------
+
+"""Precompiled request encoders.
+
+An Encoder is built once per operation from the mapping of keyword arguments
+onto REST fields. Encoding the arguments of a call is then a single pass over
+that mapping, skipping absent arguments, which yields both the field values
+(for local checks) and the percent-encoded pairs. The pairs serve as the request
+body as well as the input of the OAuth signature, so every value is encoded
+only once.
+"""
+
+from Signer import escape
+
+
+def text(value):
+    """Returns a field value as unicode, for matching it locally. Byte strings are taken to be
+    UTF-8, as they are sent to Mollom, with the bytes that do not decode replaced.
+    """
+    if isinstance(value, str):
+        return value.decode('utf-8', 'replace')
+    return unicode(value)
+
+
+class EncodedRequest(object):
+    """The parameters of a request, both as given and percent-encoded.
+
+    fields  -- dict of REST field name -> value, for the parameters that are present
+    pairs   -- list of percent-encoded (name, value) pairs; a list value gives one pair per element
+    """
+
+    __slots__ = ('fields', 'pairs')
+
+    def __init__(self, fields, pairs):
+        self.fields = fields
+        self.pairs = pairs
+
+    def encoded(self):
+        """Returns the form (or query string) encoding of the parameters."""
+        return '&'.join(['%s=%s' % pair for pair in self.pairs])
+
+
+class Encoder(object):
+    """Maps the keyword arguments of an operation straight to an EncodedRequest.
+
+    @type mapping: sequence of (keyword argument name, REST field name) pairs
+    """
+
+    def __init__(self, mapping):
+        self.mapping = tuple(mapping)
+        self.__compiled = tuple((name, field, escape(field)) for (name, field) in self.mapping)
+
+    def encode(self, arguments):
+        """Encode the arguments of a call, leaving out those that are None.
+
+        @type arguments: dict -- keyword argument name -> value, e.g., locals() of the API method
+        """
+        fields = {}
+        pairs = []
+        get = arguments.get
+        for (name, field, escaped) in self.__compiled:
+            value = get(name)
+            if value is None:
+                continue
+            fields[field] = value
+            if isinstance(value, (list, tuple)):
+                for v in value:
+                    pairs.append((escaped, escape(v)))
+            else:
+                pairs.append((escaped, escape(value)))
+        return EncodedRequest(fields, pairs)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the local classifier that stands in for Mollom
+# when the service cannot be reached
+# ---------------------------------------------------------------------
+
+"""Offline fallback classifier.
+
+A naive Bayes classifier over the words of the post, the hosts it links to and
+features of the author (mail domain, network, name, ID). It learns from the
+verdicts Mollom returns and from the feedback sent on them, so that content can
+still be classified when a call to Mollom fails.
+
+Classifying looks at no more than max_features features, so its cost is bounded
+regardless of the size of the post. The memory is bounded too: no more than about
+max_counts features are counted, the rarest ones being forgotten first.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+
+from collections import OrderedDict
+
+from Encoder import text
+
+WORD_RE = re.compile(r"[^\W\d_]{2,24}", re.UNICODE)
+HOST_RE = re.compile(r"(?:https?://|www\.)([\w.-]+)", re.IGNORECASE | re.UNICODE)
+
+# the feedback reasons that mark content as spam and as ham, see API.Feedback.Reason
+SPAM_REASONS = frozenset(('spam', 'profanity', 'quality', 'unwanted'))
+HAM_REASONS = frozenset(('approve',))
+
+
+def features(data, max_features=500):
+    """Returns the set of features of the content.
+
+    @type data: dict -- the content fields, as sent to Mollom (postTitle, authorMail, ...)
+    @type max_features: int -- the maximal number of features
+    """
+    found = set()
+    mail = data.get('authorMail')
+    if mail and '@' in mail:
+        found.add(u'mail:' + text(mail).rsplit('@', 1)[1].lower())
+    ip = data.get('authorIp')
+    if ip:
+        # the network rather than the address, since spammers rotate addresses
+        ip = text(ip)
+        found.add(u'net:' + (':' in ip and ip.rsplit(':', 1)[0] or ip.rsplit('.', 1)[0]))
+    for field in ('authorName', 'authorId'):
+        if data.get(field):
+            found.add(u'%s:%s' % (field, text(data[field]).lower()))
+    for field in ('authorUrl', 'postTitle', 'postBody'):
+        if not data.get(field):
+            continue
+        value = text(data[field])
+        for host in HOST_RE.findall(value):
+            found.add(u'link:' + host.lower())
+        for word in WORD_RE.finditer(value):
+            if len(found) >= max_features:
+                return found
+            found.add(word.group(0).lower())
+    return found
+
+
+class NaiveBayes(object):
+    """A naive Bayes classifier telling spam from ham, trained incrementally.
+
+    The features of the content classified last (up to remember) are kept by content
+    ID, so feedback can correct what was learnt from the verdict on the content.
+
+    Keyword arguments:
+    spam_threshold  -- the spam probability above which content is spam
+    ham_threshold   -- the spam probability below which content is ham; in between it is unsure
+    max_features    -- the maximal number of features looked at per content
+    remember        -- the number of content IDs whose features are kept for feedback
+    min_trained     -- the number of trained contents of each class needed to give a verdict
+    max_counts      -- the number of features counted; once there are a tenth more, the
+                       features seen least often are forgotten
+    """
+
+    def __init__(self, spam_threshold=0.9, ham_threshold=0.1, max_features=500, remember=10000, min_trained=10,
+                 max_counts=200000):
+        self.spam_threshold = spam_threshold
+        self.ham_threshold = ham_threshold
+        self.max_features = max_features
+        self.remember = remember
+        self.min_trained = min_trained
+        self.max_counts = max_counts
+        self.lock = threading.Lock()
+        self.counts = {}                    # feature -> [spam count, ham count]
+        self.totals = [0, 0]                # number of spam and ham contents trained
+        self.recent = OrderedDict()         # content ID -> (features, label)
+
+    def __update(self, found, label, delta):
+        index = 0 if label == 'spam' else 1
+        self.totals[index] += delta
+        for feature in found:
+            count = self.counts.get(feature)
+            if count is None:
+                count = self.counts[feature] = [0, 0]
+            count[index] += delta
+            if count[0] <= 0 and count[1] <= 0:
+                del self.counts[feature]
+        if len(self.counts) > self.max_counts + self.max_counts // 10:
+            self.__prune()
+
+    def __prune(self):
+        """Forget the features seen least often, down to max_counts."""
+        rarest = heapq.nsmallest(len(self.counts) - self.max_counts, self.counts.iteritems(),
+                                 key=lambda item: item[1][0] + item[1][1])
+        for (feature, _) in rarest:
+            del self.counts[feature]
+
+    def train(self, data, label, content_id=None):
+        """Learn the label of the content.
+
+        @type data: dict -- the content fields, as sent to Mollom
+        @type label: string -- spam or ham; other classifications are ignored
+        @type content_id: string -- the ID Mollom gave the content, to apply feedback to it later
+        """
+        if label not in ('spam', 'ham'):
+            return
+        found = features(data, self.max_features)
+        with self.lock:
+            if content_id is not None:
+                previous = self.recent.pop(content_id, None)
+                if previous is not None:
+                    self.__update(*previous, delta=-1)
+                self.recent[content_id] = (found, label)
+                if len(self.recent) > self.remember:
+                    self.recent.popitem(last=False)
+            self.__update(found, label, 1)
+
+    def feedback(self, content_id, reason):
+        """Correct the label of content that was trained with its content ID.
+
+        @type reason: string -- the feedback reason, see API.Feedback.Reason
+
+        @returns True if the feedback changed what was learnt
+        """
+        label = reason in SPAM_REASONS and 'spam' or reason in HAM_REASONS and 'ham' or None
+        with self.lock:
+            previous = self.recent.get(content_id)
+            if label is None or previous is None or previous[1] == label:
+                return False
+            (found, old) = previous
+            self.__update(found, old, -1)
+            self.__update(found, label, 1)
+            self.recent[content_id] = (found, label)
+            return True
+
+    def spam_probability(self, data):
+        """Returns the probability that the content is spam, or None when too little has been learnt."""
+        found = features(data, self.max_features)
+        with self.lock:
+            (spam, ham) = self.totals
+            if min(spam, ham) < max(1, self.min_trained):
+                return None
+            # log odds, with add-one smoothing of the feature counts
+            score = math.log(float(spam) / ham)
+            for feature in found:
+                count = self.counts.get(feature)
+                if count is not None:
+                    score += math.log((count[0] + 1.0) / (spam + 2.0)) - math.log((count[1] + 1.0) / (ham + 2.0))
+        if score > 700:
+            return 1.0
+        return 1.0 - 1.0 / (1.0 + math.exp(score))
+
+    def classify(self, data):
+        """Classify the content.
+
+        @returns a tuple (spam, ham or unsure, spam probability), or None when too little has been learnt
+        """
+        probability = self.spam_probability(data)
+        if probability is None:
+            return None
+        if probability >= self.spam_threshold:
+            return 'spam', probability
+        if probability <= self.ham_threshold:
+            return 'ham', probability
+        return 'unsure', probability
+
+    def save(self, path):
+        """Store what was learnt in a file, replacing it atomically."""
+        with self.lock:
+            state = {'totals': self.totals, 'counts': self.counts}
+            (fd, temporary) = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.fallback')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(state, f)
+                os.rename(temporary, path)
+            except:
+                os.unlink(temporary)
+                raise
+
+    def load(self, path):
+        """Replace what was learnt with the contents of a file written by save."""
+        with open(path) as f:
+            state = json.load(f)
+        with self.lock:
+            self.totals = state['totals']
+            self.counts = state['counts']
+            self.recent.clear()
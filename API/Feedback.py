@@ -21,11 +21,53 @@ __date__ = "$Feb 8, 2012$"
 # This module contains the class file for the Mollom Feedback API
 # ---------------------------------------------------------------------
 
+from Internals import service, cat_maybe_values
+
+
+class Reason(object):
+    SPAM = "spam"
+    PROFANITY = "profanity"
+    QUALITY = "quality"
+    UNWANTED = "unwanted"
+    APPROVE = "approve"
+    DELETE = "delete"
+
+
+class Type(object):
+    FLAG = "flag"
+    MODERATE = "moderate"
+
 
 class Feedback(object):
+    """Implementation of the API call for sending feedback on content or a CAPTCHA.
+    """
+
+    def __init__(self, public_key, private_key, fallback=None):
+        """
+        @type public_key: string
+        @type private_key: string
+        @type fallback: API.Fallback.NaiveBayes -- when given, the feedback on content also corrects
+                        what it learnt from the verdict of Mollom
+        """
+        self.public_key = public_key
+        self.private_key = private_key
+        self.fallback = fallback
+
+    def send(self, reason, content_id=None, captcha_id=None, type=None, deadline=None):
+        """Tell Mollom what happened to content it classified, so it can learn from it.
 
-    def __init__(self):
-        pass
+        @type reason: string -- one of Reason
+        @type content_id: string -- the content the feedback is for
+        @type captcha_id: string -- the CAPTCHA the feedback is for, when there is no content ID
+        @type type: string -- one of Type
+        @type deadline: float -- the number of seconds the call may take, see API.Internals.service
 
-    def send(self):
-        pass
+        @returns True if Mollom accepted the feedback
+        """
+        data = cat_maybe_values({ 'reason': reason
+                                , 'contentId': content_id
+                                , 'captchaId': captcha_id
+                                , 'type': type})
+        if self.fallback is not None and content_id is not None:
+            self.fallback.feedback(content_id, reason)
+        return service(self.public_key, self.private_key, 'POST', 'feedback', data, deadline=deadline) != None
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains a write-behind queue for feedback, sent to Mollom
+# in background batches
+# ---------------------------------------------------------------------
+
+"""Write-behind feedback dispatching.
+
+FeedbackQueue.submit returns immediately; the feedback is sent by a background
+thread, in batches of concurrent calls to Feedback.send. Feedback for content
+(or a CAPTCHA) that is still pending replaces the pending feedback, so a
+moderator changing their mind only results in one call.
+
+With a spool file, every submitted item and every sent item is appended to it
+as a JSON line, and the items that were not sent yet are loaded from it again
+when the queue is created, so no feedback is lost on a restart.
+
+An item that cannot be sent is retried with a growing delay, and the batches go
+on with the other items meanwhile. After max_attempts failures it is moved to
+the dead letters, so feedback Mollom keeps refusing, e.g. for an unknown content
+ID, does not hold up the rest.
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+
+from Internals import parallel_map
+
+
+class FeedbackQueue(object):
+    """Accepts feedback instantly and sends it in the background.
+
+    Keyword arguments:
+    feedback                  -- The API.Feedback.Feedback used to send the feedback.
+    spool          (optional) -- The path of the spool file. Without it, pending feedback is only kept in memory.
+    batch_size     (optional) -- The maximal number of items sent per batch. Defaults to 100.
+    concurrency    (optional) -- The number of calls in flight while sending a batch. Defaults to 4.
+    flush_interval (optional) -- The number of seconds between batches. A full batch is sent right away.
+                                 Defaults to 1.
+    sync           (optional) -- fsync the spool after every write. Defaults to False, leaving it to the OS.
+    max_attempts   (optional) -- The number of times an item is tried before it is given up on. Defaults to 5.
+    max_backoff    (optional) -- The longest delay in seconds before an item is tried again. Defaults to 300.
+
+    Items that could not be sent stay pending and are tried again after flush_interval
+    seconds, doubling the delay after every failure up to max_backoff. Items that failed
+    max_attempts times are kept in dead_letters, and in the spool, rather than tried again.
+    """
+
+    def __init__(self, feedback, spool=None, batch_size=100, concurrency=4, flush_interval=1.0, sync=False,
+                 max_attempts=5, max_backoff=300.0):
+        self.feedback = feedback
+        self.spool = spool
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.flush_interval = flush_interval
+        self.sync = sync
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.dead_letters = []     # the items given up on
+
+        self.__pending = {}        # key -> (sequence number, item)
+        self.__attempts = {}       # key -> number of failed attempts of the pending item
+        self.__retry_at = {}       # key -> the time before which the pending item is not tried again
+        self.__backoff = False     # the last batch had failures, wait before sending the next one
+        self.__sequence = 0
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Condition(self.__lock)
+        self.__flushing = threading.Lock()
+        self.__stopped = False
+        self.__spool = None
+        self.__spooled = 0
+
+        if spool is not None:
+            self.__load()
+            self.__compact()
+
+        self.__thread = threading.Thread(target=self.__run)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __load(self):
+        if not os.path.exists(self.spool):
+            return
+        with open(self.spool) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a line cut short by a crash
+                    continue
+                key = record['key']
+                if record['op'] == 'add':
+                    self.__pending[key] = (record['seq'], record['item'])
+                elif record['op'] == 'done' and self.__pending.get(key, (None,))[0] == record['seq']:
+                    del self.__pending[key]
+                elif record['op'] == 'dead':
+                    if self.__pending.get(key, (None,))[0] == record['seq']:
+                        del self.__pending[key]
+                    self.dead_letters.append(record['item'])
+                self.__sequence = max(self.__sequence, record['seq'])
+
+    def __compact(self):
+        """Rewrite the spool with only the pending items. Must be called with the lock held
+        or before the background thread runs."""
+        if self.__spool is not None:
+            self.__spool.close()
+        temporary = self.spool + '.tmp'
+        with open(temporary, 'w') as f:
+            for (key, (seq, item)) in self.__pending.iteritems():
+                f.write(json.dumps({'op': 'add', 'key': key, 'seq': seq, 'item': item}) + '\n')
+            for item in self.dead_letters:
+                f.write(json.dumps({'op': 'dead', 'key': None, 'seq': 0, 'item': item}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(temporary, self.spool)
+        self.__spool = open(self.spool, 'a')
+        self.__spooled = len(self.__pending)
+
+    def __append(self, record):
+        """Append a record to the spool. Must be called with the lock held."""
+        if self.__spool is None:
+            return
+        self.__spool.write(json.dumps(record) + '\n')
+        self.__spool.flush()
+        if self.sync:
+            os.fsync(self.__spool.fileno())
+        self.__spooled += 1
+
+    def submit(self, reason, content_id=None, captcha_id=None, type=None):
+        """Queue feedback, see Feedback.send for the arguments. Returns immediately."""
+        key = content_id is not None and 'content:%s' % (content_id) or 'captcha:%s' % (captcha_id)
+        item = {'reason': reason, 'content_id': content_id, 'captcha_id': captcha_id, 'type': type}
+        with self.__lock:
+            if self.__stopped:
+                raise ValueError("The feedback queue has been closed")
+            if key in self.__pending:
+                self.coalesced += 1
+                # the new feedback gets attempts of its own
+                self.__attempts.pop(key, None)
+                self.__retry_at.pop(key, None)
+            self.__sequence += 1
+            self.__pending[key] = (self.__sequence, item)
+            self.__append({'op': 'add', 'key': key, 'seq': self.__sequence, 'item': item})
+            if len(self.__pending) >= self.batch_size:
+                self.__wakeup.notify()
+
+    def pending(self):
+        """Returns the number of items that have not been sent yet."""
+        return len(self.__pending)
+
+    def __send(self, job):
+        (key, seq, item) = job
+        return self.feedback.send(**item)
+
+    def flush(self):
+        """Send a batch of pending items.
+
+        @returns the number of items that were sent
+        """
+        with self.__flushing:
+            now = time.time()
+            with self.__lock:
+                # the oldest items that are not waiting to be tried again
+                ready = [(seq, key, item) for (key, (seq, item)) in self.__pending.iteritems()
+                         if self.__retry_at.get(key, 0) <= now]
+                batch = [(key, seq, item) for (seq, key, item) in heapq.nsmallest(self.batch_size, ready)]
+            if not batch:
+                return 0
+
+            done = [False] * len(batch)
+            for (index, result, error) in parallel_map(self.__send, batch, self.concurrency, ordered=False):
+                done[index] = bool(result) and error is None
+
+            now = time.time()
+            with self.__lock:
+                for ((key, seq, item), sent) in zip(batch, done):
+                    # newer feedback for the same content may have been submitted meanwhile
+                    current = self.__pending.get(key, (None,))[0] == seq
+                    if sent:
+                        if current:
+                            del self.__pending[key]
+                            self.__attempts.pop(key, None)
+                            self.__retry_at.pop(key, None)
+                        self.__append({'op': 'done', 'key': key, 'seq': seq})
+                    elif current:
+                        attempts = self.__attempts.get(key, 0) + 1
+                        if attempts >= self.max_attempts:
+                            del self.__pending[key]
+                            self.__attempts.pop(key, None)
+                            self.__retry_at.pop(key, None)
+                            self.dead_letters.append(item)
+                            self.__append({'op': 'dead', 'key': key, 'seq': seq, 'item': item})
+                        else:
+                            self.__attempts[key] = attempts
+                            self.__retry_at[key] = now + min(self.max_backoff,
+                                                             self.flush_interval * 2 ** (attempts - 1))
+                sent = done.count(True)
+                self.sent += sent
+                self.failed += len(batch) - sent
+                self.__backoff = sent < len(batch)
+                if self.spool is not None and self.__spooled > 2 * len(self.__pending) + 1000:
+                    self.__compact()
+            return sent
+
+    def __run(self):
+        while True:
+            with self.__lock:
+                if not self.__stopped and (len(self.__pending) < self.batch_size or self.__backoff):
+                    self.__wakeup.wait(self.flush_interval)
+                if self.__stopped:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # keep the items pending, they are retried with the next batch
+                time.sleep(self.flush_interval)
+
+    def close(self, timeout=None):
+        """Stop the background thread after trying to send the pending items once more.
+
+        Items that still could not be sent remain in the spool.
+        """
+        with self.__lock:
+            self.__stopped = True
+            self.__wakeup.notify()
+        self.__thread.join(timeout)
+        while self.__pending and self.flush():
+            pass
+        with self.__lock:
+            if self.__spool is not None:
+                self.__spool.close()
+                self.__spool = None
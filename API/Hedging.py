@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the policy for hedging idempotent calls to the
+# Mollom service on an alternate server
+# ---------------------------------------------------------------------
+
+"""Hedged requests.
+
+A hedged call sends its request to the preferred Mollom server and, when no
+answer has arrived by the time a given percentile of the recent latencies of the
+endpoint has passed, sends a duplicate to an alternate server. The first
+successful answer is used. Only idempotent calls may be hedged.
+
+The duplicates are paid for with a budget: every hedgeable call adds max_extra
+to it, and a duplicate is only sent when a whole request is left, so the extra
+load stays below max_extra times the number of calls.
+"""
+
+import collections
+import threading
+
+
+class HedgePolicy(object):
+    """Decides when a call is hedged, from the latencies observed per endpoint.
+
+    Keyword arguments:
+    percentile   -- the latency percentile after which a duplicate is sent
+    max_extra    -- the maximal fraction of extra requests, e.g., 0.05 for 5%
+    window       -- the number of recent latencies kept per endpoint
+    min_samples  -- the number of latencies needed before an endpoint is hedged
+    min_delay    -- the minimal time in seconds to wait before hedging
+    max_burst    -- the maximal number of duplicates the budget can save up
+    """
+
+    def __init__(self, percentile=95, max_extra=0.05, window=1000, min_samples=50, min_delay=0.005, max_burst=10):
+        self.percentile = percentile
+        self.max_extra = max_extra
+        self.window = window
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_burst = max_burst
+        self.lock = threading.Lock()
+        self.latencies = {}   # endpoint -> deque of the recent latencies
+        self.observed = {}    # endpoint -> number of latencies observed
+        self.delays = {}      # endpoint -> (number of latencies observed when computed, delay)
+        self.budget = 0.0
+        self.hedged = 0
+        self.calls = 0
+
+    def observe(self, endpoint, latency):
+        """Add the latency of a request to the endpoint."""
+        with self.lock:
+            latencies = self.latencies.get(endpoint)
+            if latencies is None:
+                latencies = self.latencies[endpoint] = collections.deque(maxlen=self.window)
+            latencies.append(latency)
+            self.observed[endpoint] = self.observed.get(endpoint, 0) + 1
+
+    def delay(self, endpoint):
+        """Returns the number of seconds to wait before hedging a call to the endpoint,
+        or None while too few latencies have been observed.
+        """
+        with self.lock:
+            latencies = self.latencies.get(endpoint)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            observed = self.observed[endpoint]
+            (computed, delay) = self.delays.get(endpoint, (0, None))
+            # the percentile moves slowly, so the window is only sorted again after a tenth of it changed
+            if delay is None or observed - computed >= max(1, self.window // 10):
+                ordered = sorted(latencies)
+                delay = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))]
+                self.delays[endpoint] = (observed, delay)
+            return max(self.min_delay, delay)
+
+    def charge(self):
+        """Credit the budget for a hedgeable call."""
+        with self.lock:
+            self.calls += 1
+            self.budget = min(self.max_burst, self.budget + self.max_extra)
+
+    def spend(self):
+        """Take a duplicate request from the budget.
+
+        @returns True if the duplicate may be sent
+        """
+        with self.lock:
+            if self.budget < 1.0:
+                return False
+            self.budget -= 1.0
+            self.hedged += 1
+            return True
+
+    def stats(self):
+        """Returns the number of hedgeable calls and of duplicates sent."""
+        with self.lock:
+            return {'calls': self.calls, 'hedged': self.hedged}
@@ -26,57 +26,655 @@ __date__ = 'Feb 8, 2012'
 # This module contains internal functions
 # ---------------------------------------------------------------------
 
-import oauth2
-import urllib
+import json
+import Queue
+import threading
+import time
 
+from Metrics import CallRecord, Metrics
+from Encoder import EncodedRequest
+from Signer import Signer, encode_pairs
+from PyMollom import MOLLOM_SERVER, MOLLOM_VERSION, DeadlineExceededError
 
-def __service(method, path, data=None, maxRetries=0, depth=0):
-    """The service method makes the actual call to the Mollom service
-    on behalf of the public API method.
+MOLLOM_HEADERS = { 'Accept': 'application/json;q=0.8, */*;q=0.5'
+                 , 'Content-Type': 'application/x-www-form-urlencoded'
+                 }
+
+# the pool of keep-alive connections shared by all calls to the Mollom service
+__pool = None
+
+
+def connection_pool():
+    """Returns the connection pool used by the API calls, creating a default one when needed."""
+    global __pool
+    if __pool is None:
+        # httplib and ssl are only imported once a request is made
+        from ConnectionPool import ConnectionPool
+        __pool = ConnectionPool()
+    return __pool
+
+
+def set_connection_pool(pool):
+    """Replace the connection pool used by the API calls, e.g., to change its size or
+    per-host limits. The connections held by the previous pool are closed.
+    """
+    global __pool
+    if __pool is not None and __pool is not pool:
+        __pool.close()
+    __pool = pool
+
+
+# the cache the Mollom servers are taken from, see set_server_list
+__server_list = None
+
+
+def servers():
+    """Returns the Mollom servers to use, the preferred one first."""
+    if __server_list is not None:
+        listed = __server_list.get()
+        if listed:
+            return [server.rstrip('/') + '/' for server in listed]
+    return [MOLLOM_SERVER]
+
+
+def set_server_list(server_list):
+    """Take the Mollom servers from a server list cache (see API.ServerList.ServerListCache)
+    rather than using MOLLOM_SERVER. Pass None to go back to MOLLOM_SERVER.
+    """
+    global __server_list
+    __server_list = server_list
+
+
+# the retry policy used when an API call does not pass its own
+__policy = None
+
+
+def retry_policy():
+    """Returns the default retry policy, creating it when needed."""
+    global __policy
+    if __policy is None:
+        from Retry import RetryPolicy
+        __policy = RetryPolicy()
+    return __policy
+
+
+def set_retry_policy(policy):
+    """Replace the default retry policy used by the API calls."""
+    global __policy
+    __policy = policy
+
+
+# the metrics the API calls are recorded in, see set_metrics
+__metrics = Metrics()
+
+
+def metrics():
+    """Returns the metrics the API calls are recorded in, or None when recording is disabled."""
+    return __metrics
+
+
+def set_metrics(registry):
+    """Record the API calls in the given API.Metrics.Metrics, or stop recording them when None."""
+    global __metrics
+    __metrics = registry
+
+
+# the limiter taking a token for every request to Mollom, see set_rate_limiter
+__rate_limiter = None
+
+
+def rate_limiter():
+    """Returns the rate limiter used by the API calls, or None when the requests are not limited."""
+    return __rate_limiter
+
+
+def set_rate_limiter(limiter):
+    """Limit the request rate of the API calls with the given API.RateLimit.RateLimiter,
+    or stop limiting it when None. When the limiter does not block, or its timeout
+    expires, the call fails without contacting Mollom.
+    """
+    global __rate_limiter
+    __rate_limiter = limiter
+
+
+# the policy for hedging idempotent calls, see set_hedge_policy
+__hedge_policy = None
+
+
+def hedge_policy():
+    """Returns the policy for hedging idempotent calls, or None when they are not hedged."""
+    return __hedge_policy
+
+
+def set_hedge_policy(policy):
+    """Hedge the idempotent API calls according to the given API.Hedging.HedgePolicy,
+    or stop hedging them when None. Hedging needs at least two servers, see servers().
+    """
+    global __hedge_policy
+    __hedge_policy = policy
+
+
+# the deadline of the API calls that do not pass their own, see set_default_deadline
+__default_deadline = None
+
+
+def default_deadline():
+    """Returns the default deadline of the API calls in seconds, or None when they have none."""
+    return __default_deadline
+
+
+def set_default_deadline(seconds):
+    """Give the API calls that do not pass a deadline of their own one of the given number
+    of seconds, or none when None.
+    """
+    global __default_deadline
+    __default_deadline = seconds
+
+
+# the compression of the request and response bodies, see set_compression
+__compression = None
+
+
+def compression():
+    """Returns the compression of the request and response bodies, or None when they are sent as they are."""
+    return __compression
+
+
+def set_compression(settings):
+    """Compress the request bodies and accept compressed responses according to the given
+    API.Compression.Compression, or stop doing so when None.
+    """
+    global __compression
+    __compression = settings
+
+
+# the signers for the key pairs that have been used, see signer
+__signers = {}
+
+
+def signer(public_key, private_key):
+    """Returns the signer for the key pair, creating it on first use."""
+    key_pair = (public_key, private_key)
+    s = __signers.get(key_pair)
+    if s is None:
+        s = __signers.setdefault(key_pair, Signer(public_key, private_key))
+    return s
 
+
+def sign_request(public_key, private_key, method, path, data=None, server=None):
+    """Sign a request to the Mollom service with the given key pair.
+
+    @type public_key: string
+    @type private_key: string
     @type method: the HTTP method (POST, GET, ...)
-    @type path: the URL path
-    @type data: dictionary with the data to pass in case of a POST
-    @type maxRetries: int
-    @type depth:int
+    @type path: the URL path, relative to the versioned Mollom server URL
+    @type data: dictionary with the request parameters, or an API.Encoder.EncodedRequest
+    @type server: the Mollom server URL, defaults to the preferred one
 
-    @returns:
-     - The result of the call, if a server is available.
-     - None after MOLLOM_RETRIES successive failed retries.
+    @returns a tuple (scheme, host, port, request path, body, headers) ready to be sent
     """
+    url = "%s%s/%s" % (server or servers()[0], MOLLOM_VERSION, path)
+    if isinstance(data, EncodedRequest):
+        pairs = data.pairs
+    else:
+        pairs = encode_pairs(data or {})
 
-    if depth > maxRetries:
-        return None
+    headers = dict(MOLLOM_HEADERS)
+    headers['Authorization'] = signer(public_key, private_key).sign(method, url, pairs)
 
-        # superfluous?
-        #params = { 'oauth_version': 1.0
-        #         , 'oauth_timestamp': int(time.time())
-        #         , 'oauth_nonce': oauth2.generate_nonce()
-        #         , 'oauth_signature_method': "HMAC-SHA1"
-        #         , 'oauth_consumer_key': self.publicKey
-        #         }
+    # the server URLs have the form scheme://host[:port]/, see servers()
+    (scheme, _, location) = url.partition('://')
+    (netloc, _, request_path) = location.partition('/')
+    request_path = '/' + request_path
+    encoded = '&'.join(['%s=%s' % pair for pair in pairs])
+    body = None
+    if method == 'GET':
+        if encoded:
+            request_path = "%s?%s" % (request_path, encoded)
+    else:
+        body = encoded
 
-    body = urllib.urlencode(data)
-    consumer = oauth2.Consumer(key=self.publicKey, secret=self.privateKey)
-    client = oauth2.Client(consumer)
+    (host, _, port) = netloc.partition(':')
+    return scheme, host, port and int(port) or None, request_path, body, headers
+
+
+def call(public_key, private_key, method, path, data=None, record=None, server=None, timeout=None):
+    """Sign the request with the given key pair and send it over a pooled connection.
+
+    @type public_key: string
+    @type private_key: string
+    @type method: the HTTP method (POST, GET, ...)
+    @type path: the URL path, relative to the versioned Mollom server URL
+    @type data: dictionary with the request parameters
+    @type record: API.Metrics.CallRecord -- when given, the signing and network times and the
+                  body sizes are added to it
+    @type server: the Mollom server URL, defaults to the preferred one
+    @type timeout: float -- the socket timeout, see API.ConnectionPool.ConnectionPool.request
+
+    The request body is compressed and the response decompressed according to
+    compression(). The byte counts in the record are those sent and received.
+
+    @returns a tuple (HTTP status, response body)
+    """
+    start = time.time()
+    (scheme, host, port, request_path, body, headers) = sign_request(public_key, private_key, method, path, data, server)
+    settings = __compression
+    if settings is not None:
+        plain = body
+        body = settings.encode((host, port), body, headers)
+    signed = time.time()
+    try:
+        status, response_headers, content = connection_pool().request(scheme, host, port, method, request_path,
+                                                                      body, headers, timeout)
+        if settings is not None and status == 415 and body is not plain:
+            # the server does not take compressed bodies, send this one and the next ones as they are
+            settings.refused((host, port))
+            if record is not None:
+                record.bytes_sent += len(body)
+            body = plain
+            del headers['Content-Encoding']
+            status, response_headers, content = connection_pool().request(scheme, host, port, method, request_path,
+                                                                          body, headers, timeout)
+    finally:
+        if record is not None:
+            record.sign_time += signed - start
+            record.network_time += time.time() - signed
+            record.bytes_sent += len(body or '')
+    if record is not None:
+        record.bytes_received += len(content)
+    if settings is not None:
+        content = settings.decode(content, response_headers.get('content-encoding'))
+    return status, content
 
-    #request = oauth2.Request( method='GET'
-    #                        , url= self.mollomServer + path
-    #                        , parameters = params
-    #                        , body = body)
 
-    resp, content = client.request(self.mollomServer + path, method, headers=self.mollomHeaders, body=body)
+def hedged_call(public_key, private_key, method, path, data, record, policy, timeout=None):
+    """Send the request like call, and a duplicate to an alternate server when the
+    answer takes longer than the policy allows. The first answer with status 200 is
+    returned; when neither request gets one, the last answer (or error) is.
 
-    if resp.status == 200:
-        return content
+    The losing request is left to complete in the background, after which its
+    connection returns to the pool. Without an answer within timeout seconds,
+    socket.timeout is raised.
+
+    Every request is measured in a record of its own, and only the measurements of
+    the request whose answer (or error) is used are added to the record of the call,
+    so a losing request still in flight cannot change it after the call is recorded.
+    """
+    endpoint = path.split('/', 1)[0]
+    hosts = servers()
+    delay = policy.delay(endpoint)
+    policy.charge()
+    answers = Queue.Queue()
+    expires = timeout is not None and time.time() + timeout or None
+
+    def send(server):
+        attempt = record is not None and CallRecord(method, path) or None
+        start = time.time()
+        try:
+            answer = call(public_key, private_key, method, path, data, attempt, server, timeout)
+        except Exception as err:
+            answers.put((None, err, attempt))
+        else:
+            policy.observe(endpoint, time.time() - start)
+            answers.put((answer, None, attempt))
+
+    if len(hosts) < 2 or delay is None or (timeout is not None and timeout <= delay):
+        send(hosts[0])
+        outstanding = 1
     else:
-        # FIXME: do some error checking here
+        thread = threading.Thread(target=send, args=(hosts[0],))
+        thread.daemon = True
+        thread.start()
+        outstanding = 1
+        try:
+            # an answer in time is put back for the loop below
+            answers.put(answers.get(timeout=delay))
+        except Queue.Empty:
+            # the duplicate has to fit in the budget, and in the request rate without waiting
+            limiter = __rate_limiter
+            if policy.spend() and (limiter is None or limiter.try_acquire(public_key)):
+                if record is not None:
+                    record.hedged = True
+                thread = threading.Thread(target=send, args=(hosts[1],))
+                thread.daemon = True
+                thread.start()
+                outstanding = 2
+
+    while True:
+        try:
+            (answer, error, attempt) = answers.get(timeout=expires and max(0.0, expires - time.time()))
+        except Queue.Empty:
+            import socket
+            raise socket.timeout("No answer from %s within the deadline" % (path))
+        outstanding -= 1
+        if (error is None and answer[0] == 200) or not outstanding:
+            break
+    if record is not None:
+        record.add(attempt)
+    if error is not None:
+        raise error
+    return answer
+
+
+def deadline_left(expires, path, record):
+    """Returns the number of seconds left until expires (None when it is None), raising
+    DeadlineExceededError once it has passed.
+    """
+    if expires is None:
         return None
+    left = expires - time.time()
+    if left <= 0:
+        if record is not None:
+            record.error = 'DeadlineExceeded'
+        raise DeadlineExceededError(DeadlineExceededError.REQUEST_TIMEOUT,
+                                    "The deadline for %s passed before Mollom answered" % (path))
+    return left
+
+
+def service(public_key, private_key, method, path, data=None, policy=None, decode=False, hedge=False, deadline=None,
+            errors=None):
+    """The service method makes the actual call to the Mollom service
+    on behalf of the public API method.
+
+    Calls failing with a network error or a temporary server error are retried
+    according to the retry policy. While the circuit breaker for the endpoint is
+    open, the call fails without contacting Mollom. Every attempt takes a token from
+    the rate limiter, if one is set (see set_rate_limiter). Idempotent calls can ask
+    to be hedged, see set_hedge_policy.
+
+    The deadline covers the whole call: waiting for the rate limiter and for a
+    connection, connecting, sending, reading, decoding and the retries, including
+    the back off between them. It is a budget for the call rather than a bound on
+    its duration, since a read in progress may overrun it by up to a socket
+    timeout. When it runs out, DeadlineExceededError is raised.
 
+    Every call is measured and recorded in the metrics returned by metrics(),
+    see API.Metrics.
 
-def __cat_maybe_values(d):
+    @type public_key: string
+    @type private_key: string
+    @type method: the HTTP method (POST, GET, ...)
+    @type path: the URL path
+    @type data: dictionary with the data to pass, or an API.Encoder.EncodedRequest
+    @type policy: API.Retry.RetryPolicy, defaults to the one returned by retry_policy()
+    @type decode: bool -- return the decoded JSON answer rather than the response body
+    @type hedge: bool -- the call is idempotent, and may be sent to two servers
+    @type deadline: float -- the number of seconds the call may take, defaults to default_deadline()
+    @type errors: function (HTTP status) raising the error for an answer other than 200, once
+                  the retries are used up; without it, such a call returns None
+
+    @returns:
+     - The result of the call, if a server is available.
+     - None when the call failed, after the retries allowed by the policy.
+    """
+    policy = policy or retry_policy()
+    breaker = policy.breaker(path.split('/', 1)[0])
+    registry = __metrics
+    limiter = __rate_limiter
+    hedging = hedge and __hedge_policy or None
+    if deadline is None:
+        deadline = __default_deadline
+    expires = time.time() + deadline if deadline is not None else None
+    record = registry is not None and CallRecord(method, path) or None
+
+    try:
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                if record is not None:
+                    record.error = 'CircuitOpen'
+                return None
+            # the attempt settles the breaker on every way out, see API.Retry.CircuitBreaker
+            settled = False
+            status = None
+            try:
+                left = deadline_left(expires, path, record)
+                if limiter is not None:
+                    start = time.time()
+                    wait = limiter.timeout
+                    if left is not None and (wait is None or left < wait):
+                        wait = left
+                    allowed = limiter.acquire(public_key, timeout=wait)
+                    if record is not None:
+                        record.throttle_time += time.time() - start
+                    if not allowed:
+                        left = deadline_left(expires, path, record)
+                        if record is not None:
+                            record.error = 'RateLimited'
+                        return None
+                try:
+                    if hedging is not None:
+                        status, content = hedged_call(public_key, private_key, method, path, data, record,
+                                                      hedging, left)
+                    else:
+                        status, content = call(public_key, private_key, method, path, data, record, None, left)
+                except Exception as err:
+                    if record is not None:
+                        (record.status, record.error) = (None, err.__class__.__name__)
+                    # socket (and ssl) are imported by the connection pool, not with this module
+                    import socket
+                    from ConnectionPool import PoolTimeoutError
+                    if isinstance(err, PoolTimeoutError):
+                        # no connection was free, so the request never reached the server
+                        breaker.release()
+                        settled = True
+                    elif isinstance(err, socket.timeout):
+                        # the server did not answer in time, which counts against it whatever the deadline
+                        breaker.record_failure()
+                        settled = True
+                    if settled and expires is not None:
+                        # the timeout may have been the rest of the deadline, give or take the clock resolution
+                        deadline_left(expires - 0.01, path, record)
+                    if not policy.retryable_error(err):
+                        raise
+                    if not settled:
+                        breaker.record_failure()
+                        settled = True
+                else:
+                    if record is not None:
+                        (record.status, record.error) = (status, None)
+                    if not policy.retryable_status(status):
+                        breaker.record_success()
+                        settled = True
+                        if status != 200:
+                            if errors is not None:
+                                errors(status)
+                            return None
+                        if not decode:
+                            return content
+                        deadline_left(expires, path, record)
+                        start = time.time()
+                        try:
+                            return json.loads(content)
+                        finally:
+                            if record is not None:
+                                record.decode_time = time.time() - start
+                    breaker.record_failure()
+                    settled = True
+            finally:
+                if not settled:
+                    breaker.release()
+
+            if attempt >= policy.max_retries:
+                if errors is not None and status is not None:
+                    errors(status)
+                return None
+            pause = policy.delay(attempt)
+            if expires is not None and time.time() + pause >= expires:
+                # the back off would use up the rest of the deadline
+                if record is not None:
+                    record.error = 'DeadlineExceeded'
+                raise DeadlineExceededError(DeadlineExceededError.REQUEST_TIMEOUT,
+                                            "The deadline for %s would pass before the next attempt" % (path))
+            time.sleep(pause)
+            attempt += 1
+            if record is not None:
+                record.retries = attempt
+    finally:
+        if record is not None:
+            registry.record(record)
+
+
+def cat_maybe_values(d):
     d_ = dict()
     for k,v in d.iteritems():
         if v != None:
             d_[k] = v
-    return d_
\ No newline at end of file
+    return d_
+
+
+def parallel_map(function, items, concurrency=4, ordered=True):
+    """Apply function to every item on a bounded pool of worker threads.
+
+    The items are consumed lazily: no more than 3 * concurrency items are taken
+    from the iterable before their results are yielded, so a slow consumer (or,
+    when ordered, a slow item) holds back the workers rather than letting the
+    results pile up. An exception raised for one item is reported with that
+    item and does not stop the others.
+
+    @type function: function taking a single item
+    @type items: iterable
+    @type concurrency: int -- the number of worker threads
+    @type ordered: bool -- yield the results in input order, rather than as they complete
+
+    @returns a generator of tuples (index of the item, result, exception or None)
+    """
+    pending = Queue.Queue(2 * concurrency)
+    done = Queue.Queue()
+    stop = threading.Event()
+    # a token per item taken from the iterable and not yet yielded, which bounds done and waiting
+    tokens = Queue.Queue()
+    for _ in xrange(3 * concurrency):
+        tokens.put(None)
+
+    def feed():
+        count = 0
+        error = None
+        try:
+            for item in items:
+                while not stop.is_set():
+                    try:
+                        tokens.get(timeout=0.1)
+                        break
+                    except Queue.Empty:
+                        pass
+                while not stop.is_set():
+                    try:
+                        pending.put((count, item), timeout=0.1)
+                        break
+                    except Queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+                count += 1
+        except Exception as err:
+            error = err
+        finally:
+            # the end marker goes through done, behind the results of the items taken, so that the
+            # consumer cannot finish before it has seen a failure of the iterable
+            done.put((None, count, error))
+            if not stop.is_set():
+                for _ in xrange(concurrency):
+                    pending.put(None)
+
+    def work():
+        while not stop.is_set():
+            try:
+                job = pending.get(timeout=0.1)
+            except Queue.Empty:
+                continue
+            if job is None:
+                return
+            (index, item) = job
+            try:
+                done.put((index, function(item), None))
+            except Exception as err:
+                done.put((index, None, err))
+
+    threads = [threading.Thread(target=feed)] + [threading.Thread(target=work) for _ in xrange(concurrency)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    waiting = {}
+    produced = 0
+    total = None
+    try:
+        while total is None or produced < total:
+            try:
+                (index, result, error) = done.get(timeout=0.1)
+            except Queue.Empty:
+                continue
+            if index is None:
+                if error is not None:
+                    # the iterable itself failed
+                    raise error
+                total = result
+                continue
+            if not ordered:
+                produced += 1
+                tokens.put(None)
+                yield index, result, error
+                continue
+            waiting[index] = (result, error)
+            while produced in waiting:
+                (result, error) = waiting.pop(produced)
+                tokens.put(None)
+                yield produced, result, error
+                produced += 1
+    finally:
+        stop.set()
+
+
+def paginate(fetch, page_size=100, prefetch=True):
+    """Iterate over a list kept by Mollom, fetching it one page at a time.
+
+    At most two pages are held in memory: the one being consumed and, with
+    prefetch, the next one, which is fetched in the background meanwhile. The
+    pages are requested by offset, so entries added or removed during the
+    iteration may be skipped or returned twice.
+
+    @type fetch: function (offset, count) returning the decoded answer of the list call, or None on failure
+    @type page_size: int -- the number of items requested per call
+    @type prefetch: bool -- fetch the next page while the current one is consumed
+
+    @returns a generator of the list items; an IOError is raised when a page cannot be fetched
+    """
+    def page(offset):
+        answer = fetch(offset, page_size)
+        if answer is None:
+            raise IOError("Fetching the list failed at offset %d" % (offset))
+        return answer
+
+    def background(offset):
+        result = Queue.Queue(1)
+
+        def run():
+            try:
+                result.put((page(offset), None))
+            except Exception as err:
+                result.put((None, err))
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        return result
+
+    offset = 0
+    answer = page(offset)
+    while True:
+        items = answer.get('list') or []
+        offset = int(answer.get('listOffset', offset)) + len(items)
+        total = answer.get('listTotal')
+        more = len(items) >= page_size and (total is None or offset < int(total))
+        upcoming = more and prefetch and background(offset) or None
+        answer = None
+        for item in items:
+            yield item
+        if not more:
+            return
+        if upcoming is None:
+            answer = page(offset)
+        else:
+            (answer, error) = upcoming.get()
+            if error is not None:
+                raise error
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the metrics recorded for the calls to the
+# Mollom service
+# ---------------------------------------------------------------------
+
+import threading
+
+
+class CallRecord(object):
+    """The measurements of a single API call, including its retries.
+
+    Times are in seconds and summed over the attempts. The byte counts are those
+    of the request and response bodies. The status is that of the last attempt,
+    and None when it failed without a response, in which case error holds the
+    name of the exception. For a hedged call, the measurements are those of the
+    request whose answer was used.
+    """
+
+    __slots__ = ( 'method', 'path', 'endpoint', 'status', 'error', 'bytes_sent', 'bytes_received'
+                , 'sign_time', 'network_time', 'decode_time', 'throttle_time', 'retries', 'hedged')
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.endpoint = path.split('/', 1)[0]
+        self.status = None
+        self.error = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.sign_time = 0.0
+        self.network_time = 0.0
+        self.decode_time = 0.0
+        self.throttle_time = 0.0
+        self.retries = 0
+        self.hedged = False
+
+    def add(self, other):
+        """Add the times and byte counts measured in another record, e.g. of a single request."""
+        self.bytes_sent += other.bytes_sent
+        self.bytes_received += other.bytes_received
+        self.sign_time += other.sign_time
+        self.network_time += other.network_time
+
+
+class Histogram(object):
+    """Counts observations in buckets with the given upper bounds, like a Prometheus histogram."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for (i, bound) in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        """Returns the (upper bound, number of observations <= bound) pairs."""
+        total = 0
+        for (bound, count) in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+TIME_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    return ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for (name, value) in zip(names, values))
+
+
+class Metrics(object):
+    """Aggregates the call records into counters and histograms, per endpoint.
+
+    Callbacks added with add_callback are called with every CallRecord, e.g., to
+    forward the measurements to another metrics system. The aggregates can be
+    exported in the Prometheus text format with prometheus().
+    """
+
+    def __init__(self, buckets=TIME_BUCKETS):
+        self.buckets = buckets
+        self.callbacks = []
+        self.lock = threading.Lock()
+        self.requests = {}    # (endpoint, method, status) -> count
+        self.retries = {}     # endpoint -> count
+        self.hedges = {}      # endpoint -> count
+        self.sent = {}        # endpoint -> bytes
+        self.received = {}    # endpoint -> bytes
+        self.times = {}       # (phase, endpoint) -> Histogram
+
+    def add_callback(self, callback):
+        """Register a function to be called with the CallRecord of every call."""
+        self.callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self.callbacks.remove(callback)
+
+    def __histogram(self, phase, endpoint):
+        histogram = self.times.get((phase, endpoint))
+        if histogram is None:
+            histogram = self.times[(phase, endpoint)] = Histogram(self.buckets)
+        return histogram
+
+    def record(self, call):
+        """Add the measurements of a call."""
+        endpoint = call.endpoint
+        status = call.status if call.status is not None else call.error
+        with self.lock:
+            key = (endpoint, call.method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.retries[endpoint] = self.retries.get(endpoint, 0) + call.retries
+            if call.hedged:
+                self.hedges[endpoint] = self.hedges.get(endpoint, 0) + 1
+            self.sent[endpoint] = self.sent.get(endpoint, 0) + call.bytes_sent
+            self.received[endpoint] = self.received.get(endpoint, 0) + call.bytes_received
+            self.__histogram('sign', endpoint).observe(call.sign_time)
+            self.__histogram('network', endpoint).observe(call.network_time)
+            if call.decode_time:
+                self.__histogram('decode', endpoint).observe(call.decode_time)
+            if call.throttle_time:
+                self.__histogram('throttle', endpoint).observe(call.throttle_time)
+        for callback in self.callbacks:
+            callback(call)
+
+    def prometheus(self):
+        """Returns the aggregates in the Prometheus text exposition format."""
+        lines = []
+
+        def counter(name, help, values, label_names):
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s counter' % (name))
+            for (labels, value) in sorted(values.iteritems()):
+                if not isinstance(labels, tuple):
+                    labels = (labels,)
+                lines.append('%s{%s} %s' % (name, _labels(label_names, labels), value))
+
+        with self.lock:
+            counter('mollom_requests_total', 'API calls by endpoint, method and final status.',
+                    self.requests, ('endpoint', 'method', 'status'))
+            counter('mollom_retries_total', 'Retried attempts.', self.retries, ('endpoint',))
+            counter('mollom_hedged_total', 'Calls sent to an alternate server as well.', self.hedges, ('endpoint',))
+            counter('mollom_sent_bytes_total', 'Request body bytes sent.', self.sent, ('endpoint',))
+            counter('mollom_received_bytes_total', 'Response body bytes received.', self.received, ('endpoint',))
+            for phase in ('sign', 'network', 'decode', 'throttle'):
+                name = 'mollom_%s_seconds' % (phase)
+                histograms = sorted((endpoint, h) for ((p, endpoint), h) in self.times.iteritems() if p == phase)
+                if not histograms:
+                    continue
+                lines.append('# HELP %s Time spent in the %s phase of API calls.' % (name, phase))
+                lines.append('# TYPE %s histogram' % (name))
+                for (endpoint, histogram) in histograms:
+                    for (bound, count) in histogram.cumulative():
+                        lines.append('%s_bucket{%s} %d' % (name, _labels(('endpoint', 'le'), (endpoint, bound)), count))
+                    lines.append('%s_bucket{%s} %d' % (name, _labels(('endpoint', 'le'), (endpoint, '+Inf')), histogram.count))
+                    lines.append('%s_sum{%s} %r' % (name, _labels(('endpoint',), (endpoint,)), histogram.sum))
+                    lines.append('%s_count{%s} %d' % (name, _labels(('endpoint',), (endpoint,)), histogram.count))
+        return '\n'.join(lines) + '\n'
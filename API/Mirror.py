@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the base class for local copies of site lists
+# kept by Mollom, such as the blacklist and the whitelist
+# ---------------------------------------------------------------------
+
+import threading
+import time
+
+
+class Mirror(object):
+    """A locally synced copy of a list kept by Mollom.
+
+    The entries are fetched with the given function and compiled into an index by
+    build_index, which subclasses provide. Lookups never wait for Mollom: the first
+    one, and the first one after the refresh interval has passed, start a refresh in
+    the background, and the current index is used until the new one is ready. Until
+    the first refresh completes, the index is empty; call refresh to load it up front.
+
+    Only one refresh runs at a time. After a failed refresh the next one waits
+    retry_interval seconds, doubling with every failure up to the refresh interval,
+    and the entries fetched before are used meanwhile.
+    """
+
+    def __init__(self, fetch, refresh_interval=300, retry_interval=10):
+        """
+        @type fetch: function returning the list of entries, or None on failure
+        @type refresh_interval: the number of seconds after which the mirror is refreshed
+        @type retry_interval: the number of seconds to wait after the first failed refresh
+        """
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.index = self.build_index([])
+        self.refreshed = None
+        self.failures = 0
+        self.retry_at = 0
+        self.__refreshing = threading.Lock()
+
+    def build_index(self, entries):
+        raise NotImplementedError
+
+    def refresh(self):
+        """Fetch the entries and replace the local copy.
+
+        @returns True if the entries were fetched, False if the previous copy is kept
+        """
+        entries = None
+        try:
+            entries = self.fetch()
+        finally:
+            if entries is None:
+                self.failures += 1
+                self.retry_at = time.time() + min(self.refresh_interval,
+                                                  self.retry_interval * 2 ** (self.failures - 1))
+        if entries is None:
+            return False
+        self.index = self.build_index(entries)
+        self.refreshed = time.time()
+        self.failures = 0
+        return True
+
+    def __refresh_in_background(self):
+        if not self.__refreshing.acquire(False):
+            return
+
+        def run():
+            try:
+                self.refresh()
+            except Exception:
+                # counted as a failed refresh, the previous copy is kept
+                pass
+            finally:
+                self.__refreshing.release()
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def current(self):
+        """Returns the index to use for a lookup, refreshing it in the background when it is out of date."""
+        now = time.time()
+        if (self.refreshed is None or now - self.refreshed > self.refresh_interval) and now >= self.retry_at:
+            self.__refresh_in_background()
+        return self.index
+
+    def match(self, data):
+        """Find an entry matching the content.
+
+        @type data: dict -- the content fields, as sent to Mollom (postTitle, authorMail, ...)
+
+        @returns the matching entry or None
+        """
+        return self.current().match(data)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the local pre-filters, which reject obvious bot
+# submissions before the content is sent to Mollom
+# ---------------------------------------------------------------------
+
+import re
+import socket
+
+from BlacklistMirror import LINK_RE
+from Encoder import text
+
+# the largest sizes the Mollom service accepts for the content fields, in characters; the
+# post body has no limit, since large posts are sent compressed, see API.Compression
+FIELD_LIMITS = { 'postTitle': 255
+               , 'authorName': 255
+               , 'authorUrl': 2048
+               , 'authorMail': 254
+               , 'authorOpenid': 2048
+               , 'authorIp': 45
+               , 'authorId': 255
+               }
+
+# a DNS label, after IDNA encoding; underscores occur in real host names, so they are let through
+LABEL_RE = re.compile(r"^[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?$", re.IGNORECASE)
+# the characters that cannot occur in an e-mail address or URL as typed into a form
+INVALID_RE = re.compile(r"[\s<>\"]")
+
+
+def valid_host(host):
+    """Check a host name, an IPv4 address or a bracketed IPv6 address. Internationalised
+    names are checked after IDNA encoding.
+
+    @returns True for a valid host, False for a malformed one, and None when the host
+             cannot be checked locally, e.g. a label IDNA cannot encode
+    """
+    if host.startswith('[') and host.endswith(']'):
+        try:
+            socket.inet_pton(socket.AF_INET6, host[1:-1])
+            return True
+        except (socket.error, ValueError):
+            # e.g. an IPvFuture literal
+            return None
+    if host.endswith('.'):
+        host = host[:-1]
+    if not all(host.split('.')):
+        return False
+    try:
+        host = host.encode('idna')
+    except UnicodeError:
+        return None
+    return all(LABEL_RE.match(label) for label in host.split('.'))
+
+
+class Honeypot(object):
+    """Rejects content with a filled honeypot field.
+
+    The honeypot is a form field hidden from people, so only bots fill it in.
+    """
+
+    def __call__(self, data):
+        if data.get('honeypot'):
+            return ('spam', 'honeypot')
+        return None
+
+
+class LinkCount(object):
+    """Classifies content with more than max_links links in its title and body."""
+
+    def __init__(self, max_links=10, classification='spam'):
+        self.max_links = max_links
+        self.classification = classification
+
+    def __call__(self, data):
+        links = 0
+        for field in ('postTitle', 'postBody'):
+            if data.get(field):
+                links += len(LINK_RE.findall(data[field]))
+                if links > self.max_links:
+                    return (self.classification, 'links')
+        return None
+
+
+class FieldLength(object):
+    """Rejects content with a field longer than its limit.
+
+    @type limits: dict -- field name, as sent to Mollom, -> largest number of characters.
+                  Defaults to FIELD_LIMITS; fields without a limit are not checked.
+    """
+
+    def __init__(self, limits=None, classification='spam'):
+        self.limits = limits if limits is not None else FIELD_LIMITS
+        self.classification = classification
+
+    def __call__(self, data):
+        for (field, limit) in self.limits.iteritems():
+            value = data.get(field)
+            if value is not None and len(text(value)) > limit:
+                return (self.classification, 'oversized %s' % (field))
+        return None
+
+
+class MailFormat(object):
+    """Rejects content with an author e-mail address that cannot be delivered to.
+
+    The domain may be internationalised, a single label such as localhost, or an address
+    literal. Addresses that cannot be checked locally are left to Mollom.
+    """
+
+    def __init__(self, classification='spam'):
+        self.classification = classification
+
+    def __call__(self, data):
+        mail = data.get('authorMail')
+        if not mail:
+            return None
+        mail = text(mail).strip()
+        (local, separator, domain) = mail.rpartition('@')
+        if not separator or not local or not domain or INVALID_RE.search(mail) or valid_host(domain) is False:
+            return (self.classification, 'malformed authorMail')
+        return None
+
+
+class UrlFormat(object):
+    """Rejects content with an author URL or Open ID that is not a valid http(s) URL.
+
+    A URL without a scheme, such as example.com, is checked as an http URL. URLs
+    with another scheme, such as ftp:// URLs, and hosts that cannot be checked
+    locally are left to Mollom.
+    """
+
+    def __init__(self, fields=('authorUrl', 'authorOpenid'), classification='spam'):
+        self.fields = fields
+        self.classification = classification
+
+    def __call__(self, data):
+        for field in self.fields:
+            url = data.get(field)
+            if not url:
+                continue
+            url = text(url).strip()
+            (scheme, separator, rest) = url.partition('://')
+            if not separator:
+                rest = url
+            elif scheme.lower() not in ('http', 'https'):
+                continue
+            if INVALID_RE.search(rest) or self.__valid_authority(re.split(r'[/?#]', rest, 1)[0]) is False:
+                return (self.classification, 'malformed %s' % (field))
+        return None
+
+    def __valid_authority(self, authority):
+        """Check the [user[:password]@]host[:port] part of a URL, see valid_host."""
+        host = authority.rpartition('@')[2]
+        if host.startswith('['):
+            (host, _, port) = host.partition(']')
+            host += ']'
+            if port and not port.startswith(':'):
+                return False
+            port = port[1:]
+        else:
+            (host, _, port) = host.partition(':')
+        if not host or (port and not (port.isdigit() and int(port) <= 65535)):
+            return False
+        return valid_host(host)
+
+
+class PreFilter(object):
+    """A chain of local checks, run by Content.checkContent before calling Mollom.
+
+    A stage is any callable taking the content fields, as sent to Mollom (postTitle,
+    authorMail, honeypot, ...), and returning None to pass the content on to the next
+    stage, or a (classification, reason) tuple to classify it without calling Mollom.
+    The first stage that classifies the content wins, so cheap and certain stages go first.
+
+    The hits counter per reason shows what the chain catches.
+    """
+
+    def __init__(self, stages=None):
+        """
+        @type stages: list of callables -- defaults to default_stages()
+        """
+        self.stages = list(stages) if stages is not None else default_stages()
+        self.hits = {}
+        self.passed = 0
+
+    def add(self, stage):
+        """Append a stage to the chain."""
+        self.stages.append(stage)
+
+    def check(self, data):
+        """Run the stages on the content fields.
+
+        @returns a (classification, reason) tuple, or None when no stage classified the content
+        """
+        for stage in self.stages:
+            result = stage(data)
+            if result is not None:
+                reason = result[1]
+                self.hits[reason] = self.hits.get(reason, 0) + 1
+                return result
+        self.passed += 1
+        return None
+
+    def stats(self):
+        """Returns a dict with the number of hits per reason and the number of submissions passed on."""
+        return { 'hits': dict(self.hits)
+               , 'passed': self.passed
+               }
+
+
+def default_stages():
+    """The built-in stages, cheapest first."""
+    return [Honeypot(), FieldLength(), MailFormat(), UrlFormat(), LinkCount()]
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the client side rate limiter that keeps the
+# processes on a host within the request rate of a Mollom key pair
+# ---------------------------------------------------------------------
+
+"""Client side rate limiting, shared by the processes on a host.
+
+Every key pair gets a token bucket, kept in a small memory mapped file named
+after the public key, so all processes using the same directory (e.g., /dev/shm)
+draw from the same bucket. Tokens are added at rate per second, up to burst, and
+every request to Mollom takes one. Access to the bucket is serialised with a lock
+on the file, and with a thread lock within the process.
+
+Callers can either wait until a token is available (optionally up to a timeout),
+or try to take one without waiting.
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+
+class TokenBucket(object):
+    """A token bucket stored in a memory mapped file, shared by the processes that open it.
+
+    The rate and burst are not stored in the file, so all processes sharing the
+    bucket should use the same values.
+
+    @type path: string -- the file holding the bucket, created when it does not exist
+    @type rate: float -- the number of tokens added per second
+    @type burst: float -- the maximal number of tokens in the bucket
+    """
+
+    # tokens, time of the last update
+    STATE = struct.Struct('dd')
+
+    def __init__(self, path, rate, burst):
+        self.path = path
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.lock = threading.Lock()
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.fd).st_size != self.STATE.size:
+                os.ftruncate(self.fd, self.STATE.size)
+                os.write(self.fd, self.STATE.pack(self.burst, time.time()))
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.map = mmap.mmap(self.fd, self.STATE.size)
+
+    def __take(self, tokens):
+        """Take the tokens if they are available.
+
+        @returns 0 when the tokens were taken, otherwise the number of seconds until they will be
+        """
+        with self.lock:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                (available, updated) = self.STATE.unpack_from(self.map, 0)
+                now = time.time()
+                # the clock may have been set back, in which case no tokens are added
+                available = min(self.burst, available + max(0.0, now - updated) * self.rate)
+                if available >= tokens:
+                    self.STATE.pack_into(self.map, 0, available - tokens, now)
+                    return 0
+                self.STATE.pack_into(self.map, 0, available, now)
+                return (tokens - available) / self.rate
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def try_acquire(self, tokens=1):
+        """Take the tokens without waiting.
+
+        @returns True if they were taken, False if the bucket holds too few tokens
+        """
+        if tokens > self.burst:
+            raise ValueError("cannot take %s tokens from a bucket holding at most %s" % (tokens, self.burst))
+        return self.__take(tokens) == 0
+
+    def acquire(self, tokens=1, timeout=None):
+        """Take the tokens, waiting until they are available.
+
+        @type timeout: float -- the maximal number of seconds to wait, None waits as long as needed
+
+        @returns True if the tokens were taken, False if that was not possible within the timeout
+        """
+        if tokens > self.burst:
+            raise ValueError("cannot take %s tokens from a bucket holding at most %s" % (tokens, self.burst))
+        deadline = timeout is not None and time.time() + timeout or None
+        while True:
+            wait = self.__take(tokens)
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining < wait:
+                    return False
+            # other processes may take the tokens first, so check again after waiting
+            time.sleep(wait)
+
+    def available(self):
+        """Returns the number of tokens currently in the bucket."""
+        with self.lock:
+            fcntl.flock(self.fd, fcntl.LOCK_SH)
+            try:
+                (available, updated) = self.STATE.unpack_from(self.map, 0)
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+        return min(self.burst, available + max(0.0, time.time() - updated) * self.rate)
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+
+
+class RateLimiter(object):
+    """Hands out the token buckets for the key pairs, and takes a token for every request.
+
+    Keyword arguments:
+    rate       -- the number of requests per second allowed for a key pair
+    burst      -- the number of requests that can be made at once after being idle, defaults to rate
+    directory  -- the directory holding the bucket files, defaults to /dev/shm when available
+    block      -- when True, acquire waits for a token, otherwise it fails right away
+    timeout    -- the maximal number of seconds acquire waits, None waits as long as needed
+    """
+
+    def __init__(self, rate, burst=None, directory=None, block=True, timeout=None):
+        if directory is None:
+            directory = os.path.isdir('/dev/shm') and '/dev/shm' or tempfile.gettempdir()
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self.directory = directory
+        self.block = block
+        self.timeout = timeout
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, public_key):
+        """Returns the token bucket for the key pair, opening it on first use."""
+        bucket = self.buckets.get(public_key)
+        if bucket is None:
+            with self.lock:
+                bucket = self.buckets.get(public_key)
+                if bucket is None:
+                    name = 'pymollom-%s.bucket' % hashlib.sha1(public_key).hexdigest()
+                    bucket = self.buckets[public_key] = TokenBucket(os.path.join(self.directory, name),
+                                                                    self.rate, self.burst)
+        return bucket
+
+    def acquire(self, public_key, block=None, timeout=None):
+        """Take a token for a request with the key pair.
+
+        @type block: bool -- overrides the block setting of the limiter
+        @type timeout: float -- overrides the timeout setting of the limiter
+
+        @returns True if a request may be made, False otherwise
+        """
+        bucket = self.bucket(public_key)
+        if block is None:
+            block = self.block
+        if not block:
+            return bucket.try_acquire()
+        return bucket.acquire(timeout=timeout if timeout is not None else self.timeout)
+
+    def try_acquire(self, public_key):
+        """Take a token for a request with the key pair, without waiting."""
+        return self.bucket(public_key).try_acquire()
+
+    def close(self):
+        with self.lock:
+            for bucket in self.buckets.values():
+                bucket.close()
+            self.buckets.clear()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the base class for the compact, immutable
+# objects holding the answers of the Mollom service
+# ---------------------------------------------------------------------
+
+
+def compact(value):
+    """Store ASCII text as str, which takes less memory than unicode, and lists as tuples."""
+    if isinstance(value, unicode):
+        try:
+            return value.encode('ascii')
+        except UnicodeError:
+            return value
+    if isinstance(value, list):
+        return tuple(compact(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((compact(k), compact(v)) for (k, v) in value.iteritems()))
+    return value
+
+
+class Response(object):
+    """An answer of the Mollom service, holding only the fields listed in FIELDS.
+
+    FIELDS is a tuple of (JSON field name, attribute name) pairs; subclasses list the
+    attribute names in __slots__ as well, so instances carry no per-instance dict.
+    Fields that are absent in the answer are None. Instances cannot be modified.
+
+    The JSON field names can be used as keys, so code that used the decoded dict
+    keeps working: response['spamScore'] is response.spam_score.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, **fields):
+        for (_, attribute) in self.FIELDS:
+            object.__setattr__(self, attribute, fields.get(attribute))
+
+    @classmethod
+    def fromJSON(cls, js):
+        """Build the response from the decoded JSON answer, dropping the fields that are not kept."""
+        response = cls.__new__(cls)
+        for (field, attribute) in cls.FIELDS:
+            object.__setattr__(response, attribute, compact(js.get(field)))
+        return response
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % (self.__class__.__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("%s is immutable" % (self.__class__.__name__))
+
+    def __getitem__(self, field):
+        for (name, attribute) in self.FIELDS:
+            if name == field:
+                return getattr(self, attribute)
+        raise KeyError(field)
+
+    def __contains__(self, field):
+        return any(name == field and getattr(self, attribute) is not None for (name, attribute) in self.FIELDS)
+
+    def get(self, field, default=None):
+        try:
+            value = self[field]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def to_dict(self):
+        """Returns the fields that are set, keyed on their JSON names."""
+        return dict((field, getattr(self, attribute)) for (field, attribute) in self.FIELDS
+                    if getattr(self, attribute) is not None)
+
+    def __getstate__(self):
+        return tuple(getattr(self, attribute) for (_, attribute) in self.FIELDS)
+
+    def __setstate__(self, state):
+        for ((_, attribute), value) in zip(self.FIELDS, state):
+            object.__setattr__(self, attribute, value)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.__getstate__() == other.__getstate__()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.__getstate__())
+
+    def __repr__(self):
+        return "%s(%s)" % ( self.__class__.__name__
+                          , ', '.join("%s=%r" % (attribute, getattr(self, attribute)) for (_, attribute) in self.FIELDS
+                                      if getattr(self, attribute) is not None))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the retry policy and circuit breakers used by
+# the calls to the Mollom service
+# ---------------------------------------------------------------------
+
+import httplib
+import random
+import threading
+import time
+
+
+class CircuitBreaker(object):
+    """Tracks the failures of an endpoint and fails fast while it is degraded.
+
+    The breaker is closed as long as calls succeed. After failure_threshold
+    successive failures it opens, and calls are refused without contacting the
+    endpoint. After reset_timeout seconds, a single trial call is let through
+    (half open): when it succeeds the breaker closes, otherwise it opens again.
+
+    Every call allowed through must end in record_success, record_failure or
+    release, which hands the trial back when the call did not reach the endpoint.
+    A trial that is not settled within reset_timeout seconds is given to the
+    next call, so a lost trial cannot keep the breaker half open.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = None
+        self.trial = None    # when the trial call of the half open breaker was let through
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Returns True if a call may be made."""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.time()
+            if self.state == self.OPEN and now - self.opened >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial = now
+                return True
+            if self.state == self.HALF_OPEN and now - self.trial >= self.reset_timeout:
+                self.trial = now
+                return True
+            return False
+
+    def release(self):
+        """Settle a call that was allowed but did not reach the endpoint, e.g. because it was
+        rate limited. A trial call is handed back, so the next call can make it.
+        """
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened = time.time()
+
+
+class RetryPolicy(object):
+    """Decides which failed calls are retried and how long to wait in between.
+
+    Keyword arguments:
+    max_retries       (optional) -- The number of retries after the first attempt. Defaults to 2.
+    backoff           (optional) -- The base delay in seconds. Defaults to 0.1.
+    multiplier        (optional) -- The factor the delay grows with after every retry. Defaults to 2.
+    max_backoff       (optional) -- The maximal delay in seconds. Defaults to 5.
+    retry_statuses    (optional) -- The HTTP statuses that are retried. Defaults to 429 and the 5xx
+                                    statuses that indicate a temporary server problem.
+    retry_exceptions  (optional) -- The exceptions that are retried. Defaults to network errors.
+    failure_threshold (optional) -- The number of successive failures that opens the circuit
+                                    breaker of an endpoint. Defaults to 5.
+    reset_timeout     (optional) -- The number of seconds an open circuit breaker waits before
+                                    letting a trial call through. Defaults to 30.
+
+    The delay before retry n (counting from 0) is drawn uniformly from
+    [0, min(max_backoff, backoff * multiplier ** n)], so clients that failed at
+    the same time do not retry at the same time.
+    """
+
+    def __init__( self
+                , max_retries=2
+                , backoff=0.1
+                , multiplier=2
+                , max_backoff=5.0
+                , retry_statuses=(429, 500, 502, 503, 504)
+                , retry_exceptions=(IOError, httplib.HTTPException)
+                , failure_threshold=5
+                , reset_timeout=30.0):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_exceptions = tuple(retry_exceptions)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.__breakers = {}
+        self.__lock = threading.Lock()
+
+    def retryable_status(self, status):
+        return status in self.retry_statuses
+
+    def retryable_error(self, error):
+        return isinstance(error, self.retry_exceptions)
+
+    def delay(self, attempt):
+        """Returns the number of seconds to wait before retry attempt (counting from 0)."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * self.multiplier ** attempt))
+
+    def breaker(self, endpoint):
+        """Returns the circuit breaker for the endpoint, creating it on first use."""
+        with self.__lock:
+            breaker = self.__breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self.__breakers[endpoint] = breaker
+            return breaker
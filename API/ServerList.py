@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the server list cache shared by the processes
+# on a host
+# ---------------------------------------------------------------------
+
+import fcntl
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+
+class ServerListCache(object):
+    """A server list cached in a file, shared by all processes using the same path.
+
+    The list is refreshed once its age exceeds the timeout, computed as the number
+    of days plus the number of hours, like the MollomAPI timeout. Refreshing holds
+    an exclusive lock on path.lock, so when several processes find the list out of
+    date at the same time, only one of them fetches it. The file is replaced
+    atomically, so readers never see a partially written list.
+
+    Reading is cheap: the file is only read again (through mmap) when it changed
+    since the previous read in this process.
+    """
+
+    def __init__(self, path, fetch, timeoutDays=7, timeoutHours=0):
+        """
+        @type path: string -- the cache file
+        @type fetch: function returning the server list, or None on failure
+        @type timeoutDays: int
+        @type timeoutHours: int
+        """
+        self.path = path
+        self.fetch = fetch
+        self.timeout = timeoutDays * 86400 + timeoutHours * 3600
+        self.__stat = None
+        self.__cached = None
+        self.__lock = threading.Lock()
+
+    def __read(self):
+        """Returns the cached (time fetched, servers) tuple, or None if there is no cache file."""
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            st = os.fstat(fd)
+            stat = (st.st_ino, st.st_mtime, st.st_size)
+            if stat == self.__stat:
+                return self.__cached
+            if st.st_size == 0:
+                return None
+            m = mmap.mmap(fd, st.st_size, access=mmap.ACCESS_READ)
+            try:
+                js = json.loads(m[:])
+            finally:
+                m.close()
+            self.__stat = stat
+            self.__cached = (js['fetched'], js['servers'])
+            return self.__cached
+        except (ValueError, KeyError):
+            return None
+        finally:
+            os.close(fd)
+
+    def load(self):
+        """Returns the cached server list if it has not timed out, otherwise None."""
+        cached = self.__read()
+        if cached is None or time.time() - cached[0] > self.timeout:
+            return None
+        return cached[1]
+
+    def store(self, servers):
+        """Replace the cached server list."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        (fd, temporary) = tempfile.mkstemp(dir=directory, prefix='.serverlist')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'fetched': time.time(), 'servers': list(servers)}, f)
+            os.rename(temporary, self.path)
+        except:
+            os.unlink(temporary)
+            raise
+
+    def get(self):
+        """Returns the server list, refreshing it when it has timed out.
+
+        When the refresh fails, the out of date list is returned, if there is one.
+        """
+        servers = self.load()
+        if servers is not None:
+            return servers
+
+        with self.__lock:
+            lock = open(self.path + '.lock', 'a')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                # another process may have refreshed the list while we waited for the lock
+                servers = self.load()
+                if servers is not None:
+                    return servers
+                servers = self.fetch()
+                if servers:
+                    self.store(servers)
+                    return servers
+                cached = self.__read()
+                return cached and cached[1] or None
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                lock.close()
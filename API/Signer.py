@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains the OAuth 1.0 HMAC-SHA1 request signer for a
+# Mollom key pair
+# ---------------------------------------------------------------------
+
+import binascii
+import hashlib
+import hmac
+import os
+import time
+
+# the unreserved characters of RFC 3986 are kept, all other bytes are percent-encoded;
+# this is urllib.quote(value, safe='~'), without importing urllib and, through it, ssl
+UNRESERVED = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~'
+ESCAPES = dict((chr(i), chr(i) in UNRESERVED and chr(i) or '%%%02X' % i) for i in range(256))
+
+
+def escape(value):
+    """Percent-encode a value as required by OAuth 1.0 (RFC 5849, section 3.6)."""
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    elif not isinstance(value, str):
+        value = str(value)
+    if not value.strip(UNRESERVED):
+        return value
+    return ''.join(map(ESCAPES.__getitem__, value))
+
+
+def encode_pairs(parameters):
+    """Percent-encode a dict of request parameters into a list of (name, value) pairs.
+
+    A list or tuple value results in one pair per element, as the REST API expects
+    for multi-valued parameters.
+    """
+    pairs = []
+    for (name, value) in parameters.iteritems():
+        name = escape(name)
+        if isinstance(value, (list, tuple)):
+            pairs.extend((name, escape(v)) for v in value)
+        else:
+            pairs.append((name, escape(value)))
+    return pairs
+
+
+class Signer(object):
+    """Signs requests with a Mollom key pair, using two-legged OAuth 1.0 with HMAC-SHA1.
+
+    The work that does not depend on the request is done once, when the signer is
+    created: the HMAC key state and the encoded constant OAuth parameters. Signing
+    a request copies the HMAC state and only encodes the request parameters.
+
+    A signer holds no per-request state, so it can be shared between threads.
+    """
+
+    def __init__(self, public_key, private_key):
+        self.public_key = public_key
+        self.__hmac = hmac.new(escape(private_key) + '&', digestmod=hashlib.sha1)
+        self.__constant = [ ('oauth_consumer_key', escape(public_key))
+                          , ('oauth_signature_method', 'HMAC-SHA1')
+                          , ('oauth_version', '1.0')
+                          ]
+        self.__header = 'OAuth realm="", oauth_consumer_key="%s", oauth_signature_method="HMAC-SHA1", oauth_version="1.0"' % (escape(public_key))
+
+    def signature(self, method, url, parameters, nonce, timestamp):
+        """Compute the signature of a request.
+
+        @type method: the HTTP method (POST, GET, ...)
+        @type url: string -- the request URL without query string
+        @type parameters: dict with the request parameters (query or form encoded body), or a list
+                          of percent-encoded (name, value) pairs, see encode_pairs
+        @type nonce: string
+        @type timestamp: string
+
+        @returns the base64 encoded signature
+        """
+        if isinstance(parameters, dict):
+            pairs = encode_pairs(parameters)
+        else:
+            pairs = list(parameters)
+        pairs.extend(self.__constant)
+        pairs.append(('oauth_nonce', nonce))
+        pairs.append(('oauth_timestamp', timestamp))
+        pairs.sort()
+        normalised = '&'.join(['%s=%s' % pair for pair in pairs])
+
+        digest = self.__hmac.copy()
+        digest.update('%s&%s&%s' % (method.upper(), escape(url), escape(normalised)))
+        return binascii.b2a_base64(digest.digest())[:-1]
+
+    def sign(self, method, url, parameters, nonce=None, timestamp=None):
+        """Sign a request.
+
+        @returns the value of the Authorization header for the request
+        """
+        nonce = nonce or binascii.hexlify(os.urandom(8))
+        timestamp = timestamp or str(int(time.time()))
+        signature = self.signature(method, url, parameters, nonce, timestamp)
+        return '%s, oauth_nonce="%s", oauth_timestamp="%s", oauth_signature="%s"' % ( self.__header
+                                                                                  , nonce
+                                                                                  , timestamp
+                                                                                  , escape(signature))
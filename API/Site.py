@@ -21,59 +21,66 @@ __date__ = '$Apr 20, 2012'
 # This module contains the class file for the Mollom Site API
 # ---------------------------------------------------------------------
 
-from httplib2 import HTTP
-from json import JSONDecoder
-from urllib import urlencode
+from Internals import service, cat_maybe_values
+from Internals import paginate
+from Response import Response
+from PyMollom import MollomError, ConnectionError, Unauthorised as UnauthorisedError, Forbidden as ForbiddenError, NotFound as NotFoundError
+
+
+class SiteResponse(Response):
+    """The fields of a site, as returned by the Site API calls."""
+
+    __slots__ = ( 'id', 'public_key', 'private_key', 'url', 'email', 'languages', 'subscription'
+                , 'platform_name', 'platform_version', 'client_name', 'client_version')
+    FIELDS = ( ('id', 'id')
+             , ('publicKey', 'public_key')
+             , ('privateKey', 'private_key')
+             , ('url', 'url')
+             , ('email', 'email')
+             , ('languages', 'languages')
+             , ('subscription', 'subscription')
+             , ('platformName', 'platform_name')
+             , ('platformVersion', 'platform_version')
+             , ('clientName', 'client_name')
+             , ('clientVersion', 'client_version')
+             )
 
-from PyMollom import *
-
-
-class SiteResponse(MollomResponse):
     def __init__( self
-                , id
-                , public_key
-                , private_key
-                , url
-                , email
-                , languages
-                , subscription
-                , platform_name
-                , platform_version
-                , client_name
-                , client_version):
-        self.id = id
-        self.public_key = public_key
-        self.private_key = private_key
-        self.url = url
-        self.email = email
-        self.languages = languages
-        self.subscription = subscription
-        self.platform_name = platform_name
-        self.platform_version = platform_version
-        self.client_name = client_name
-        self.client_version = client_version
-
-    def fromJSON(self, js):
-        return SiteReponse( id = js.get('id')
-                          , public_key = js.get('publicKey')
-                          , private_key = js.get('privateKey')
-                          , url = js.get('url')
-                          , email = js.get('email')
-                          , languages = js.get('languages')
-                          , subscription = js.get('subscription')
-                          , platform_name = js.get('platformName')
-                          , platform_version = js.get('platformVersion')
-                          , client_name = js.get('clientName')
-                          , client_version  = js.get('clientVersion')
-        )
-
-
-class Site(MollomBase):
+                , id=None
+                , public_key=None
+                , private_key=None
+                , url=None
+                , email=None
+                , languages=None
+                , subscription=None
+                , platform_name=None
+                , platform_version=None
+                , client_name=None
+                , client_version=None):
+        super(SiteResponse, self).__init__( id=id
+                                          , public_key=public_key
+                                          , private_key=private_key
+                                          , url=url
+                                          , email=email
+                                          , languages=languages
+                                          , subscription=subscription
+                                          , platform_name=platform_name
+                                          , platform_version=platform_version
+                                          , client_name=client_name
+                                          , client_version=client_version)
+
+
+class Site(object):
     """Implementation of the API calls for a site.
+
+    Every call takes an optional deadline, the number of seconds it may take (per page
+    for the iterator), see API.Internals.service. It defaults to
+    API.Internals.default_deadline().
     """
 
     def __init__(self, public_key, private_key):
-        pass
+        self.public_key = public_key
+        self.private_key = private_key
 
     def create( self
               , url
@@ -82,7 +89,8 @@ class Site(MollomBase):
               , platform_name
               , platform_version
               , client_name
-              , client_version):
+              , client_version
+              , deadline=None):
         """Creates a new site in the Mollom system.
 
         @type url: string -- URL of the website to protect
@@ -104,21 +112,8 @@ class Site(MollomBase):
             'clientName': client_name,
             'clientVersion': client_version,
         }
-        h = HTTP()
-        path = "%s/%s/site" % (MOLLOM_SERVER, MOLLOM_VERSION)
-        response, content = h.request(path, "POST", urlencode(data))
-        ## FIXME: check response
-        if response['status'] == 200:
-            return(SiteReponse().fromJSON(JSONDecoder().decode(content)['site']))
-        else:
-            if response['status'] == 401:
-                raise UnauthorisedError(401, 'Not authorised to create a new site')
-            elif response['status'] == 403:
-                raise ForbiddenError(403, 'Access forbidden to %s' % (path))
-            elif response['status'] == 404:
-                raise NotFoundError(404, 'Resource not found %s' % (path))
-            else:
-                raise MollomError(response['status'], "Borked")
+        path = "site"
+        return self.__post(path, data, deadline)
 
     def update( self
               , url
@@ -127,7 +122,8 @@ class Site(MollomBase):
               , platform_name
               , platform_version
               , client_name
-              , client_version):
+              , client_version
+              , deadline=None):
         """Updates a site in the Mollom system and/or verifies the key-pair
 
         @type url: string -- URL of the website to protect
@@ -149,33 +145,54 @@ class Site(MollomBase):
             'clientName': client_name,
             'clientVersion': client_version,
         }
-        h = HTTP()
-        path = "%s/%s/site/%s" % (MOLLOM_SERVER, MOLLOM_VERSION, self.public_key)
-        response, content = h.request(uri=path, method="POST", data=urlencode(data), headers = ['Accept':'application/json;q=0.8, */*;q=0.5'] )
-        ## FIXME: check response
-        if response['status'] == 200:
-            return(SiteReponse().fromJSON(JSONDecoder().decode(content)['site']))
-        else:
-            if response['status'] == 401:
+        path = "site/%s" % (self.public_key)
+        return self.__post(path, data, deadline)
+
+
+    def __post(self, path, data, deadline):
+        """Send the site fields through the service layer, raising the error for an answer other than 200."""
+        def errors(status):
+            if status == 401:
                 raise UnauthorisedError(401, 'Not authorised to create a new site')
-            elif response['status'] == 403:
+            elif status == 403:
                 raise ForbiddenError(403, 'Access forbidden to %s' % (path))
-            elif response['status'] == 404:
+            elif status == 404:
                 raise NotFoundError(404, 'Resource not found %s' % (path))
             else:
-                raise MollomError(response['status'], "Borked")
+                raise MollomError(status, "Borked")
+        answer = service(self.public_key, self.private_key, 'POST', path, data, decode=True, deadline=deadline,
+                         errors=errors)
+        if answer is None:
+            # the circuit breaker is open, the rate limiter refused the call or the network failed
+            raise ConnectionError(503, 'No answer from Mollom for %s' % (path))
+        return SiteResponse.fromJSON(answer['site'])
 
 
-    def read(self):
+    def read(self, deadline=None):
         path = 'site/%s' % (self.public_key)
-        return __service('GET', path)
+        return service(self.public_key, self.private_key, 'GET', path, hedge=True, deadline=deadline)
 
-    def delete(self):
+    def delete(self, deadline=None):
         path = 'site/%s/delete' % (self.public_key)
-        return __service('POST', path)
+        return service(self.public_key, self.private_key, 'POST', path, deadline=deadline)
 
-    def list(self):
+    def list(self, offset=None, count=None, deadline=None):
+        data = cat_maybe_values({'offset': offset, 'count': count})
         path = 'site/'
-        return __service('GET', path)
+        return service(self.public_key, self.private_key, 'GET', path, data, hedge=True, deadline=deadline)
+
+    def iter_sites(self, page_size=100, prefetch=True, deadline=None):
+        """Iterate over all sites, fetching them page by page, see API.Internals.paginate.
+
+        @type page_size: int -- the number of sites fetched per call
+        @type prefetch: bool -- fetch the next page while the current one is consumed
+
+        @returns generator of SiteResponse
+        """
+        def fetch(offset, count):
+            data = {'offset': offset, 'count': count}
+            return service(self.public_key, self.private_key, 'GET', 'site/', data, decode=True, hedge=True,
+                           deadline=deadline)
+        return (SiteResponse.fromJSON(site) for site in paginate(fetch, page_size, prefetch))
 
 
@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains a cache of the verdicts Mollom returned for
+# content, so repeated submissions need not be checked again
+# ---------------------------------------------------------------------
+
+"""Verdict cache for repeated content submissions.
+
+The cache key is a hash over the submitted fields, after collapsing whitespace,
+so byte-identical (or nearly so) resubmissions map onto the same verdict. Verdicts
+expire after a TTL that can depend on the classification, and the backends evict
+the least recently used verdicts when they are full.
+
+Backends:
+  MemoryBackend        -- a dict in the current process
+  SharedMemoryBackend  -- a fixed size table in a memory mapped file, shared by the
+                          processes on a host (e.g., a file in /dev/shm)
+  FileBackend          -- an SQLite database file
+"""
+
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+from collections import OrderedDict
+
+from Encoder import text
+
+
+def verdict_key(data):
+    """Returns the cache key for the content fields, as sent to Mollom."""
+    digest = hashlib.sha1()
+    for field in sorted(data):
+        value = data[field]
+        if isinstance(value, (list, tuple)):
+            value = u','.join(sorted(text(v) for v in value))
+        value = u' '.join(text(value).split())
+        digest.update(field)
+        digest.update('\0')
+        digest.update(value.encode('utf-8'))
+        digest.update('\0')
+    return digest.digest()
+
+
+class MemoryBackend(object):
+    """Keeps up to max_entries verdicts in a dict in the current process."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.entries[key] = entry
+            return entry
+
+    def set(self, key, value, expires):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (value, expires)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SharedMemoryBackend(object):
+    """Keeps verdicts in a memory mapped file that is shared by all processes using it.
+
+    The table has a fixed number of slots, grouped in sets of ways slots. A key can
+    only be stored in the set its hash selects, and a full set evicts its least
+    recently used slot, so the memory use is fixed up front. Verdicts that do not
+    fit in a slot are not cached. Access is serialised with a lock on the file.
+    """
+
+    # key, expiry time, last use, verdict length, verdict
+    SLOT = struct.Struct('20sddH210s')
+
+    def __init__(self, path, slots=65536, ways=4):
+        self.path = path
+        self.ways = ways
+        self.sets = max(1, slots // ways)
+        size = self.sets * ways * self.SLOT.size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.fd).st_size != size:
+                os.ftruncate(self.fd, size)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.map = mmap.mmap(self.fd, size)
+
+    def __slots(self, key):
+        first = (struct.unpack('>Q', key[:8])[0] % self.sets) * self.ways
+        return [(first + way) * self.SLOT.size for way in xrange(self.ways)]
+
+    def get(self, key):
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            for offset in self.__slots(key):
+                (slot_key, expires, _, length, value) = self.SLOT.unpack_from(self.map, offset)
+                if slot_key == key:
+                    self.SLOT.pack_into(self.map, offset, slot_key, expires, time.time(), length, value)
+                    return value[:length], expires
+            return None
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def set(self, key, value, expires):
+        if len(value) > 210:
+            return
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            victim = None
+            for offset in self.__slots(key):
+                (slot_key, _, used, _, _) = self.SLOT.unpack_from(self.map, offset)
+                if slot_key == key:
+                    victim = offset
+                    break
+                if victim is None or used < victim_used:
+                    (victim, victim_used) = (offset, used)
+            self.SLOT.pack_into(self.map, victim, key, expires, time.time(), len(value), value)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def delete(self, key):
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            for offset in self.__slots(key):
+                if self.SLOT.unpack_from(self.map, offset)[0] == key:
+                    self.SLOT.pack_into(self.map, offset, '', 0, 0, 0, '')
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def __len__(self):
+        count = 0
+        for offset in xrange(0, len(self.map), self.SLOT.size):
+            if self.SLOT.unpack_from(self.map, offset)[0].strip('\0'):
+                count += 1
+        return count
+
+
+class FileBackend(object):
+    """Keeps up to max_entries verdicts in an SQLite database file.
+
+    The size is checked after every max_entries / 100 writes of a connection, and the
+    least recently used verdicts are evicted when it is over max_entries, so between
+    the checks the table may hold about 1% more per process writing to it.
+    """
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.check_interval = max(1, max_entries // 100)
+        self.local = threading.local()
+        connection = self.__connection()
+        connection.execute("CREATE TABLE IF NOT EXISTS verdicts"
+                           " (key BLOB PRIMARY KEY, value TEXT, expires REAL, used REAL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS verdicts_used ON verdicts (used)")
+
+    def __connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            # a verdict lost in a power failure is merely checked again, so the writes need not be synced
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def get(self, key):
+        connection = self.__connection()
+        row = connection.execute("SELECT value, expires FROM verdicts WHERE key = ?", (buffer(key),)).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE verdicts SET used = ? WHERE key = ?", (time.time(), buffer(key)))
+        return str(row[0]), row[1]
+
+    def set(self, key, value, expires):
+        connection = self.__connection()
+        connection.execute("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?)", (buffer(key), value, expires, time.time()))
+        self.local.writes = getattr(self.local, 'writes', 0) + 1
+        if self.local.writes % self.check_interval == 0:
+            self.__evict(connection)
+
+    def __evict(self, connection):
+        """Evict the least recently used verdicts over max_entries."""
+        excess = connection.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute("DELETE FROM verdicts WHERE key IN"
+                               " (SELECT key FROM verdicts ORDER BY used LIMIT ?)", (excess,))
+
+    def delete(self, key):
+        self.__connection().execute("DELETE FROM verdicts WHERE key = ?", (buffer(key),))
+
+    def __len__(self):
+        return self.__connection().execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+
+class VerdictCache(object):
+    """Caches the verdicts returned by Content.checkContent.
+
+    The ttl is either a number of seconds, or a dict mapping the spam classification
+    of the verdict (spam, ham, unsure) to a number of seconds. Verdicts with a TTL of
+    0 are not cached. The hits and misses counters can be used to size the cache.
+    """
+
+    def __init__(self, backend=None, ttl=3600):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def __ttl(self, verdict):
+        if isinstance(self.ttl, dict):
+            return self.ttl.get(verdict.get('spamClassification'), 0)
+        return self.ttl
+
+    def get(self, data):
+        """Returns the cached verdict for the content fields, or None."""
+        key = verdict_key(data)
+        entry = self.backend.get(key)
+        if entry is not None:
+            (value, expires) = entry
+            if expires >= time.time():
+                self.hits += 1
+                return json.loads(value)
+            self.backend.delete(key)
+        self.misses += 1
+        return None
+
+    def put(self, data, verdict):
+        """Cache the verdict Mollom returned for the content fields."""
+        ttl = self.__ttl(verdict)
+        if ttl > 0:
+            self.backend.set(verdict_key(data), json.dumps(verdict, separators=(',', ':')), time.time() + ttl)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return lookups and float(self.hits) / lookups or 0.0
+
+    def stats(self):
+        """Returns a dict with the hit and miss counts, the hit rate and the number of cached verdicts."""
+        return { 'hits': self.hits
+               , 'misses': self.misses
+               , 'hit_rate': self.hit_rate()
+               , 'entries': len(self.backend)
+               }
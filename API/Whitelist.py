@@ -21,6 +21,8 @@ __date__ = "$Feb 8, 2012$"
 # This module contains the class file for the Mollom Whitelist API
 # ---------------------------------------------------------------------
 
+from Internals import service, cat_maybe_values
+from Internals import paginate
 
 
 class Context(object):
@@ -31,26 +33,97 @@ class Context(object):
 
 
 class Whitelist(object):
-    def __init__(self):
-        pass
+    """Implementation of the API calls for the whitelist of a site.
 
-    def createEntry(self):
-        pass
+    Every call takes an optional deadline, the number of seconds it may take (per page
+    for the iterators), see API.Internals.service. It defaults to
+    API.Internals.default_deadline().
+    """
 
+    def __init__(self, public_key, private_key):
+        self.public_key = public_key
+        self.private_key = private_key
 
-    def updateEntry(self):
-        pass
 
+    def __entry(self, answer):
+        # for now, we check for a None, this should be fixed when we throw exceptions
+        if answer == None:
+            return None
+        return answer['entry']
 
-    def deleteEntry(self):
-        pass
 
+    def createEntry(self, value, context, status=None, note=None, deadline=None):
+        """Add an entry to the whitelist.
 
-    def listEntries(self):
-        pass
+        @type value: string -- the whitelisted value; for Context.AUTHOR_IP, an address or a CIDR range
+        @type context: string -- one of Context
+        @type status: int -- 1 for an active entry, 0 for an inactive one
+        @type note: string
 
+        @returns dict with the entry fields (id, value, context, ...)
+        """
+        data = cat_maybe_values({'value': value, 'context': context, 'status': status, 'note': note})
+        path = 'whitelist/%s' % (self.public_key)
+        return self.__entry(service(self.public_key, self.private_key, 'POST', path, data, decode=True, deadline=deadline))
 
-    def readEntry(self):
-        pass
 
+    def updateEntry(self, entryId, value=None, context=None, status=None, note=None, deadline=None):
+        """Update the fields of a whitelist entry. Fields that are not given are left unchanged.
 
+        @returns dict with the entry fields
+        """
+        data = cat_maybe_values({'value': value, 'context': context, 'status': status, 'note': note})
+        path = 'whitelist/%s/%s' % (self.public_key, entryId)
+        return self.__entry(service(self.public_key, self.private_key, 'POST', path, data, decode=True, deadline=deadline))
+
+
+    def deleteEntry(self, entryId, deadline=None):
+        """Remove an entry from the whitelist.
+
+        @returns True if the entry was removed
+        """
+        path = 'whitelist/%s/%s/delete' % (self.public_key, entryId)
+        return service(self.public_key, self.private_key, 'POST', path, deadline=deadline) != None
+
+
+    def listEntries(self, offset=None, count=None, deadline=None):
+        """List the entries on the whitelist.
+
+        @type offset: int -- the index of the first entry to return
+        @type count: int -- the maximal number of entries to return
+
+        @returns list of dicts with the entry fields
+        """
+        answer = self.__list(offset, count, deadline)
+        if answer == None:
+            return None
+        return answer['list']
+
+
+    def iterEntries(self, pageSize=100, prefetch=True, deadline=None):
+        """Iterate over all entries on the whitelist, fetching them page by page,
+        see API.Internals.paginate.
+
+        @type pageSize: int -- the number of entries fetched per call
+        @type prefetch: bool -- fetch the next page while the current one is consumed
+
+        @returns generator of dicts with the entry fields
+        """
+        return paginate(lambda offset, count: self.__list(offset, count, deadline), pageSize, prefetch)
+
+
+    def __list(self, offset, count, deadline=None):
+        data = cat_maybe_values({'offset': offset, 'count': count})
+        path = 'whitelist/%s' % (self.public_key)
+        return service(self.public_key, self.private_key, 'GET', path, data, decode=True, hedge=True,
+                       deadline=deadline)
+
+
+    def readEntry(self, entryId, deadline=None):
+        """Get a single whitelist entry.
+
+        @returns dict with the entry fields
+        """
+        path = 'whitelist/%s/%s' % (self.public_key, entryId)
+        return self.__entry(service(self.public_key, self.private_key, 'GET', path, decode=True, hedge=True,
+                                    deadline=deadline))
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# This module contains a local index of the site whitelist, used to
+# accept content from trusted authors without a call to Mollom
+# ---------------------------------------------------------------------
+
+import socket
+
+from Encoder import text
+from Mirror import Mirror
+from Whitelist import Context
+
+
+def parse_address(address):
+    """Convert an IPv4 or IPv6 address to a tuple (number of bits, address as an integer).
+
+    @returns the tuple, or None if the address cannot be parsed
+    """
+    for (family, bits) in ((socket.AF_INET, 32), (socket.AF_INET6, 128)):
+        try:
+            packed = socket.inet_pton(family, address.strip())
+        except (socket.error, ValueError):
+            continue
+        return bits, int(packed.encode('hex'), 16)
+    return None
+
+
+class CIDRIndex(object):
+    """A set of IP networks, given as single addresses or in CIDR notation.
+
+    The networks are kept in one hash set per address family and prefix length,
+    so a lookup costs one set probe per prefix length in use, rather than one
+    per network.
+    """
+
+    def __init__(self):
+        self.prefixes = {}    # bits of the family -> {prefix length -> set of network prefixes}
+
+    def add(self, network):
+        """Add a network such as 192.168.0.0/16, 2001:db8::/32 or 10.1.2.3.
+
+        @returns False if the network cannot be parsed, or its prefix length is out of range
+        """
+        (address, separator, length) = network.partition('/')
+        parsed = parse_address(address)
+        if parsed is None:
+            return False
+        (bits, value) = parsed
+        if not separator:
+            length = bits
+        elif length.isdigit():
+            length = int(length)
+        else:
+            return False
+        if not 0 <= length <= bits:
+            return False
+        self.prefixes.setdefault(bits, {}).setdefault(length, set()).add(value >> (bits - length))
+        return True
+
+    def __contains__(self, address):
+        parsed = parse_address(address)
+        if parsed is None:
+            return False
+        (bits, value) = parsed
+        for (length, networks) in self.prefixes.get(bits, {}).iteritems():
+            if value >> (bits - length) in networks:
+                return True
+        return False
+
+
+class WhitelistIndex(object):
+    """The whitelist entries indexed per context: a CIDRIndex for the author IP
+    and hash sets for the author ID, name and mail address. Names and mail
+    addresses are compared case insensitively.
+    """
+
+    def __init__(self, entries):
+        self.ips = CIDRIndex()
+        self.values = { Context.AUTHOR_ID: set()
+                      , Context.AUTHOR_NAME: set()
+                      , Context.AUTHOR_MAIL: set()
+                      }
+        for entry in entries:
+            if str(entry.get('status', 1)) == '0' or not entry.get('value'):
+                continue
+            context = entry.get('context')
+            if context == Context.AUTHOR_IP:
+                self.ips.add(entry['value'])
+            elif context in self.values:
+                self.values[context].add(self.__normalise(context, entry['value']))
+        self.size = len(entries)
+
+    def __normalise(self, context, value):
+        value = text(value).strip()
+        if context == Context.AUTHOR_ID:
+            return value
+        return value.lower()
+
+    def match(self, data):
+        """Check if the author of the content is whitelisted.
+
+        @type data: dict -- the content fields, as sent to Mollom (authorIp, authorMail, ...)
+
+        @returns the context that matched, or None
+        """
+        if data.get('authorIp') and data['authorIp'] in self.ips:
+            return Context.AUTHOR_IP
+        for (context, values) in self.values.iteritems():
+            if values and data.get(context) is not None and self.__normalise(context, data[context]) in values:
+                return context
+        return None
+
+
+class WhitelistMirror(Mirror):
+    """A locally synced copy of the site whitelist.
+
+    All entries are fetched through Whitelist.iterEntries, page by page, and
+    compiled into a WhitelistIndex, see API.Mirror.Mirror for the refreshing.
+    """
+
+    def __init__(self, whitelist, refresh_interval=300, page_size=1000):
+        """
+        @type whitelist: API.Whitelist.Whitelist
+        @type refresh_interval: the number of seconds after which the mirror is refreshed
+        @type page_size: int -- the number of entries fetched per call
+        """
+        self.whitelist = whitelist
+        self.page_size = page_size
+        super(WhitelistMirror, self).__init__(self.fetch_entries, refresh_interval)
+
+    def fetch_entries(self):
+        """Returns all entries on the whitelist, or None when a page cannot be fetched."""
+        try:
+            return list(self.whitelist.iterEntries(self.page_size))
+        except IOError:
+            return None
+
+    def build_index(self, entries):
+        return WhitelistIndex(entries)
@@ -31,67 +31,8 @@ __date__ = "$Feb 8, 2012$"
     http://mollom.cm/api/rest.
 """
 
-import json
-import oauth2
-import urllib
-from ConfigParser import ConfigParser
-
 from PyMollom import *
-
-class MollomBase(object):
-    """Base class for the Mollom API classes.
-    """
-    def __init__(self, public_key, private_key):
-        """Initialise."""
-        self.public_key = public_key
-        self.private_key = private_key
-        self.mollom_headers = ['Accept':'application/json;q=0.8, */*;q=0.5']
-        self.mollom_uri = "%s/%s" % (MOLLOM_SERVER, MOLLOM_VERSION)
-
-
-    def __service(method, path, data=None, maxRetries=0, depth=0):
-        """The service method makes the actual call to the Mollom service
-        on behalf of the public API method.
-
-        @type method: the HTTP method (POST, GET, ...)
-        @type path: the URL path
-        @type data: dictionary with the data to pass in case of a POST
-        @type maxRetries: int
-        @type depth:int
-
-        @returns:
-         - The result of the call, if a server is available.
-         - None after MOLLOM_RETRIES successive failed retries.
-        """
-
-        if depth > maxRetries:
-            return None
-
-            # superfluous?
-            #params = { 'oauth_version': 1.0
-            #         , 'oauth_timestamp': int(time.time())
-            #         , 'oauth_nonce': oauth2.generate_nonce()
-            #         , 'oauth_signature_method': "HMAC-SHA1"
-            #         , 'oauth_consumer_key': self.publicKey
-            #         }
-
-        body = urllib.urlencode(data)
-        consumer = oauth2.Consumer(key=self.public_key, secret=self.private_key)
-        client = oauth2.Client(consumer)
-
-        #request = oauth2.Request( method='GET'
-        #                        , url= self.mollomServer + path
-        #                        , parameters = params
-        #                        , body = body)
-
-        resp, content = client.request(self.mollom_uri + path, method, headers=self.mollom_headers, body=body)
-
-        if resp.status == 200:
-            return content
-        else:
-            # FIXME: do some error checking here
-            return None
-
+from API.Internals import set_default_deadline, set_rate_limiter, set_server_list
 
 class MollomAPI(object):
     """MollomAPI is a class providing access to the Mollom (http://mollom.com) content filtering
@@ -103,11 +44,12 @@ class MollomAPI(object):
     mollomHeaders = {'Accept': 'application/json;q=0.8'
         , 'Content-Type': 'application/x-www-form-urlencoded'}
 
+    # retries are configured through API.Internals.set_retry_policy, see API.Retry.RetryPolicy
     MOLLOM_RETRIES = 2
 
 
     def __init__(self, publicKey, privateKey, timeoutDays=7, timeoutHours=0, defaultServer='http://rest.mollom.com',
-                 defaultVersion='1.0'):
+                 defaultVersion='1.0', cacheCallback=None):
         """MollomAPI constructor.
 
         Keyword arguments:
@@ -119,6 +61,8 @@ class MollomAPI(object):
                                      only be used for obtaining a valid server list. Defaults to
                                      http://rest.mollom.com.
         defaultVersion (optional) -- The default API version used. Defaults to 1.0.
+        cacheCallback  (optional) -- A function caching the server list: called with the list it
+                                     stores it, called without arguments it returns the cached list.
 
         The actual timeout is computed as the number of days plus the number of hours.
         """
@@ -130,10 +74,8 @@ class MollomAPI(object):
         self.timeoutDays = timeoutDays
         self.timeoutHours = timeoutHours
 
-        # maximal number of retries to access the service before bailing
-        self.__maxDepth = 5
-
         self.mollomVersion = defaultVersion
+        self.cacheCallback = cacheCallback
 
 
     def sendFeedback(self, sessionID, feedback):
@@ -363,25 +305,36 @@ class MollomAPI(object):
 
 
 class MollomContentResponse(object):
-    """Encapsulating a response from a checkContent call."""
+    """Encapsulating a response from a checkContent call.
+
+    Only the fields that are read are kept, in slots rather than the whole
+    response dict, and they cannot be changed.
+    """
+
+    __slots__ = ('_spam', '_quality', '_session_id')
 
     def __init__(self, response):
-        self.response = response
+        object.__setattr__(self, '_spam', response.get('spam'))
+        object.__setattr__(self, '_quality', response.get('quality'))
+        object.__setattr__(self, '_session_id', response.get('session_id'))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MollomContentResponse is immutable")
 
     def spam(self):
-        return response['spam'] == 1
+        return self._spam == 1
 
     def ham(self):
-        return response['spam'] == 2
+        return self._spam == 2
 
     def unsure(self):
-        return response['spam'] == 3
+        return self._spam == 3
 
     def quality(self):
-        return response['quality']
+        return self._quality
 
     def sessionID(self):
-        return response['session_id']
+        return self._session_id
 
 
 class MollomBase(object):
@@ -391,8 +344,10 @@ class MollomBase(object):
     optional fields:
 
       [general]
-      server      -- The main Mollom server, e.g., http://xmlrpc.mollom.com
+      server      -- The main Mollom server, e.g., http://xmlrpc.mollom.com, optionally followed by
+                     alternate servers, separated by commas
       base_url    -- The URL of the website using the Mollom service
+      deadline    -- (optional) The number of seconds an API call may take, including its retries
 
       [authentication]
       public key  -- The Mollom public key for your website
@@ -402,16 +357,36 @@ class MollomBase(object):
       max serverlist days  -- Maximum number of days we keep a list cached
       max serverlist hours -- Maximum number of hours we keep a list cached. The total time
                               is the sum of both.
-
+      server list file     -- (optional) File in which the server list is cached, shared by
+                              all processes using the same configuration. The list is fetched
+                              with fetchServerList() when the cached one has timed out.
+
+      [rate limit]                -- (optional) shared by all processes on the host using the key pair
+      requests per second  -- The request rate allowed by the Mollom plan
+      burst                -- (optional) Number of requests that can be made at once, defaults to
+                              the requests per second
+      directory            -- (optional) Directory holding the token bucket, defaults to /dev/shm
+      block                -- (optional) Wait for the rate to allow a request (yes, the default), or
+                              fail the call right away (no)
 
     A user should derive the class and provide functionality for the cacheServerList()
-    method, if desired.
+    method, if desired. The REST API has no call returning the server list, so by default
+    fetchServerList() takes it from the [general] server setting, read again from the config
+    file; derive the class to fetch it from elsewhere.
+
+    The process-wide settings (server list, deadline and rate limit, see API.Internals)
+    are only changed once the whole configuration has been read.
 
     Note: this class is still in early draft stage, so may change frequently.
     """
 
     def __init__(self, configfile):
         super(MollomBase, self).__init__()
+        # only needed by the configured clients, so imported here rather than with the module
+        from ConfigParser import ConfigParser
+        from API.RateLimit import RateLimiter
+        from API.ServerList import ServerListCache
+        self.configfile = configfile
         self.config = ConfigParser([])
         self.config.read(configfile)
         self.privateKey = self.config.get('authentication', 'private key')
@@ -421,16 +396,55 @@ class MollomBase(object):
         self.timeoutHours = int(self.config.get('caching', 'max serverlist hours'))
 
         self.listInfo = None
+        self.serverList = None
+        if self.config.has_option('caching', 'server list file'):
+            self.serverList = ServerListCache(self.config.get('caching', 'server list file'), self.fetchServerList,
+                timeoutDays=self.timeoutDays, timeoutHours=self.timeoutHours)
+        deadline = None
+        if self.config.has_option('general', 'deadline'):
+            deadline = self.config.getfloat('general', 'deadline')
+        limiter = None
+        if self.config.has_section('rate limit'):
+            section = 'rate limit'
+            option = lambda name, get: self.config.has_option(section, name) and get(section, name) or None
+            limiter = RateLimiter(self.config.getfloat(section, 'requests per second'),
+                burst=option('burst', self.config.getfloat), directory=option('directory', self.config.get),
+                block=not self.config.has_option(section, 'block') or self.config.getboolean(section, 'block'))
         self.api = MollomAPI(publicKey=self.publicKey, privateKey=self.privateKey, timeoutDays=self.timeoutDays,
             timeoutHours=self.timeoutHours, cacheCallback=self.cacheServerList)
 
+        # the configuration is complete, it can now be applied to the API calls
+        if self.serverList is not None:
+            set_server_list(self.serverList)
+        if deadline is not None:
+            set_default_deadline(deadline)
+        if limiter is not None:
+            set_rate_limiter(limiter)
+
+    def fetchServerList(self):
+        """Returns the servers listed in the [general] server setting of the config file,
+        or None when it cannot be read.
+        """
+        from ConfigParser import ConfigParser, Error
+        config = ConfigParser([])
+        try:
+            config.read(self.configfile)
+            servers = [server.strip() for server in config.get('general', 'server').split(',')]
+        except Error:
+            return None
+        return [server for server in servers if server] or None
+
     def cacheServerList(self, listInfo=None):
+        if self.serverList is not None:
+            if not listInfo is None:
+                self.serverList.store(listInfo)
+            return self.serverList.get()
         if not listInfo is None:
             self.listInfo = listInfo
         return self.listInfo
 
     def getServerList(self):
-        return self.api.getServerList()
+        return self.cacheServerList()
 
     def checkContent(self, sessionID=None, postTitle=None, postBody=None, authorName=None, authorURL=None,
                      authorMail=None, authorOpenID=None, authorIP=None, authorID=None):
@@ -28,10 +28,8 @@ __status__ = 'beta'
 __version__ = '0.1'
 __date__ = 'April 24, 2012'
 
-
-import API.Content as Content
-
-__all__ = [Content]
+import sys
+import types
 
 
 MOLLOM_SERVER="http://rest.mollom.com/"
@@ -61,6 +59,13 @@ class MollomError(Exception):
 class ConnectionError(MollomError):
     pass
 
+class DeadlineExceededError(MollomError):
+    """The deadline of an API call passed before Mollom answered it."""
+    REQUEST_TIMEOUT = 408
+
+    def __init__(self, code, message):
+        super(DeadlineExceededError, self).__init__(code, message)
+
 class BlacklistError(MollomError):
     pass
 
@@ -95,7 +100,7 @@ class FeedbackError(MollomError):
     FEEDBACK_MISSING_ID = 400
     FEEDBACK_UNKNOWN_REASON = 400
 
-    def __init__(self, code, message)
+    def __init__(self, code, message):
         super(FeedbackError, self).__init__(code, message)
 
 class FeedbackMissingIdError(FeedbackError):
@@ -120,7 +125,7 @@ class SiteUnknownError(SiteError):
 
 
 class WhitelistError(MollomError):
-    WHITELIST_ENTRY_UNKNOW
+    WHITELIST_ENTRY_UNKNOWN = 404
 
     def __init__(self, code, message):
         super(WhitelistError, self).__init__(code, message)
@@ -144,5 +149,38 @@ class JSONParseError(MollomError):
     pass
 
 
+# The API modules, and the standard modules they need, are only imported when they
+# are first looked up on the package, so importing it (e.g., for the errors above)
+# stays cheap for short lived processes. They use the server settings and errors
+# above, which are defined by then.
+_LAZY_MODULES = {'Content': '%s.API.Content' % (__name__)}
+
+# the names taken by "from PyMollom import *": the settings and errors, but not the
+# lazy modules, which the star import would otherwise load right away
+__all__ = sorted(name for (name, value) in globals().items()
+                 if name.startswith('MOLLOM_') or (isinstance(value, type) and issubclass(value, Exception)))
+
+
+class _LazyPackage(types.ModuleType):
+    """Takes the place of the package in sys.modules, to import the modules in
+    _LAZY_MODULES on first use.
+    """
+
+    def __getattr__(self, name):
+        target = _LAZY_MODULES.get(name)
+        if target is None:
+            raise AttributeError("'module' object has no attribute '%s'" % (name))
+        __import__(target)
+        module = sys.modules[target]
+        setattr(self, name, module)
+        return module
+
 
+def _install_lazy_package():
+    package = _LazyPackage(__name__, __doc__)
+    package.__dict__.update(globals())
+    # Python 2 clears the globals of a module that is collected, and the code above still uses them
+    package._original_module = sys.modules[__name__]
+    sys.modules[__name__] = package
 
+_install_lazy_package()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Import time benchmark of the package and its API modules, to keep
+# the start up of short lived processes cheap
+# ---------------------------------------------------------------------
+
+"""Usage: python benchmarks/bench_import.py [options] [MODULE ...]
+
+Imports every module (PyMollom and PyMollom.API.Content by default) in fresh
+interpreters and reports the median import time and the number of modules it
+loads. With --trace, it prints the imports of a single run as a tree, in the
+format of python -X importtime, which Python 2 does not have.
+
+It exits with status 1 when a module exceeds its budget, so it guards against
+import time regressions. The default budgets, in LIMITS, leave room for slower
+machines, but importing the package stays far below what it takes to import
+an API module, so a module that is no longer imported lazily fails the check.
+--budget and --max-modules replace the budgets of every module.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# module -> (median import time in milliseconds, number of modules loaded) it may take
+LIMITS = { 'PyMollom': (5.0, 10)
+         , 'PyMollom.API.Content': (25.0, 60)
+         }
+DEFAULT_LIMIT = (25.0, 60)
+
+# runs in the child interpreter: import the module, optionally tracing every import
+CHILD = r'''
+import sys, time
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+trace = %(trace)r
+rows = []
+children = [0.0]
+original = builtins.__import__
+
+def traced(name, *args, **kwargs):
+    loaded = len(sys.modules)
+    children.append(0.0)
+    start = time.time()
+    try:
+        return original(name, *args, **kwargs)
+    finally:
+        elapsed = time.time() - start
+        nested = children.pop()
+        children[-1] += elapsed
+        if len(sys.modules) > loaded:
+            rows.append((elapsed - nested, elapsed, len(children) - 1, name))
+
+before = len(sys.modules)
+if trace:
+    builtins.__import__ = traced
+start = time.time()
+__import__(%(module)r)
+elapsed = time.time() - start
+builtins.__import__ = original
+loaded = len(sys.modules) - before
+# json is only imported now, so that it is not taken for a module the import loaded
+import json
+sys.stdout.write(json.dumps([elapsed, loaded, rows]) + '\n')
+'''
+
+
+def measure(module, trace=False):
+    """Import the module in a fresh interpreter.
+
+    @returns a tuple (seconds, number of modules loaded, trace rows (self, cumulative, depth, name))
+    """
+    output = subprocess.check_output([sys.executable, '-c', CHILD % {'module': module, 'trace': trace}],
+                                     env=dict(os.environ, PYTHONDONTWRITEBYTECODE=''))
+    (seconds, loaded, rows) = json.loads(output.decode('ascii'))
+    return seconds, loaded, [tuple(row) for row in rows]
+
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('modules', nargs='*', default=['PyMollom', 'PyMollom.API.Content'])
+    parser.add_argument('-n', '--runs', type=int, default=20, help="fresh interpreters per module")
+    parser.add_argument('--trace', action='store_true', help="print the import tree of the first module")
+    parser.add_argument('--budget', type=float, help="maximal median import time in milliseconds, "
+                                                     "instead of the one in LIMITS")
+    parser.add_argument('--max-modules', type=int, help="maximal number of modules an import may load, "
+                                                        "instead of the one in LIMITS")
+    args = parser.parse_args()
+
+    if args.trace:
+        (_, _, rows) = measure(args.modules[0], trace=True)
+        print("import time: self [us] | cumulative | imported package")
+        for (own, cumulative, depth, name) in rows:
+            print("import time: %9d | %10d | %s%s" % (own * 1e6, cumulative * 1e6, '  ' * depth, name))
+        return
+
+    measure(args.modules[0])    # warm up the file system caches and the byte code
+    report = {}
+    failed = False
+    for module in args.modules:
+        runs = [measure(module) for _ in range(args.runs)]
+        milliseconds = median([seconds for (seconds, _, _) in runs]) * 1000
+        loaded = max(count for (_, count, _) in runs)
+        (budget, max_modules) = LIMITS.get(module, DEFAULT_LIMIT)
+        if args.budget is not None:
+            budget = args.budget
+        if args.max_modules is not None:
+            max_modules = args.max_modules
+        within = milliseconds <= budget and loaded <= max_modules
+        report[module] = { 'median_ms': round(milliseconds, 2)
+                         , 'modules_loaded': loaded
+                         , 'budget_ms': budget
+                         , 'max_modules': max_modules
+                         , 'within_budget': within
+                         }
+        failed = failed or not within
+    print(json.dumps(report, indent=2, sort_keys=True))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
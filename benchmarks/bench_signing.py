@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Microbenchmark of request signing: the oauth2 library path that
+# service used to take against API.Signer
+# ---------------------------------------------------------------------
+
+"""Usage: python benchmarks/bench_signing.py [-n ITERATIONS]
+
+Signs a checkContent-sized request both ways, verifies the signatures are
+identical, and prints the time per signature.
+"""
+
+import argparse
+import timeit
+
+import oauth2
+
+from PyMollom.API.Signer import Signer
+
+PUBLIC_KEY = 'a5f1e0b6c7d84e0f9a1b2c3d4e5f6a7b'
+PRIVATE_KEY = '0f9e8d7c6b5a49382716f5e4d3c2b1a0'
+URL = 'http://rest.mollom.com/v1/content'
+DATA = { 'postTitle': 'Re: weekend plans'
+       , 'postBody': 'Sounds good to me, see you all on Saturday! ' * 10
+       , 'authorName': 'Jane Doe'
+       , 'authorMail': 'jane@example.org'
+       , 'authorIp': '192.0.2.17'
+       , 'authorId': '1234'
+       , 'checks': 'spam'
+       }
+
+
+def oauth2_sign(data, nonce=None, timestamp=None):
+    """Sign the way oauth2.Client does, building the consumer for every request."""
+    parameters = dict(data)
+    if nonce is not None:
+        parameters['oauth_nonce'] = nonce
+        parameters['oauth_timestamp'] = timestamp
+    consumer = oauth2.Consumer(key=PUBLIC_KEY, secret=PRIVATE_KEY)
+    request = oauth2.Request.from_consumer_and_token(consumer, http_method='POST', http_url=URL, parameters=parameters,
+                                                     is_form_encoded=True)
+    request.sign_request(oauth2.SignatureMethod_HMAC_SHA1(), consumer, None)
+    request.to_header()
+    return request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    signer = Signer(PUBLIC_KEY, PRIVATE_KEY)
+    expected = oauth2_sign(DATA, '12345678', '1339000000')['oauth_signature']
+    actual = signer.signature('POST', URL, DATA, '12345678', '1339000000')
+    if expected != actual:
+        raise SystemExit("signatures differ: oauth2 %s, Signer %s" % (expected, actual))
+
+    reference = min(timeit.repeat(lambda: oauth2_sign(DATA), number=args.iterations, repeat=3))
+    optimised = min(timeit.repeat(lambda: signer.sign('POST', URL, DATA), number=args.iterations, repeat=3))
+
+    print("oauth2.Client path: %8.2f us/request" % (1e6 * reference / args.iterations))
+    print("Signer:             %8.2f us/request" % (1e6 * optimised / args.iterations))
+    print("speedup:            %8.2fx" % (reference / optimised))
+
+
+if __name__ == '__main__':
+    main()
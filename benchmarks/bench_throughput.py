@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Throughput and latency benchmark of the API calls against the fake
+# Mollom server
+# ---------------------------------------------------------------------
+
+"""Usage: python benchmarks/bench_throughput.py [options]
+
+Starts benchmarks/fake_server.py in a separate process and drives the API calls
+against it at a fixed concurrency. For every scenario it reports the throughput,
+the latency percentiles and the client CPU time per request, as JSON, so runs
+can be compared to catch regressions.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from fake_server import FakeMollomServer
+
+from PyMollom.API import Internals
+from PyMollom.API.Blacklist import Blacklist
+from PyMollom.API.Compression import Compression
+from PyMollom.API.Content import Content
+from PyMollom.API.Site import Site
+from PyMollom.API.Whitelist import Whitelist
+
+from PyMollom.API.Internals import service
+
+PUBLIC_KEY = 'benchmark-public-key'
+PRIVATE_KEY = 'benchmark-private-key'
+LONG_POST = 'A long forum post, quoting the whole thread it replies to, line after line. ' * 100
+
+
+def scenarios():
+    """Returns the benchmarked calls, by name."""
+    content = Content(PUBLIC_KEY, PRIVATE_KEY)
+    site = Site(PUBLIC_KEY, PRIVATE_KEY)
+    blacklist = Blacklist(PUBLIC_KEY, PRIVATE_KEY)
+    whitelist = Whitelist(PUBLIC_KEY, PRIVATE_KEY)
+    return { 'content.check': lambda: content.checkContent( post_title='Re: weekend plans'
+                                                          , post_body='Sounds good to me, see you on Saturday!'
+                                                          , author_name='Jane Doe'
+                                                          , author_mail='jane@example.org'
+                                                          , author_ip='192.0.2.17')
+           , 'content.check.large': lambda: content.checkContent( post_title='Re: weekend plans'
+                                                                , post_body=LONG_POST
+                                                                , author_name='Jane Doe')
+           , 'site.read': site.read
+           , 'captcha.create': lambda: service(PUBLIC_KEY, PRIVATE_KEY, 'POST', 'captcha', {'type': 'image'})
+           , 'feedback.send': lambda: service(PUBLIC_KEY, PRIVATE_KEY, 'POST', 'feedback', {'contentId': '1', 'reason': 'spam'})
+           , 'blacklist.list': blacklist.list_entries
+           , 'whitelist.list': whitelist.listEntries
+           }
+
+
+class _StaticServerList(object):
+    def __init__(self, url):
+        self.url = url
+
+    def get(self):
+        return [self.url]
+
+
+def _serve(latency, jitter, ready):
+    server = FakeMollomServer(latency=latency, jitter=jitter)
+    ready.put(server.url())
+    server.serve_forever()
+
+
+def percentile(ordered, p):
+    """Nearest rank percentile of a sorted list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * len(ordered) + 0.5)) - 1)]
+
+
+def run(call, requests, concurrency):
+    """Perform requests calls on concurrency threads.
+
+    @returns a dict with the measurements
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    remaining = [requests]
+    transferred = [0, 0]
+
+    def count(record):
+        with lock:
+            transferred[0] += record.bytes_sent
+            transferred[1] += record.bytes_received
+    Internals.metrics().add_callback(count)
+
+    def work():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            start = time.time()
+            try:
+                failed = call() is None
+            except Exception:
+                failed = True
+            elapsed = time.time() - start
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += failed
+
+    threads = [threading.Thread(target=work) for _ in xrange(concurrency)]
+    cpu = os.times()
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.time() - start
+    Internals.metrics().remove_callback(count)
+    cpu_end = os.times()
+    cpu = (cpu_end[0] - cpu[0]) + (cpu_end[1] - cpu[1])
+
+    latencies.sort()
+    return { 'requests': requests
+           , 'concurrency': concurrency
+           , 'errors': errors[0]
+           , 'throughput_rps': requests / wall
+           , 'latency_ms': { 'mean': 1000 * sum(latencies) / len(latencies)
+                           , 'p50': 1000 * percentile(latencies, 50)
+                           , 'p95': 1000 * percentile(latencies, 95)
+                           , 'p99': 1000 * percentile(latencies, 99)
+                           }
+           , 'cpu_ms_per_request': 1000 * cpu / requests
+           , 'bytes_sent_per_request': transferred[0] / requests
+           , 'bytes_received_per_request': transferred[1] / requests
+           }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--requests', type=int, default=2000, help="requests per scenario")
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help="server latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="random extra server latency in seconds")
+    parser.add_argument('-s', '--scenario', action='append', help="only run the given scenario (repeatable)")
+    parser.add_argument('-o', '--output', help="write the JSON report to this file instead of stdout")
+    parser.add_argument('--compression', choices=('gzip', 'deflate'), help="compress the request and response bodies")
+    parser.add_argument('--threshold', type=int, default=2048, help="the smallest request body that is compressed")
+    args = parser.parse_args()
+
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(args.latency, args.jitter, ready))
+    server.daemon = True
+    server.start()
+    Internals.set_server_list(_StaticServerList(ready.get(timeout=10)))
+    if args.compression:
+        Internals.set_compression(Compression(args.compression, args.threshold))
+
+    calls = scenarios()
+    names = args.scenario or sorted(calls)
+    report = { 'config': { 'requests': args.requests
+                         , 'concurrency': args.concurrency
+                         , 'latency': args.latency
+                         , 'jitter': args.jitter
+                         , 'compression': args.compression
+                         , 'python': sys.version.split()[0]
+                         }
+             , 'results': {}
+             }
+    try:
+        for name in names:
+            calls[name]()    # warm up the connection pool
+            report['results'][name] = run(calls[name], args.requests, args.concurrency)
+        report['pool'] = Internals.connection_pool().stats()
+    finally:
+        server.terminate()
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
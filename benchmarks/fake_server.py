@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# A local stand-in for the Mollom REST service, used by the benchmarks
+# ---------------------------------------------------------------------
+
+"""A fake Mollom REST server.
+
+It implements the v1 endpoints used by the client (content, site, captcha,
+feedback, blacklist and whitelist) with canned answers, after a configurable
+latency. Requests are not authenticated. Keep-alive connections are supported,
+so the numbers reflect the client's connection reuse.
+
+Usage: python benchmarks/fake_server.py [--port PORT] [--latency SECONDS] [--jitter SECONDS]
+"""
+
+import argparse
+import BaseHTTPServer
+import itertools
+import json
+import random
+import SocketServer
+import time
+import urlparse
+import zlib
+
+
+class FakeMollomServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """The fake server; every request waits latency plus a random share of jitter seconds.
+
+    The blacklist and whitelist have list_size entries each. Responses are gzip
+    compressed when the client accepts it, and gzip or deflate request bodies are
+    accepted unless compressed_requests is False, in which case they are refused
+    with 415.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0, jitter=0.0, list_size=100, compressed_requests=True):
+        BaseHTTPServer.HTTPServer.__init__(self, address, FakeMollomHandler)
+        self.compressed_requests = compressed_requests
+        self.latency = latency
+        self.jitter = jitter
+        self.list_size = list_size
+        self.ids = itertools.count(1)
+
+    def url(self):
+        return 'http://%s:%d/' % self.server_address
+
+
+class FakeMollomHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # send the status line, headers and body in one segment, rather than waiting
+    # for the client's delayed ACK between them
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        pass
+
+    def __answer(self, status, js):
+        body = json.dumps(js)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in (self.headers.get('Accept-Encoding') or '') and len(body) > 256:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __entry(self, kind, entry_id, data):
+        entry = { 'id': entry_id
+                , 'created': int(time.time())
+                , 'status': 1
+                , 'value': data.get('value', '%s-value-%s' % (kind, entry_id))
+                , 'context': data.get('context', kind == 'blacklist' and 'allFields' or 'authorIp')
+                , 'note': data.get('note', '')
+                }
+        if kind == 'blacklist':
+            entry['reason'] = data.get('reason', 'spam')
+            entry['match'] = data.get('match', 'contains')
+        return entry
+
+    def __list(self, kind, data):
+        offset = int(data.get('offset', 0))
+        count = int(data.get('count', self.server.list_size))
+        entries = [self.__entry(kind, str(i), {}) for i in xrange(offset, min(offset + count, self.server.list_size))]
+        return { 'list': entries
+               , 'listOffset': offset
+               , 'listCount': len(entries)
+               , 'listTotal': self.server.list_size
+               }
+
+    def __handle(self, method):
+        (_, _, path, query, _) = urlparse.urlsplit(self.path)
+        data = dict(urlparse.parse_qsl(query))
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = self.rfile.read(length)
+            if self.headers.get('Content-Encoding'):
+                if not self.server.compressed_requests:
+                    return self.__answer(415, {'code': 415, 'message': 'Unsupported Media Type'})
+                body = zlib.decompress(body, 32 + zlib.MAX_WBITS)
+            data.update(urlparse.parse_qsl(body))
+
+        delay = self.server.latency + random.random() * self.server.jitter
+        if delay:
+            time.sleep(delay)
+
+        parts = path.strip('/').split('/')
+        if not parts or parts[0] != 'v1' or len(parts) < 2:
+            return self.__answer(404, {'code': 404, 'message': 'Not found'})
+        resource = parts[1]
+        rest = parts[2:]
+
+        if resource == 'content':
+            content_id = rest and rest[0] or str(next(self.server.ids))
+            score = 'viagra' in data.get('postBody', '').lower() and 0.99 or 0.01
+            js = {'content': dict(data, id=content_id, spamScore=score,
+                                  spamClassification=score > 0.5 and 'spam' or 'ham')}
+        elif resource == 'site':
+            if method == 'GET' and not rest:
+                js = self.__list('site', data)
+                js['list'] = [{'id': 'site%s' % e['id'], 'publicKey': 'site%s' % e['id']} for e in js['list']]
+            else:
+                js = {'site': dict(data, id=rest and rest[0] or 'site', publicKey=rest and rest[0] or 'site')}
+        elif resource == 'captcha':
+            captcha_id = rest and rest[0] or str(next(self.server.ids))
+            if rest:
+                js = {'captcha': {'id': captcha_id, 'solved': data.get('solution') == 'correct' and 1 or 0}}
+            else:
+                js = {'captcha': {'id': captcha_id, 'url': '%scaptcha/%s.png' % (self.server.url(), captcha_id)}}
+        elif resource == 'feedback':
+            js = {}
+        elif resource in ('blacklist', 'whitelist'):
+            if len(rest) == 1 and method == 'GET':
+                js = self.__list(resource, data)
+            elif len(rest) == 3 and rest[2] == 'delete':
+                js = {}
+            else:
+                entry_id = len(rest) > 1 and rest[1] or str(next(self.server.ids))
+                js = {'entry': self.__entry(resource, entry_id, data)}
+        else:
+            return self.__answer(404, {'code': 404, 'message': 'Not found'})
+        self.__answer(200, js)
+
+    def do_GET(self):
+        self.__handle('GET')
+
+    def do_POST(self):
+        self.__handle('POST')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--list-size', type=int, default=100)
+    args = parser.parse_args()
+    server = FakeMollomServer(('127.0.0.1', args.port), args.latency, args.jitter, args.list_size)
+    print("Fake Mollom server listening on %s" % (server.url()))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,11 @@
 """Setup script for PyMollom"""
-from distutils.core import setup
+try:
+    from setuptools import setup
+    extras = {'extras_require': {'async': ['trollius; python_version < "3.4"']}}
+except ImportError:
+    # distutils has no optional dependencies: API.AsyncClient needs asyncio, or trollius on Python 2
+    from distutils.core import setup
+    extras = {}
 
 setup(name='PyMollom',
       version='0.1',
@@ -16,4 +22,5 @@ setup(name='PyMollom',
           'Topic :: Software Development :: Libraries :: Python Modules',
           'License :: OSI Approved :: GNU General Public License (GPL)',
           ],
+      **extras
       )
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# A scripted stand-in for the Mollom REST service, used by the tests of
+# the calls that go through the service layer
+# ---------------------------------------------------------------------
+
+import BaseHTTPServer
+import json
+import SocketServer
+import threading
+import time
+import unittest
+
+from PyMollom.API import Internals
+from PyMollom.API.ConnectionPool import ConnectionPool
+from PyMollom.API.Metrics import Metrics
+from PyMollom.API.Retry import RetryPolicy
+
+
+class ScriptedServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """Answers every request with the result of script(request), a tuple (status, fields
+    answered as JSON), optionally followed by the number of seconds to wait first. The
+    requests are kept in requests, as dicts with method, path, headers and body.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, script=None):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), ScriptedHandler)
+        self.script = script or (lambda request: (200, {}))
+        self.requests = []
+        self.lock = threading.Lock()
+        thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05})
+        thread.daemon = True
+        thread.start()
+
+    def url(self):
+        return 'http://%s:%d/' % self.server_address
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class ScriptedHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def __handle(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        request = { 'method': method
+                  , 'path': self.path
+                  , 'headers': dict(self.headers.items())
+                  , 'body': length and self.rfile.read(length) or ''
+                  }
+        with self.server.lock:
+            self.server.requests.append(request)
+        answer = self.server.script(request)
+        if len(answer) > 2:
+            time.sleep(answer[2])
+        body = json.dumps(answer[1])
+        try:
+            self.send_response(answer[0])
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except IOError:
+            # the client gave up on the answer
+            self.close_connection = 1
+
+    def do_GET(self):
+        self.__handle('GET')
+
+    def do_POST(self):
+        self.__handle('POST')
+
+
+class StaticServers(object):
+    """A server list holding the given servers, see API.Internals.set_server_list."""
+
+    def __init__(self, *servers):
+        self.servers = [server.url() for server in servers]
+
+    def get(self):
+        return self.servers
+
+
+class ServiceTestCase(unittest.TestCase):
+    """Points the service layer at a scripted server, with a pool, retry policy and
+    metrics of its own, and restores the settings of API.Internals afterwards.
+    """
+
+    def setUp(self):
+        self.server = ScriptedServer()
+        Internals.set_server_list(StaticServers(self.server))
+        Internals.set_connection_pool(ConnectionPool())
+        Internals.set_retry_policy(RetryPolicy(backoff=0.0))
+        self.metrics = Metrics()
+        Internals.set_metrics(self.metrics)
+
+    def tearDown(self):
+        Internals.set_server_list(None)
+        Internals.set_connection_pool(None)
+        Internals.set_retry_policy(None)
+        Internals.set_metrics(Metrics())
+        Internals.set_rate_limiter(None)
+        Internals.set_hedge_policy(None)
+        Internals.set_default_deadline(None)
+        Internals.set_compression(None)
+        self.server.close()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the non-blocking API calls
+# ---------------------------------------------------------------------
+
+import json
+import unittest
+
+from mollom_server import ServiceTestCase
+from PyMollom import DeadlineExceededError
+from PyMollom.API.Retry import RetryPolicy
+
+try:
+    from PyMollom.API.AsyncClient import asyncio, connection_pool, AsyncCaptcha, AsyncContent, AsyncFeedback
+except ImportError:
+    # neither asyncio nor trollius is available
+    asyncio = None
+
+CONTENT = {'id': 'content-1', 'spamScore': 0.0, 'spamClassification': 'ham', 'reason': 'some reason'}
+
+
+@unittest.skipIf(asyncio is None, "requires asyncio, or trollius on Python 2")
+class AsyncClientTest(ServiceTestCase):
+
+    def setUp(self):
+        super(AsyncClientTest, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        self.records = []
+        self.metrics.add_callback(self.records.append)
+
+    def tearDown(self):
+        connection_pool(self.loop).close()
+        self.loop.close()
+        super(AsyncClientTest, self).tearDown()
+
+    def run_call(self, future):
+        return self.loop.run_until_complete(future)
+
+    def test_check_content(self):
+        self.server.script = lambda request: (200, {'content': CONTENT})
+        client = AsyncContent('public', 'private', loop=self.loop)
+        response = self.run_call(client.check_content(postBody='Hello'))
+        self.assertEqual(response.id, 'content-1')
+        self.assertTrue(response.ham())
+        [request] = self.server.requests
+        self.assertEqual((request['method'], request['path']), ('POST', '/v1/content'))
+        self.assertEqual(request['headers']['host'], '%s:%d' % self.server.server_address)
+        self.assertTrue('authorization' in request['headers'])
+        self.assertEqual(self.records[0].status, 200)
+
+    def test_connection_is_reused(self):
+        self.server.script = lambda request: (200, {'captcha': {'id': 'captcha-1', 'url': 'http://example.com/1'}})
+        client = AsyncCaptcha('public', 'private', loop=self.loop)
+        for _ in xrange(3):
+            self.assertEqual(self.run_call(client.create_captcha('image'))['id'], 'captcha-1')
+        self.assertEqual(len(self.server.requests), 3)
+        [protocol] = client.pool.idle[('http',) + self.server.server_address]
+        self.assertEqual(protocol.used, 3)
+
+    def test_error_status_resolves_to_none(self):
+        self.server.script = lambda request: (404, {})
+        client = AsyncFeedback('public', 'private', loop=self.loop)
+        self.assertEqual(self.run_call(client.send('spam', content_id='content-1')), None)
+        self.assertEqual(self.records[0].status, 404)
+
+    def test_temporary_error_is_retried(self):
+        answers = [(503, {}), (200, {'content': CONTENT})]
+        self.server.script = lambda request: answers.pop(0)
+        client = AsyncContent('public', 'private', loop=self.loop)
+        self.assertEqual(self.run_call(client.check_content(postBody='Hello')).id, 'content-1')
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.records[0].retries, 1)
+
+    def test_deadline(self):
+        self.server.script = lambda request: (200, {'content': CONTENT}, 0.5)
+        client = AsyncContent('public', 'private', loop=self.loop)
+        self.assertRaises(DeadlineExceededError, self.run_call, client.check_content(postBody='Hello', deadline=0.1))
+        self.assertEqual(self.records[0].error, 'DeadlineExceeded')
+
+
+if __name__ == '__main__':
+    unittest.main()
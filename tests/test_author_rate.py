@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the sliding window author rate limit of the pre-filter
+# ---------------------------------------------------------------------
+
+import unittest
+
+from PyMollom.API.AuthorRate import AuthorRate, SlidingCountMin
+from PyMollom.API.PreFilter import PreFilter
+
+
+class SlidingCountMinTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sketch = SlidingCountMin(window=60.0, slices=6, width=1024, depth=4)
+
+    def test_counts(self):
+        for n in xrange(5):
+            self.assertEqual(self.sketch.add('a', now=100.0), n + 1)
+        self.sketch.add(u'Ren\xe9', count=3, now=100.0)
+        self.assertEqual(self.sketch.count('a', now=100.0), 5)
+        self.assertEqual(self.sketch.count(u'Ren\xe9', now=100.0), 3)
+        self.assertEqual(self.sketch.count('b', now=100.0), 0)
+        self.assertAlmostEqual(self.sketch.rate('a', now=100.0), 5 / 60.0)
+
+    def test_counts_are_never_too_low(self):
+        for n in xrange(2000):
+            self.sketch.add('key-%d' % (n % 500), now=100.0)
+        counts = [self.sketch.count('key-%d' % (n), now=100.0) for n in xrange(500)]
+        self.assertTrue(min(counts) >= 4, min(counts))
+        # with 500 keys in 1024 counters per row, most estimates are exact
+        self.assertTrue(counts.count(4) > 450, counts.count(4))
+
+    def test_window_slides(self):
+        self.sketch.add('a', now=0.0)
+        self.sketch.add('a', now=25.0)
+        self.sketch.add('a', now=55.0)
+        self.assertEqual(self.sketch.count('a', now=59.0), 3)
+        # the slice of the first event is cleared once time moves past the window
+        self.assertEqual(self.sketch.count('a', now=61.0), 2)
+        self.assertEqual(self.sketch.count('a', now=85.0), 1)
+        self.assertEqual(self.sketch.count('a', now=200.0), 0)
+
+    def test_clock_set_back(self):
+        self.sketch.add('a', now=100.0)
+        self.assertEqual(self.sketch.add('a', now=90.0), 2)
+
+    def test_memory(self):
+        self.assertEqual(self.sketch.memory(), 6 * 4 * 1024 * self.sketch.counters.itemsize)
+        self.assertRaises(ValueError, SlidingCountMin, depth=9)
+
+
+class AuthorRateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stage = AuthorRate(max_posts=3, sketch=SlidingCountMin(width=1024))
+
+    def test_fast_author_is_classified(self):
+        data = {'authorIp': '192.168.1.1', 'postBody': 'Hello'}
+        self.assertEqual([self.stage(data) for _ in xrange(4)], [None, None, None, ('spam', 'rate authorIp')])
+        # another author is not affected
+        self.assertEqual(self.stage({'authorIp': '192.168.1.2'}), None)
+
+    def test_every_field_is_counted(self):
+        for n in xrange(3):
+            self.stage({'authorIp': '192.168.1.%d' % (n), 'authorId': 'user-1'})
+        self.assertEqual(self.stage({'authorIp': '192.168.1.9', 'authorId': 'user-1'}), ('spam', 'rate authorId'))
+
+    def test_classification(self):
+        stage = AuthorRate(max_posts=0, classification='unsure', sketch=SlidingCountMin(width=1024))
+        self.assertEqual(stage({'authorId': u'Ren\xe9'}), ('unsure', 'rate authorId'))
+        self.assertEqual(stage({'postBody': 'no author fields'}), None)
+
+    def test_pre_filter_stage(self):
+        prefilter = PreFilter([self.stage])
+        for _ in xrange(5):
+            prefilter.check({'authorIp': '192.168.1.1'})
+        self.assertEqual(prefilter.stats()['hits'], {'rate authorIp': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
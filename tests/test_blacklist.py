@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the diffing of Blacklist.sync
+# ---------------------------------------------------------------------
+
+import threading
+import time
+import unittest
+
+from PyMollom.API.Blacklist import Blacklist, Context, Match, Reason, entry_key
+
+
+class RecordingBlacklist(Blacklist):
+    """A blacklist holding the given entries, which records the calls sync makes
+    rather than sending them to Mollom.
+    """
+
+    def __init__(self, entries, failing=()):
+        super(RecordingBlacklist, self).__init__('public', 'private')
+        self.entries = entries
+        self.failing = set(failing)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __record(self, call):
+        with self.lock:
+            self.calls.append(call)
+        return call[1] not in self.failing
+
+    def iter_entries(self, page_size=100, prefetch=True, deadline=None):
+        return iter(self.entries)
+
+    def create_entry(self, value, reason=Reason.SPAM, context=Context.ALL_FIELDS, match=Match.CONTAINS, status=None, note=None, deadline=None):
+        if self.__record(('create', value)):
+            return {'id': 'new', 'value': value}
+        return None
+
+    def update_entry(self, entry_id, value=None, reason=None, context=None, match=None, status=None, note=None, deadline=None):
+        changes = dict((k, v) for (k, v) in (('reason', reason), ('status', status), ('note', note)) if v is not None)
+        if self.__record(('update', entry_id, changes)):
+            return {'id': entry_id}
+        return None
+
+    def delete_entry(self, entry_id, deadline=None):
+        return self.__record(('delete', entry_id))
+
+
+def entry(id, value, context=Context.ALL_FIELDS, match=Match.CONTAINS, reason=Reason.SPAM, status=1, note=None):
+    return { 'id': id, 'value': value, 'context': context, 'match': match
+           , 'reason': reason, 'status': status, 'note': note
+           }
+
+
+class SyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.remote = [ entry('1', 'viagra')
+                      , entry('2', 'casino', reason=Reason.UNWANTED)
+                      , entry('3', 'bob@example.com', context=Context.AUTHOR_MAIL, match=Match.EXACT)
+                      , entry('4', 'old')
+                      , entry('5', 'VIAGRA')
+                      ]
+
+    def test_entry_key(self):
+        self.assertEqual(entry_key({'value': 'Spam'}), ('spam', Context.ALL_FIELDS, Match.CONTAINS))
+        self.assertEqual(entry_key(entry('1', 'x', Context.LINKS, Match.EXACT)), ('x', Context.LINKS, Match.EXACT))
+
+    def test_diff(self):
+        blacklist = RecordingBlacklist(self.remote)
+        desired = [ {'value': 'Viagra'}
+                  , {'value': 'casino', 'reason': Reason.SPAM}
+                  , {'value': 'bob@example.com', 'context': Context.AUTHOR_MAIL, 'match': Match.EXACT, 'status': '1'}
+                  , {'value': 'new', 'context': Context.LINKS}
+                  , {'value': 'NEW', 'context': Context.LINKS}
+                  ]
+        report = blacklist.sync(desired, dry_run=True)
+        self.assertEqual(report.creates, [{'value': 'new', 'context': Context.LINKS}])
+        self.assertEqual([(current['id'], changes) for (current, changes) in report.updates],
+                         [('2', {'reason': Reason.SPAM})])
+        # 'old' is not desired, and the second 'viagra' duplicates the first
+        self.assertEqual(sorted(e['id'] for e in report.deletes), ['4', '5'])
+        self.assertEqual(report.unchanged, 2)
+        self.assertEqual(report.failed, [])
+        self.assertEqual(blacklist.calls, [])
+
+    def test_same_value_in_another_context_is_a_different_entry(self):
+        blacklist = RecordingBlacklist([entry('1', 'viagra')])
+        report = blacklist.sync([{'value': 'viagra', 'context': Context.POST_TITLE}], dry_run=True)
+        self.assertEqual(len(report.creates), 1)
+        self.assertEqual([e['id'] for e in report.deletes], ['1'])
+
+    def test_applies_the_operations(self):
+        blacklist = RecordingBlacklist(self.remote)
+        report = blacklist.sync([{'value': 'viagra'}, {'value': 'casino', 'note': 'gambling'}, {'value': 'pills'}],
+                                concurrency=2)
+        self.assertEqual(sorted(blacklist.calls), [ ('create', 'pills')
+                                                  , ('delete', '3')
+                                                  , ('delete', '4')
+                                                  , ('delete', '5')
+                                                  , ('update', '2', {'note': 'gambling'})
+                                                  ])
+        self.assertEqual(report.failed, [])
+
+    def test_failed_operations_are_reported(self):
+        blacklist = RecordingBlacklist(self.remote, failing=('pills', '4'))
+        report = blacklist.sync([{'value': 'viagra'}, {'value': 'pills'}])
+        self.assertEqual(sorted((kind, argument.get('value')) for (kind, argument, _) in report.failed),
+                         [('create', 'pills'), ('delete', 'old')])
+
+    def test_utf8_values_match_unicode_entries(self):
+        blacklist = RecordingBlacklist([entry('1', u'caf\xe9')])
+        self.assertEqual(entry_key({'value': 'CAF\xc3\xa9'}), entry_key({'value': u'caf\xe9'}))
+        report = blacklist.sync([{'value': 'caf\xc3\xa9'}], dry_run=True)
+        self.assertEqual((report.creates, report.deletes, report.unchanged), ([], [], 1))
+
+    def test_non_ascii_fields_are_compared(self):
+        blacklist = RecordingBlacklist([entry('1', 'viagra', note=u'n\xf6te')])
+        report = blacklist.sync([{'value': 'viagra', 'note': 'n\xc3\xb6te'}], dry_run=True)
+        self.assertEqual(report.unchanged, 1)
+        report = blacklist.sync([{'value': 'viagra', 'note': u'n\xf6tes'}], dry_run=True)
+        self.assertEqual([changes for (_, changes) in report.updates], [{'note': u'n\xf6tes'}])
+
+    def test_rate(self):
+        blacklist = RecordingBlacklist([])
+        start = time.time()
+        blacklist.sync([{'value': str(n)} for n in xrange(6)], concurrency=6, rate=50)
+        # the operations start 1 / rate seconds apart, the first one right away
+        self.assertTrue(time.time() - start >= 5 / 50.0 - 0.01)
+        self.assertEqual(len(blacklist.calls), 6)
+
+    def test_in_sync(self):
+        blacklist = RecordingBlacklist(self.remote[:4])
+        report = blacklist.sync([dict((k, v) for (k, v) in e.items() if k != 'id') for e in self.remote[:4]])
+        self.assertEqual(report.operations(), [])
+        self.assertEqual(report.unchanged, 4)
+        self.assertEqual(blacklist.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
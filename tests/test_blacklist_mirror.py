@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the pattern matching of the local blacklist mirror
+# ---------------------------------------------------------------------
+
+import unittest
+
+from PyMollom.API.Blacklist import Context, Match
+from PyMollom.API.BlacklistMirror import AhoCorasick, BlacklistIndex
+
+
+def automaton(*patterns):
+    matcher = AhoCorasick()
+    for pattern in patterns:
+        matcher.add(pattern, pattern)
+    return matcher.compile()
+
+
+class AhoCorasickTest(unittest.TestCase):
+
+    def test_finds_the_first_pattern_that_ends(self):
+        matcher = automaton('he', 'she', 'his', 'hers')
+        self.assertEqual(matcher.search('ushers'), 'she')
+        self.assertEqual(matcher.search('ahis'), 'his')
+        self.assertEqual(matcher.search('xhex'), 'he')
+
+    def test_no_match(self):
+        matcher = automaton('he', 'she', 'his', 'hers')
+        self.assertEqual(matcher.search('xyz'), None)
+        self.assertEqual(matcher.search(''), None)
+        self.assertEqual(automaton().search('anything'), None)
+
+    def test_follows_failure_links(self):
+        # after the mismatch on 'x', the match continues from the suffix 'ab' of 'aab'
+        matcher = automaton('aabx', 'abc')
+        self.assertEqual(matcher.search('aabc'), 'abc')
+        self.assertEqual(matcher.search('aabx'), 'aabx')
+
+    def test_pattern_inside_a_longer_pattern(self):
+        # 'b' is only reachable through the failure link of 'ab'
+        matcher = automaton('abcd', 'b')
+        self.assertEqual(matcher.search('abx'), 'b')
+
+    def test_values_of_the_same_pattern(self):
+        matcher = AhoCorasick()
+        matcher.add('spam', 1)
+        matcher.add('spam', 2)
+        matcher.compile()
+        self.assertEqual(matcher.search('more spam'), 1)
+
+    def test_unicode(self):
+        matcher = automaton(u'caf\xe9', u'\u0441\u043f\u0430\u043c')
+        self.assertEqual(matcher.search(u'un caf\xe9 noir'), u'caf\xe9')
+        self.assertEqual(matcher.search(u'\u043d\u0435 \u0441\u043f\u0430\u043c'), u'\u0441\u043f\u0430\u043c')
+        self.assertEqual(matcher.search(u'cafe'), None)
+
+
+class BlacklistIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.entries = [ {'id': '1', 'value': 'Viagra', 'context': Context.ALL_FIELDS, 'match': Match.CONTAINS}
+                       , {'id': '2', 'value': 'spam.example.com', 'context': Context.LINKS, 'match': Match.CONTAINS}
+                       , {'id': '3', 'value': 'bob@example.com', 'context': Context.AUTHOR_MAIL, 'match': Match.EXACT}
+                       , {'id': '4', 'value': 'casino', 'context': Context.ALL_FIELDS, 'status': 0}
+                       ]
+        self.index = BlacklistIndex(self.entries)
+
+    def test_contains_is_case_insensitive(self):
+        self.assertEqual(self.index.match({'postBody': 'cheap VIAGRA here'})['id'], '1')
+
+    def test_links(self):
+        self.assertEqual(self.index.match({'postBody': 'see http://spam.example.com/x'})['id'], '2')
+        self.assertEqual(self.index.match({'authorUrl': 'http://spam.example.com/'})['id'], '2')
+        self.assertEqual(self.index.match({'postBody': 'spam.example.com without a scheme'}), None)
+
+    def test_exact(self):
+        self.assertEqual(self.index.match({'authorMail': 'Bob@Example.com'})['id'], '3')
+        self.assertEqual(self.index.match({'authorMail': 'bob@example.com.au'}), None)
+
+    def test_inactive_entries_are_skipped(self):
+        self.assertEqual(self.index.match({'postBody': 'online casino'}), None)
+
+    def test_utf8_fields(self):
+        self.assertEqual(self.index.match({'postTitle': 'caf\xc3\xa9 viagra'})['id'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the pool of pre-created CAPTCHAs
+# ---------------------------------------------------------------------
+
+import itertools
+import threading
+import time
+import unittest
+
+from PyMollom.API.Captcha import Captcha, Type
+from PyMollom.API.CaptchaPool import CaptchaPool
+
+
+class CountingCaptcha(Captcha):
+    """Creates numbered CAPTCHAs locally, and remembers the last one like Captcha does."""
+
+    def __init__(self):
+        super(CountingCaptcha, self).__init__('public', 'private')
+        self.numbers = itertools.count()
+        self.lock = threading.Lock()
+
+    def createCaptcha(self, type=Type.IMAGE, content_id=None, ssl=None, deadline=None):
+        with self.lock:
+            number = next(self.numbers)
+        self.captchaId = '%s-%d' % (type, number)
+        return {'id': self.captchaId, 'url': 'http://captcha/%s' % (self.captchaId)}
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class CaptchaPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.captcha = CountingCaptcha()
+        self.pool = CaptchaPool(self.captcha, low_watermark=2, high_watermark=4)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_fills_every_type(self):
+        self.assertTrue(wait_for(lambda: self.pool.size(Type.IMAGE) == 4 and self.pool.size(Type.AUDIO) == 4))
+
+    def test_hands_out_pooled_captchas(self):
+        self.assertTrue(wait_for(lambda: self.pool.size(Type.IMAGE) == 4))
+        captchas = [self.pool.get(Type.IMAGE) for _ in xrange(3)]
+        self.assertEqual(len(set(c['id'] for c in captchas)), 3)
+        self.assertEqual((self.pool.hits, self.pool.misses), (3, 0))
+        # dropping below the low watermark refills the type
+        self.assertTrue(wait_for(lambda: self.pool.size(Type.IMAGE) == 4))
+
+    def test_does_not_change_the_captcha_of_the_caller(self):
+        created = self.captcha.createCaptcha(Type.IMAGE)
+        self.assertTrue(wait_for(lambda: self.pool.size(Type.AUDIO) == 4))
+        self.pool.get(Type.IMAGE)
+        self.assertEqual(self.captcha.captchaId, created['id'])
+
+    def test_unknown_type_is_created_on_the_spot(self):
+        pool = CaptchaPool(self.captcha, types=(Type.IMAGE,), low_watermark=0, high_watermark=0)
+        try:
+            self.assertTrue(pool.get(Type.AUDIO)['id'].startswith(Type.AUDIO))
+            self.assertEqual(pool.size(Type.AUDIO), 0)
+            self.assertEqual((pool.hits, pool.misses), (0, 1))
+        finally:
+            pool.close()
+
+    def test_expired_captchas_are_replaced(self):
+        pool = CaptchaPool(self.captcha, types=(Type.IMAGE,), low_watermark=1, high_watermark=1, max_age=0.2)
+        try:
+            self.assertTrue(wait_for(lambda: pool.discarded >= 2))
+            self.assertTrue(wait_for(lambda: pool.size(Type.IMAGE) == 1))
+        finally:
+            pool.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the compression of request and response bodies
+# ---------------------------------------------------------------------
+
+import gzip
+import unittest
+import zlib
+
+from cStringIO import StringIO
+
+from mollom_server import ServiceTestCase
+from PyMollom.API import Internals
+from PyMollom.API.Compression import Compression, DEFLATE, GZIP
+
+SERVER = ('rest.mollom.com', None)
+BODY = 'postBody=' + 'spam%20' * 1000
+
+
+def gunzip(data):
+    return gzip.GzipFile(fileobj=StringIO(data)).read()
+
+
+class CompressionTest(unittest.TestCase):
+
+    def test_large_body_is_compressed(self):
+        headers = {}
+        body = Compression().encode(SERVER, BODY, headers)
+        self.assertEqual(headers, {'Content-Encoding': 'gzip', 'Accept-Encoding': 'gzip, deflate'})
+        self.assertTrue(len(body) < len(BODY))
+        self.assertEqual(gunzip(body), BODY)
+
+    def test_deflate(self):
+        headers = {}
+        body = Compression(encoding=DEFLATE, accept=False).encode(SERVER, BODY, headers)
+        self.assertEqual(headers, {'Content-Encoding': 'deflate'})
+        self.assertEqual(zlib.decompress(body), BODY)
+
+    def test_small_body_is_sent_as_it_is(self):
+        headers = {}
+        self.assertEqual(Compression().encode(SERVER, 'postBody=spam', headers), 'postBody=spam')
+        self.assertEqual(Compression(threshold=0).encode(SERVER, None, headers), None)
+        self.assertFalse('Content-Encoding' in headers)
+
+    def test_incompressible_body_is_sent_as_it_is(self):
+        body = ''.join(chr(n) for n in xrange(256)) * 2
+        body = zlib.compress(body, 9)
+        headers = {}
+        self.assertEqual(Compression(threshold=0).encode(SERVER, body, headers), body)
+        self.assertFalse('Content-Encoding' in headers)
+
+    def test_refusing_server_gets_plain_bodies(self):
+        compression = Compression()
+        compression.refused(SERVER)
+        headers = {}
+        self.assertEqual(compression.encode(SERVER, BODY, headers), BODY)
+        self.assertNotEqual(compression.encode(('rest2.mollom.com', None), BODY, {}), BODY)
+
+    def test_only_responses(self):
+        headers = {}
+        self.assertEqual(Compression(encoding=None).encode(SERVER, BODY, headers), BODY)
+        self.assertEqual(headers, {'Accept-Encoding': 'gzip, deflate'})
+
+    def test_unsupported_encoding(self):
+        self.assertRaises(ValueError, Compression, encoding='br')
+
+    def test_decode(self):
+        compression = Compression()
+        gzipped = StringIO()
+        with gzip.GzipFile(fileobj=gzipped, mode='wb') as f:
+            f.write('{"content": {}}')
+        raw = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.assertEqual(compression.decode('{}', None), '{}')
+        self.assertEqual(compression.decode('{}', 'identity'), '{}')
+        self.assertEqual(compression.decode(gzipped.getvalue(), 'gzip'), '{"content": {}}')
+        self.assertEqual(compression.decode(gzipped.getvalue(), 'x-gzip'), '{"content": {}}')
+        self.assertEqual(compression.decode(zlib.compress('{}'), ' Deflate'), '{}')
+        self.assertEqual(compression.decode(raw.compress('{}') + raw.flush(), 'deflate'), '{}')
+
+    def test_decode_errors(self):
+        compression = Compression()
+        self.assertRaises(IOError, compression.decode, '{}', 'br')
+        self.assertRaises(IOError, compression.decode, '{}', 'gzip')
+        self.assertRaises(IOError, compression.decode, '{}', 'deflate')
+
+
+class ServiceCompressionTest(ServiceTestCase):
+
+    def test_compressed_request(self):
+        Internals.set_compression(Compression(threshold=100))
+        Internals.service('public', 'private', 'POST', 'content', {'postBody': 'spam ' * 1000})
+        [request] = self.server.requests
+        self.assertEqual(request['headers']['content-encoding'], GZIP)
+        self.assertEqual(request['headers']['accept-encoding'], 'gzip, deflate')
+        self.assertEqual(gunzip(request['body']), 'postBody=' + 'spam%20' * 1000)
+
+    def test_refused_compression(self):
+        Internals.set_compression(Compression(threshold=100))
+        self.server.script = lambda request: ('content-encoding' in request['headers'] and 415 or 200, {})
+        for _ in xrange(2):
+            self.assertEqual(Internals.service('public', 'private', 'POST', 'content', {'postBody': 'spam ' * 1000},
+                                               decode=True), {})
+        # the refused request is sent again as it is, and so is the next one
+        self.assertEqual([request['headers'].get('content-encoding') for request in self.server.requests],
+                         [GZIP, None, None])
+        self.assertEqual(self.server.requests[2]['body'], 'postBody=' + 'spam%20' * 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the pool of keep-alive connections
+# ---------------------------------------------------------------------
+
+import BaseHTTPServer
+import SocketServer
+import socket
+import threading
+import unittest
+
+from PyMollom.API.ConnectionPool import ConnectionPool, PoolTimeoutError
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = 'connection %d' % (id(self.connection))
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        if self.path == '/close':
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.port = self.server.server_address[1]
+        thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05})
+        thread.daemon = True
+        thread.start()
+        self.pool = ConnectionPool(size=2, max_per_host=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get(self, path='/'):
+        return self.pool.request('http', '127.0.0.1', self.port, 'GET', path, timeout=5)
+
+    def test_reuses_connections(self):
+        (status, _, first) = self.get()
+        (_, _, second) = self.get()
+        self.assertEqual(status, 200)
+        self.assertEqual(first, second)
+        self.assertEqual((self.pool.hits, self.pool.misses), (1, 1))
+        self.assertEqual(self.pool.stats()['idle'], 1)
+
+    def test_closed_connections_are_not_reused(self):
+        self.get('/close')
+        self.assertEqual(self.pool.stats()['open'], 0)
+        self.get()
+        self.assertEqual((self.pool.hits, self.pool.misses), (0, 2))
+
+    def test_exhausted_endpoint_waits_for_a_connection(self):
+        taken = [self.pool.acquire('http', '127.0.0.1', self.port) for _ in xrange(2)]
+        self.assertRaises(PoolTimeoutError, self.pool.acquire, 'http', '127.0.0.1', self.port, timeout=0.05)
+
+        # a connection handed back wakes up a waiting call
+        threading.Timer(0.05, self.pool.release, args=(taken[0][0], 'http', '127.0.0.1', self.port)).start()
+        (connection, reused) = self.pool.acquire('http', '127.0.0.1', self.port, timeout=5)
+        self.assertTrue(connection is taken[0][0])
+        self.assertTrue(reused)
+
+    def test_idle_connections_are_bounded(self):
+        taken = [self.pool.acquire('http', '127.0.0.1', port) for port in (1, 2, 3)]
+        for (connection, _), port in zip(taken, (1, 2, 3)):
+            self.pool.release(connection, 'http', '127.0.0.1', port)
+        self.assertEqual(self.pool.stats()['idle'], 2)
+        self.assertEqual(self.pool.stats()['open'], 2)
+
+    def test_release_on_error(self):
+        # an invalid header value makes httplib raise a ValueError
+        for _ in xrange(3):
+            self.assertRaises(ValueError, self.pool.request, 'http', '127.0.0.1', self.port, 'GET', '/',
+                              headers={'X-Bad': 'a\nb'}, timeout=5)
+        self.assertEqual(self.pool.stats()['open'], 0)
+        (status, _, _) = self.get()
+        self.assertEqual(status, 200)
+
+    def test_release_on_connection_error(self):
+        self.assertRaises(socket.error, self.pool.request, 'http', '127.0.0.1', 1, 'GET', '/', timeout=5)
+        self.assertEqual(self.pool.stats()['open'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
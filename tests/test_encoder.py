@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the precompiled request encoders
+# ---------------------------------------------------------------------
+
+import unittest
+
+from PyMollom.API.Content import CONTENT_ENCODER
+from PyMollom.API.Encoder import Encoder, text
+from PyMollom.API.Internals import sign_request
+from PyMollom.API.Signer import Signer, encode_pairs
+
+URL = 'http://rest.mollom.com/v1/content'
+ENCODER = Encoder((('post_title', 'postTitle'), ('post_body', 'postBody'), ('checks', 'checks')))
+
+
+class EncoderTest(unittest.TestCase):
+
+    def test_absent_arguments_are_left_out(self):
+        request = ENCODER.encode({'post_body': 'Hello', 'post_title': None, 'unknown': 'ignored'})
+        self.assertEqual(request.fields, {'postBody': 'Hello'})
+        self.assertEqual(request.pairs, [('postBody', 'Hello')])
+
+    def test_values_are_percent_encoded(self):
+        request = ENCODER.encode({'post_title': u'Caf\xe9 & bar', 'post_body': 'a=b'})
+        self.assertEqual(request.fields['postTitle'], u'Caf\xe9 & bar')
+        self.assertEqual(request.encoded(), 'postTitle=Caf%C3%A9%20%26%20bar&postBody=a%3Db')
+
+    def test_list_values_give_a_pair_each(self):
+        request = ENCODER.encode({'checks': ['spam', 'quality']})
+        self.assertEqual(request.fields, {'checks': ['spam', 'quality']})
+        self.assertEqual(request.encoded(), 'checks=spam&checks=quality')
+
+    def test_same_pairs_as_a_dict(self):
+        arguments = {'post_title': u'Caf\xe9', 'post_body': 'Hello, world!', 'checks': ('spam',)}
+        request = ENCODER.encode(arguments)
+        fields = dict((field, arguments[name]) for (name, field) in ENCODER.mapping)
+        self.assertEqual(sorted(request.pairs), sorted(encode_pairs(fields)))
+
+    def test_request_is_signed_and_sent_as_encoded(self):
+        request = CONTENT_ENCODER.encode({'post_body': 'Hello, world!', 'author_name': 'Ren\xc3\xa9'})
+        (_, _, _, _, body, headers) = sign_request('public', 'private', 'POST', 'content', request,
+                                                   'http://rest.mollom.com/')
+        self.assertEqual(body, request.encoded())
+        self.assertTrue(headers['Authorization'].startswith('OAuth '))
+        # the pairs are signed as the fields they were encoded from
+        signer = Signer('public', 'private')
+        self.assertEqual(signer.signature('POST', URL, request.pairs, 'nonce', '1318467427'),
+                         signer.signature('POST', URL, request.fields, 'nonce', '1318467427'))
+
+    def test_get_parameters_go_in_the_query_string(self):
+        request = ENCODER.encode({'post_body': 'a b'})
+        (_, _, _, path, body, _) = sign_request('public', 'private', 'GET', 'content/1', request,
+                                                'http://rest.mollom.com/')
+        self.assertEqual((path, body), ('/v1/content/1?postBody=a%20b', None))
+
+
+class TextTest(unittest.TestCase):
+
+    def test_utf8_bytes_are_decoded(self):
+        self.assertEqual(text('Ren\xc3\xa9'), u'Ren\xe9')
+
+    def test_invalid_bytes_are_replaced(self):
+        self.assertEqual(text('Ren\xe9'), u'Ren\ufffd')
+
+    def test_other_values(self):
+        self.assertEqual(text(u'Ren\xe9'), u'Ren\xe9')
+        self.assertEqual(text(12), u'12')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the offline fallback classifier
+# ---------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mollom_server import ServiceTestCase
+from PyMollom.API.Content import Content
+from PyMollom.API.Fallback import NaiveBayes, features
+from PyMollom.API.Feedback import Feedback
+from PyMollom.API.Retry import RetryPolicy
+from PyMollom.API import Internals
+
+SPAM = {'postBody': u'Buy cheap pills at http://pills.example.com now', 'authorMail': 'seller@spam.example.com'}
+HAM = {'postBody': u'Thanks for the thoughtful article about gardening', 'authorMail': 'reader@example.org'}
+
+
+def trained(count=10, **arguments):
+    classifier = NaiveBayes(**arguments)
+    for n in xrange(count):
+        classifier.train(SPAM, 'spam', 'spam-%d' % (n))
+        classifier.train(HAM, 'ham', 'ham-%d' % (n))
+    return classifier
+
+
+class FeaturesTest(unittest.TestCase):
+
+    def test_features(self):
+        found = features({ 'postBody': u'Visit http://Example.com/x, 42 times!'
+                         , 'authorMail': 'Someone@Mail.Example.com'
+                         , 'authorIp': '192.168.1.20'
+                         , 'authorName': u'Ren\xe9'
+                         })
+        self.assertEqual(found, set([ u'visit', u'http', u'example', u'com', u'times', u'link:example.com'
+                                    , u'mail:mail.example.com', u'net:192.168.1', u'authorName:ren\xe9']))
+
+    def test_ipv6_network(self):
+        self.assertEqual(features({'authorIp': '2001:db8::1'}), set([u'net:2001:db8:']))
+
+    def test_features_are_bounded(self):
+        found = features({'postBody': u' '.join('word%s' % chr(97 + n % 26) * (1 + n // 26) for n in xrange(100))},
+                         max_features=10)
+        self.assertEqual(len(found), 10)
+
+
+class NaiveBayesTest(unittest.TestCase):
+
+    def test_no_verdict_before_min_trained(self):
+        self.assertEqual(trained(count=9).classify(SPAM), None)
+        self.assertEqual(trained(count=1, min_trained=1).classify(SPAM)[0], 'spam')
+
+    def test_classify(self):
+        classifier = trained()
+        (classification, probability) = classifier.classify(dict(SPAM, postBody=u'cheap pills'))
+        self.assertEqual(classification, 'spam')
+        self.assertTrue(probability >= 0.9)
+        self.assertEqual(classifier.classify(dict(HAM, postBody=u'a thoughtful article'))[0], 'ham')
+        self.assertEqual(classifier.classify({'postBody': u'unrelated'})[0], 'unsure')
+
+    def test_other_labels_are_ignored(self):
+        classifier = trained()
+        classifier.train(SPAM, 'unsure')
+        self.assertEqual(classifier.totals, [10, 10])
+
+    def test_feedback_corrects_the_label(self):
+        classifier = trained()
+        self.assertTrue(classifier.feedback('ham-0', 'spam'))
+        self.assertEqual(classifier.totals, [11, 9])
+        # the same label again, unknown content and unknown reasons change nothing
+        self.assertFalse(classifier.feedback('ham-0', 'profanity'))
+        self.assertFalse(classifier.feedback('unknown', 'spam'))
+        self.assertFalse(classifier.feedback('spam-0', 'delete'))
+        self.assertEqual(classifier.totals, [11, 9])
+
+    def test_training_the_same_content_again_replaces_it(self):
+        classifier = trained()
+        classifier.train(HAM, 'spam', 'ham-0')
+        self.assertEqual(classifier.totals, [11, 9])
+
+    def test_remembered_contents_are_bounded(self):
+        classifier = trained(remember=5)
+        self.assertEqual(len(classifier.recent), 5)
+        self.assertFalse(classifier.feedback('spam-0', 'approve'))
+
+    def test_counts_are_bounded(self):
+        classifier = NaiveBayes(max_counts=10)
+        classifier.train({'postBody': u'common rare'}, 'spam')
+        classifier.train({'postBody': u'common'}, 'ham')
+        classifier.train({'postBody': u' '.join(u'word' + chr(97 + n) for n in xrange(10))}, 'ham')
+        self.assertTrue(len(classifier.counts) <= 11, len(classifier.counts))
+        self.assertTrue(u'common' in classifier.counts)
+
+    def test_save_and_load(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'fallback.json')
+            classifier = trained()
+            classifier.save(path)
+            loaded = NaiveBayes()
+            loaded.load(path)
+            self.assertEqual(loaded.classify(SPAM), classifier.classify(SPAM))
+            self.assertEqual(os.listdir(directory), ['fallback.json'])
+        finally:
+            shutil.rmtree(directory)
+
+
+class ContentFallbackTest(ServiceTestCase):
+
+    def setUp(self):
+        super(ContentFallbackTest, self).setUp()
+        Internals.set_retry_policy(RetryPolicy(backoff=0.0, max_retries=0))
+        self.classifier = NaiveBayes(min_trained=1)
+        self.content = Content('public', 'private', fallback=self.classifier)
+
+    def test_verdicts_of_mollom_are_learnt(self):
+        self.server.script = lambda request: (200, {'content': {'id': 'content-1', 'spamClassification': 'spam'}})
+        self.assertEqual(self.content.checkContent(post_body=SPAM['postBody']).id, 'content-1')
+        self.assertEqual(self.classifier.totals, [1, 0])
+        Feedback('public', 'private', fallback=self.classifier).send('approve', content_id='content-1')
+        self.assertEqual(self.classifier.totals, [0, 1])
+
+    def test_fallback_verdict_when_mollom_fails(self):
+        self.classifier.train(SPAM, 'spam')
+        self.classifier.train(HAM, 'ham')
+        self.server.script = lambda request: (503, {})
+        verdict = self.content.checkContent(post_body=SPAM['postBody'])
+        self.assertEqual((verdict.id, verdict.reason, verdict.spam_classification), (None, 'fallback', 'spam'))
+
+    def test_no_fallback_verdict_without_training(self):
+        self.server.script = lambda request: (503, {})
+        self.assertEqual(self.content.checkContent(post_body=SPAM['postBody']), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
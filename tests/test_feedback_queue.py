@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the spool of the write-behind feedback queue
+# ---------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from PyMollom.API.FeedbackQueue import FeedbackQueue
+
+
+class RecordingFeedback(object):
+    """Stands in for API.Feedback.Feedback, recording the feedback sent, and refusing
+    the content IDs in refused.
+    """
+
+    def __init__(self, refused=()):
+        self.refused = set(refused)
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send(self, reason, content_id=None, captcha_id=None, type=None):
+        if content_id in self.refused:
+            return False
+        with self.lock:
+            self.sent.append((content_id, reason))
+        return True
+
+
+class FeedbackQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.spool = os.path.join(self.directory, 'feedback.spool')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def queue(self, feedback, **kwargs):
+        # batches are only sent by flush and close
+        return FeedbackQueue(feedback, spool=self.spool, flush_interval=3600, **kwargs)
+
+    def records(self):
+        with open(self.spool) as f:
+            return [json.loads(line) for line in f]
+
+    def test_pending_items_are_replayed(self):
+        queue = self.queue(RecordingFeedback(refused=('1', '2', '3')))
+        queue.submit('spam', content_id='1')
+        queue.submit('spam', content_id='2')
+        queue.submit('ham', content_id='2')
+        queue.submit('spam', captcha_id='c')
+        queue.close()
+        self.assertEqual(queue.coalesced, 1)
+
+        feedback = RecordingFeedback()
+        queue = self.queue(feedback)
+        self.assertEqual(queue.pending(), 2)
+        self.assertEqual(queue.flush(), 2)
+        queue.close()
+        # the CAPTCHA feedback was sent before the restart
+        self.assertEqual(sorted(feedback.sent), [('1', 'spam'), ('2', 'ham')])
+
+        queue = self.queue(feedback)
+        self.assertEqual(queue.pending(), 0)
+        queue.close()
+
+    def test_spool_is_compacted_on_load(self):
+        queue = self.queue(RecordingFeedback(refused=('1',)))
+        for reason in ('spam', 'ham', 'spam'):
+            queue.submit(reason, content_id='1')
+        queue.submit('spam', content_id='2')
+        queue.close()
+
+        queue = self.queue(RecordingFeedback(refused=('1',)))
+        self.assertEqual([(r['op'], r['key'], r['item']['reason']) for r in self.records()],
+                         [('add', 'content:1', 'spam')])
+        queue.close()
+
+    def test_truncated_line_is_skipped(self):
+        queue = self.queue(RecordingFeedback(refused=('1', '2')))
+        queue.submit('spam', content_id='1')
+        queue.submit('spam', content_id='2')
+        queue.close()
+        with open(self.spool) as f:
+            data = f.read()
+        with open(self.spool, 'w') as f:
+            f.write(data[:-10])
+
+        queue = self.queue(RecordingFeedback(refused=('1', '2')))
+        self.assertEqual(queue.pending(), 1)
+        # new feedback for the replayed content replaces it
+        queue.submit('ham', content_id='1')
+        self.assertEqual(queue.coalesced, 1)
+        queue.close()
+
+    def test_dead_letters_are_replayed(self):
+        feedback = RecordingFeedback(refused=('unknown',))
+        queue = self.queue(feedback, max_attempts=1)
+        queue.submit('spam', content_id='unknown')
+        queue.submit('spam', content_id='1')
+        self.assertEqual(queue.flush(), 1)
+        self.assertEqual([item['content_id'] for item in queue.dead_letters], ['unknown'])
+        self.assertEqual(queue.pending(), 0)
+        queue.close()
+
+        queue = self.queue(RecordingFeedback())
+        self.assertEqual(queue.pending(), 0)
+        self.assertEqual([item['content_id'] for item in queue.dead_letters], ['unknown'])
+        queue.close()
+        self.assertEqual(feedback.sent, [('1', 'spam')])
+
+    def test_failed_item_waits_before_the_next_attempt(self):
+        feedback = RecordingFeedback(refused=('1',))
+        queue = self.queue(feedback, max_attempts=3)
+        queue.submit('spam', content_id='1')
+        queue.submit('spam', content_id='2')
+        self.assertEqual(queue.flush(), 1)
+        # the failed item is not tried again before its delay passed
+        self.assertEqual(queue.flush(), 0)
+        self.assertEqual(queue.failed, 1)
+        self.assertEqual(queue.pending(), 1)
+        queue.close()
+
+    def test_without_spool(self):
+        feedback = RecordingFeedback()
+        queue = FeedbackQueue(feedback, flush_interval=3600)
+        queue.submit('spam', content_id='1')
+        queue.close()
+        self.assertEqual(feedback.sent, [('1', 'spam')])
+        self.assertFalse(os.path.exists(self.spool))
+        self.assertRaises(ValueError, queue.submit, 'spam', content_id='2')
+
+
+if __name__ == '__main__':
+    unittest.main()
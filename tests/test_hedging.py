@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the hedging of idempotent calls
+# ---------------------------------------------------------------------
+
+import time
+import unittest
+
+from mollom_server import ScriptedServer, ServiceTestCase, StaticServers
+from PyMollom.API import Internals
+from PyMollom.API.Hedging import HedgePolicy
+
+
+class HedgePolicyTest(unittest.TestCase):
+
+    def test_no_delay_before_min_samples(self):
+        policy = HedgePolicy(min_samples=3)
+        policy.observe('content', 0.1)
+        policy.observe('content', 0.1)
+        self.assertEqual(policy.delay('content'), None)
+        policy.observe('content', 0.1)
+        self.assertEqual(policy.delay('content'), 0.1)
+        self.assertEqual(policy.delay('captcha'), None)
+
+    def test_percentile(self):
+        policy = HedgePolicy(percentile=90, min_samples=1, window=100)
+        for n in xrange(100):
+            policy.observe('content', n / 1000.0)
+        self.assertEqual(policy.delay('content'), 0.09)
+
+    def test_min_delay(self):
+        policy = HedgePolicy(min_samples=1, min_delay=0.05)
+        policy.observe('content', 0.001)
+        self.assertEqual(policy.delay('content'), 0.05)
+
+    def test_budget(self):
+        policy = HedgePolicy(max_extra=0.5, max_burst=1)
+        policy.charge()
+        self.assertFalse(policy.spend())
+        for _ in xrange(10):
+            policy.charge()
+        # the budget saves up at most max_burst duplicates
+        self.assertTrue(policy.spend())
+        self.assertFalse(policy.spend())
+        self.assertEqual(policy.stats(), {'calls': 11, 'hedged': 1})
+
+
+class HedgedCallTest(ServiceTestCase):
+
+    def setUp(self):
+        super(HedgedCallTest, self).setUp()
+        self.alternate = ScriptedServer(lambda request: (200, {'answer': 'alternate'}))
+        Internals.set_server_list(StaticServers(self.server, self.alternate))
+        self.policy = HedgePolicy(min_samples=1, max_extra=1.0)
+        self.policy.observe('content', 0.01)
+        Internals.set_hedge_policy(self.policy)
+        self.records = []
+        self.metrics.add_callback(self.records.append)
+
+    def tearDown(self):
+        super(HedgedCallTest, self).tearDown()
+        self.alternate.close()
+
+    def test_slow_server_is_hedged(self):
+        self.server.script = lambda request: (200, {'answer': 'preferred, padded to be longer'}, 0.3)
+        start = time.time()
+        answer = Internals.service('public', 'private', 'GET', 'content/1', decode=True, hedge=True)
+        self.assertEqual(answer, {'answer': 'alternate'})
+        self.assertTrue(time.time() - start < 0.25)
+        self.assertEqual(self.policy.stats()['hedged'], 1)
+
+    def test_only_the_winning_request_is_recorded(self):
+        self.server.script = lambda request: (200, {'answer': 'preferred, padded to be longer'}, 0.3)
+        Internals.service('public', 'private', 'GET', 'content/1', hedge=True)
+        [record] = self.records
+        measured = (record.bytes_sent, record.bytes_received, record.sign_time, record.network_time)
+        self.assertTrue(record.hedged)
+        self.assertEqual(record.bytes_received, len('{"answer": "alternate"}'))
+        # the losing request completes afterwards, and must not change the record
+        time.sleep(0.4)
+        self.assertEqual((record.bytes_sent, record.bytes_received, record.sign_time, record.network_time), measured)
+        self.assertEqual(len(self.records), 1)
+
+    def test_fast_server_is_not_hedged(self):
+        self.server.script = lambda request: (200, {'answer': 'preferred'})
+        self.policy.observe('content', 1.0)
+        self.policy.min_delay = 0.2
+        answer = Internals.service('public', 'private', 'GET', 'content/1', decode=True, hedge=True)
+        self.assertEqual(answer, {'answer': 'preferred'})
+        self.assertEqual(len(self.alternate.requests), 0)
+        self.assertFalse(self.records[0].hedged)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the lazy import of the API modules by the package
+# ---------------------------------------------------------------------
+
+import subprocess
+import sys
+import unittest
+
+
+def loaded_after(statement):
+    """Returns the names of the PyMollom modules loaded after running statement in a fresh interpreter."""
+    # Python 2 records the failed implicit relative imports, e.g. PyMollom.sys, as None
+    code = ("import sys\n%s\nprint(' '.join(sorted(name for (name, module) in sys.modules.items()"
+            " if name.startswith('PyMollom') and module is not None)))") % (statement)
+    return subprocess.check_output([sys.executable, '-c', code]).split()
+
+
+def import_time(statement):
+    """Returns the number of seconds it takes to run statement in a fresh interpreter."""
+    code = "import time\nstart = time.time()\n%s\nprint(time.time() - start)" % (statement)
+    return float(subprocess.check_output([sys.executable, '-c', code]))
+
+
+class LazyImportTest(unittest.TestCase):
+
+    def test_import_loads_no_api_module(self):
+        self.assertEqual(loaded_after('import PyMollom'), ['PyMollom'])
+
+    def test_star_import_loads_no_api_module(self):
+        self.assertEqual(loaded_after('from PyMollom import *\nassert MollomError and MOLLOM_VERSION'), ['PyMollom'])
+
+    def test_content_is_loaded_on_first_use(self):
+        modules = loaded_after('import PyMollom\nassert PyMollom.Content.Content')
+        self.assertTrue('PyMollom.API.Content' in modules, modules)
+
+    def test_import_time(self):
+        # benchmarks/bench_import.py holds the package to 5 ms; ten times that leaves room for a
+        # loaded machine, so this only catches gross regressions, and the tests above catch an
+        # API module that is imported eagerly
+        runs = sorted(import_time('import PyMollom') for _ in range(5))
+        self.assertTrue(runs[2] < 0.05, runs)
+
+    def test_unknown_attribute(self):
+        import PyMollom
+        self.assertRaises(AttributeError, getattr, PyMollom, 'NoSuchModule')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the helpers of API.Internals
+# ---------------------------------------------------------------------
+
+import threading
+import time
+import unittest
+
+from PyMollom.API.Internals import paginate, parallel_map
+
+
+class FakeList(object):
+    """Answers the list calls of paginate from a list of items, like Mollom does."""
+
+    def __init__(self, items, fail_at=None):
+        self.items = items
+        self.fail_at = fail_at
+        self.calls = []
+
+    def __call__(self, offset, count):
+        self.calls.append((offset, count))
+        if offset == self.fail_at:
+            return None
+        return { 'list': self.items[offset:offset + count]
+               , 'listOffset': offset
+               , 'listCount': count
+               , 'listTotal': len(self.items)
+               }
+
+
+class PaginateTest(unittest.TestCase):
+
+    def test_all_items_in_order(self):
+        fetch = FakeList(range(25))
+        self.assertEqual(list(paginate(fetch, page_size=10)), range(25))
+        self.assertEqual(fetch.calls, [(0, 10), (10, 10), (20, 10)])
+
+    def test_without_prefetch(self):
+        fetch = FakeList(range(25))
+        self.assertEqual(list(paginate(fetch, page_size=10, prefetch=False)), range(25))
+
+    def test_full_last_page_needs_no_extra_call(self):
+        fetch = FakeList(range(20))
+        self.assertEqual(list(paginate(fetch, page_size=10)), range(20))
+        self.assertEqual(len(fetch.calls), 2)
+
+    def test_empty_list(self):
+        fetch = FakeList([])
+        self.assertEqual(list(paginate(fetch, page_size=10)), [])
+        self.assertEqual(fetch.calls, [(0, 10)])
+
+    def test_failed_page_raises_after_the_fetched_items(self):
+        fetch = FakeList(range(25), fail_at=10)
+        seen = []
+        with self.assertRaises(IOError):
+            for item in paginate(fetch, page_size=10):
+                seen.append(item)
+        self.assertEqual(seen, range(10))
+
+    def test_failed_first_page_raises(self):
+        with self.assertRaises(IOError):
+            list(paginate(FakeList(range(5), fail_at=0), page_size=10))
+
+    def test_prefetches_the_next_page(self):
+        fetch = FakeList(range(30))
+        pages = paginate(fetch, page_size=10)
+        next(pages)
+        deadline = time.time() + 5
+        while len(fetch.calls) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        # the second page is fetched while the first is consumed, but not the third
+        self.assertEqual(fetch.calls, [(0, 10), (10, 10)])
+
+
+class ParallelMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.threads = threading.active_count()
+
+    def tearDown(self):
+        # the workers stop shortly after the generator is done or closed
+        deadline = time.time() + 5
+        while threading.active_count() > self.threads and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(threading.active_count(), self.threads)
+
+    def test_ordered_results(self):
+        def slow_square(n):
+            time.sleep((10 - n) * 0.002)
+            return n * n
+        results = list(parallel_map(slow_square, range(10), concurrency=4))
+        self.assertEqual(results, [(n, n * n, None) for n in xrange(10)])
+
+    def test_unordered_results(self):
+        results = list(parallel_map(lambda n: n * n, range(50), concurrency=4, ordered=False))
+        self.assertEqual(sorted(results), [(n, n * n, None) for n in xrange(50)])
+
+    def test_error_is_reported_with_its_item(self):
+        def check(n):
+            if n == 3:
+                raise ValueError(n)
+            return n
+        results = list(parallel_map(check, range(6), concurrency=2))
+        self.assertEqual([(index, result) for (index, result, error) in results],
+                         [(0, 0), (1, 1), (2, 2), (3, None), (4, 4), (5, 5)])
+        self.assertTrue(isinstance(results[3][2], ValueError))
+        self.assertEqual([error for (_, _, error) in results if error is not None], [results[3][2]])
+
+    def test_failing_iterable_raises(self):
+        def items():
+            yield 1
+            raise KeyError('items')
+        with self.assertRaises(KeyError):
+            list(parallel_map(lambda n: n, items(), concurrency=2))
+
+    def test_failing_iterable_raises_after_the_last_result(self):
+        def items():
+            yield 1
+            yield 2
+            time.sleep(0.1)
+            raise KeyError('items')
+        results = parallel_map(lambda n: n, items(), concurrency=2)
+        next(results)
+        # both results, and then the failure, are queued while the consumer is away
+        time.sleep(0.3)
+        with self.assertRaises(KeyError):
+            list(results)
+
+    def test_empty_iterable(self):
+        self.assertEqual(list(parallel_map(lambda n: n, [], concurrency=2)), [])
+
+    def test_runs_concurrently(self):
+        active = [0, 0]
+        lock = threading.Lock()
+
+        def work(n):
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+        list(parallel_map(work, range(16), concurrency=4))
+        self.assertEqual(active[1], 4)
+
+    def test_slow_consumer_bounds_the_items_taken(self):
+        taken = [0]
+
+        def items():
+            for n in xrange(1000):
+                taken[0] += 1
+                yield n
+        results = parallel_map(lambda n: n, items(), concurrency=2)
+        next(results)
+        time.sleep(0.3)
+        # 3 * concurrency items may be taken before their results are yielded, one more
+        # has been yielded, and the feeder holds the next one until a result is
+        self.assertTrue(taken[0] <= 3 * 2 + 2, taken[0])
+        results.close()
+
+    def test_slow_item_bounds_the_items_taken(self):
+        taken = [0]
+        release = threading.Event()
+
+        def items():
+            for n in xrange(1000):
+                taken[0] += 1
+                yield n
+
+        def work(n):
+            if n == 0:
+                release.wait(5)
+            return n
+        results = parallel_map(work, items(), concurrency=2)
+        time.sleep(0.3)
+        self.assertTrue(taken[0] <= 3 * 2 + 1, taken[0])
+        release.set()
+        self.assertEqual([result for (_, result, _) in results], range(1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
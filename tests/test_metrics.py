@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the metrics of the calls to the Mollom service
+# ---------------------------------------------------------------------
+
+import unittest
+
+from mollom_server import ServiceTestCase
+from PyMollom.API import Internals
+from PyMollom.API.Metrics import CallRecord, Histogram, Metrics
+
+
+def record(method, path, status=200, error=None, sent=10, received=20, network=0.002, retries=0):
+    call = CallRecord(method, path)
+    (call.status, call.error) = (status, error)
+    (call.bytes_sent, call.bytes_received) = (sent, received)
+    (call.sign_time, call.network_time) = (0.0002, network)
+    call.retries = retries
+    return call
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_observations_are_bucketed(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+        self.assertEqual(list(histogram.cumulative()), [(0.1, 2), (1.0, 3)])
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics(buckets=(0.001, 0.01))
+
+    def test_calls_are_aggregated_per_endpoint(self):
+        self.metrics.record(record('POST', 'content'))
+        self.metrics.record(record('POST', 'content/1', retries=2))
+        self.metrics.record(record('POST', 'captcha', status=None, error='timeout'))
+        self.assertEqual(self.metrics.requests, { ('content', 'POST', 200): 2
+                                                , ('captcha', 'POST', 'timeout'): 1
+                                                })
+        self.assertEqual(self.metrics.retries, {'content': 2, 'captcha': 0})
+        self.assertEqual(self.metrics.sent, {'content': 20, 'captcha': 10})
+        self.assertEqual(self.metrics.received, {'content': 40, 'captcha': 20})
+        self.assertEqual(self.metrics.times[('network', 'content')].count, 2)
+        self.assertFalse(('decode', 'content') in self.metrics.times)
+
+    def test_callbacks(self):
+        calls = []
+        self.metrics.add_callback(calls.append)
+        call = record('GET', 'site/1')
+        self.metrics.record(call)
+        self.metrics.remove_callback(calls.append)
+        self.metrics.record(record('GET', 'site/1'))
+        self.assertEqual(calls, [call])
+
+    def test_record_add(self):
+        call = record('GET', 'site/1')
+        call.add(record('GET', 'site/1', sent=1, received=2, network=0.5))
+        self.assertEqual((call.bytes_sent, call.bytes_received), (11, 22))
+        self.assertAlmostEqual(call.network_time, 0.502)
+        self.assertEqual(call.retries, 0)
+
+    def test_prometheus(self):
+        self.metrics.record(record('POST', 'content', network=0.005))
+        self.metrics.record(record('POST', 'content', status=None, error='a "quoted" \\ name'))
+        lines = self.metrics.prometheus().splitlines()
+        self.assertTrue('# TYPE mollom_requests_total counter' in lines)
+        self.assertTrue('mollom_requests_total{endpoint="content",method="POST",status="200"} 1' in lines)
+        self.assertTrue('mollom_requests_total{endpoint="content",method="POST",'
+                        'status="a \\"quoted\\" \\\\ name"} 1' in lines)
+        self.assertTrue('mollom_sent_bytes_total{endpoint="content"} 20' in lines)
+        self.assertTrue('# TYPE mollom_network_seconds histogram' in lines)
+        self.assertTrue('mollom_network_seconds_bucket{endpoint="content",le="0.001"} 0' in lines)
+        self.assertTrue('mollom_network_seconds_bucket{endpoint="content",le="0.01"} 2' in lines)
+        self.assertTrue('mollom_network_seconds_bucket{endpoint="content",le="+Inf"} 2' in lines)
+        self.assertTrue('mollom_network_seconds_count{endpoint="content"} 2' in lines)
+        # phases without observations are left out
+        self.assertFalse([line for line in lines if 'decode' in line])
+
+
+class ServiceMetricsTest(ServiceTestCase):
+
+    def test_call_is_recorded(self):
+        calls = []
+        self.metrics.add_callback(calls.append)
+        Internals.service('public', 'private', 'POST', 'content', {'postBody': 'Hello'}, decode=True)
+        [call] = calls
+        self.assertEqual((call.method, call.path, call.endpoint, call.status), ('POST', 'content', 'content', 200))
+        self.assertEqual(call.bytes_sent, len(self.server.requests[0]['body']))
+        self.assertEqual(call.bytes_received, len('{}'))
+        self.assertTrue(call.network_time > 0)
+        self.assertEqual(self.metrics.requests, {('content', 'POST', 200): 1})
+
+    def test_retries_are_recorded(self):
+        answers = [(503, {}), (200, {})]
+        self.server.script = lambda request: answers.pop(0)
+        Internals.service('public', 'private', 'GET', 'site/1')
+        self.assertEqual(self.metrics.retries, {'site': 1})
+        self.assertEqual(self.metrics.received, {'site': 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the client side rate limiter
+# ---------------------------------------------------------------------
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from mollom_server import ServiceTestCase
+from PyMollom.API import Internals
+from PyMollom.API.RateLimit import RateLimiter, TokenBucket
+
+# takes a token from the bucket in another process
+TAKE = "from PyMollom.API.RateLimit import TokenBucket\nprint(TokenBucket(%r, 1, 2).try_acquire())"
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'bucket')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_new_bucket_is_full(self):
+        bucket = TokenBucket(self.path, 1, 3)
+        self.assertTrue(all(bucket.try_acquire() for _ in xrange(3)))
+        self.assertFalse(bucket.try_acquire())
+        bucket.close()
+
+    def test_tokens_are_added_at_the_rate(self):
+        bucket = TokenBucket(self.path, 50, 1)
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        time.sleep(0.03)
+        self.assertTrue(bucket.try_acquire())
+        bucket.close()
+
+    def test_tokens_are_bounded_by_the_burst(self):
+        bucket = TokenBucket(self.path, 1000, 2)
+        time.sleep(0.01)
+        self.assertTrue(bucket.available() <= 2)
+        self.assertRaises(ValueError, bucket.try_acquire, 3)
+        self.assertRaises(ValueError, bucket.acquire, 3)
+        bucket.close()
+
+    def test_acquire_waits_for_a_token(self):
+        bucket = TokenBucket(self.path, 20, 1)
+        bucket.try_acquire()
+        start = time.time()
+        self.assertTrue(bucket.acquire())
+        self.assertTrue(time.time() - start >= 0.04)
+        bucket.close()
+
+    def test_acquire_gives_up_at_the_timeout(self):
+        bucket = TokenBucket(self.path, 1, 1)
+        bucket.try_acquire()
+        start = time.time()
+        self.assertFalse(bucket.acquire(timeout=0.1))
+        # the wait for a token exceeds the timeout, so acquire does not sleep at all
+        self.assertTrue(time.time() - start < 0.05)
+        bucket.close()
+
+    def test_bucket_is_shared_between_processes(self):
+        bucket = TokenBucket(self.path, 1, 2)
+        self.assertTrue(bucket.try_acquire())
+        take = [sys.executable, '-c', TAKE % (self.path)]
+        self.assertEqual(subprocess.check_output(take).strip(), 'True')
+        self.assertEqual(subprocess.check_output(take).strip(), 'False')
+        self.assertFalse(bucket.try_acquire())
+        bucket.close()
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.limiter = RateLimiter(1, burst=2, directory=self.directory, block=False)
+
+    def tearDown(self):
+        self.limiter.close()
+        shutil.rmtree(self.directory)
+
+    def test_bucket_per_key_pair(self):
+        self.assertTrue(self.limiter.bucket('a') is self.limiter.bucket('a'))
+        self.assertFalse(self.limiter.bucket('a') is self.limiter.bucket('b'))
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_acquire_without_blocking(self):
+        self.assertTrue(self.limiter.acquire('a'))
+        self.assertTrue(self.limiter.acquire('a'))
+        self.assertFalse(self.limiter.acquire('a'))
+        self.assertTrue(self.limiter.try_acquire('b'))
+
+    def test_block_and_timeout_can_be_overridden(self):
+        self.limiter.acquire('a')
+        self.limiter.acquire('a')
+        self.assertFalse(self.limiter.acquire('a', block=True, timeout=0.1))
+
+
+class ServiceRateLimitTest(ServiceTestCase):
+
+    def setUp(self):
+        super(ServiceRateLimitTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(ServiceRateLimitTest, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def test_rate_limited_call_fails_without_a_request(self):
+        limiter = RateLimiter(1, burst=1, directory=self.directory, block=False)
+        Internals.set_rate_limiter(limiter)
+        records = []
+        self.metrics.add_callback(records.append)
+        self.assertEqual(Internals.service('public', 'private', 'GET', 'site/1', decode=True), {})
+        self.assertEqual(Internals.service('public', 'private', 'GET', 'site/1', decode=True), None)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(records[1].error, 'RateLimited')
+        limiter.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the immutable answers of the Mollom service
+# ---------------------------------------------------------------------
+
+import cPickle
+import unittest
+
+from PyMollom.API.Content import ContentResponse
+from PyMollom.API.Response import compact
+
+CONTENT = { 'id': u'content-1'
+          , 'spamScore': 0.9
+          , 'spamClassification': u'spam'
+          , 'reason': u'caf\xe9'
+          , 'languages': [{'languageCode': u'en', 'languageScore': 0.8}]
+          , 'postBody': u'echoed, and not kept'
+          }
+
+
+class CompactTest(unittest.TestCase):
+
+    def test_ascii_text_becomes_str(self):
+        self.assertEqual(type(compact(u'spam')), str)
+        self.assertEqual(compact(u'caf\xe9'), u'caf\xe9')
+
+    def test_containers_become_tuples(self):
+        self.assertEqual(compact([u'a', [1, 2]]), ('a', (1, 2)))
+        self.assertEqual(compact({u'b': 2, u'a': [1]}), (('a', (1,)), ('b', 2)))
+
+    def test_other_values_are_kept(self):
+        for value in (None, 1, 0.5, True, 'text'):
+            self.assertEqual(compact(value), value)
+
+
+class ResponseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.response = ContentResponse.fromJSON(CONTENT)
+
+    def test_fields(self):
+        self.assertEqual(self.response.id, 'content-1')
+        self.assertEqual(self.response.spam_score, 0.9)
+        self.assertEqual(self.response.languages, (('en', 0.8),))
+        self.assertEqual(self.response.quality_score, None)
+        self.assertTrue(self.response.spam())
+
+    def test_only_the_fields_are_kept(self):
+        self.assertFalse(hasattr(self.response, '__dict__'))
+        self.assertFalse('postBody' in self.response)
+
+    def test_immutable(self):
+        self.assertRaises(AttributeError, setattr, self.response, 'spam_score', 0.0)
+        self.assertRaises(AttributeError, delattr, self.response, 'spam_score')
+
+    def test_json_names_as_keys(self):
+        self.assertEqual(self.response['spamScore'], 0.9)
+        self.assertRaises(KeyError, lambda: self.response['postBody'])
+        self.assertTrue('spamScore' in self.response)
+        self.assertFalse('qualityScore' in self.response)
+        self.assertEqual(self.response.get('qualityScore', 0.5), 0.5)
+        self.assertEqual(self.response.get('spamClassification'), 'spam')
+
+    def test_to_dict(self):
+        fields = self.response.to_dict()
+        self.assertEqual(fields['languages'], [{'languageCode': 'en', 'languageScore': 0.8}])
+        self.assertFalse('qualityScore' in fields)
+        self.assertEqual(ContentResponse.fromJSON(fields), self.response)
+
+    def test_constructor(self):
+        response = ContentResponse(id='content-1', spam_classification='ham')
+        self.assertTrue(response.ham())
+        self.assertEqual(response.spam_score, None)
+
+    def test_equality_and_hash(self):
+        same = ContentResponse.fromJSON(CONTENT)
+        other = ContentResponse.fromJSON(dict(CONTENT, spamScore=0.1))
+        self.assertEqual(self.response, same)
+        self.assertEqual(hash(self.response), hash(same))
+        self.assertNotEqual(self.response, other)
+
+    def test_pickle(self):
+        for protocol in (0, cPickle.HIGHEST_PROTOCOL):
+            self.assertEqual(cPickle.loads(cPickle.dumps(self.response, protocol)), self.response)
+
+    def test_repr(self):
+        self.assertEqual(repr(ContentResponse(id='content-1', spam_score=0.5)),
+                         "ContentResponse(id='content-1', spam_score=0.5)")
+
+
+if __name__ == '__main__':
+    unittest.main()
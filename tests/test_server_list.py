@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the server list cache shared by the processes on a host
+# ---------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from PyMollom.API.ServerList import ServerListCache
+
+SERVERS = ['http://rest.mollom.com/', 'http://rest2.mollom.com/']
+
+
+class ServerListCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'servers')
+        self.fetched = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def fetch(self, servers=SERVERS, delay=0):
+        def fetch():
+            time.sleep(delay)
+            self.fetched.append(servers)
+            return servers
+        return fetch
+
+    def test_list_is_fetched_once(self):
+        cache = ServerListCache(self.path, self.fetch())
+        self.assertEqual(cache.get(), SERVERS)
+        self.assertEqual(cache.get(), SERVERS)
+        self.assertEqual(len(self.fetched), 1)
+
+    def test_list_is_shared_through_the_file(self):
+        ServerListCache(self.path, self.fetch()).get()
+        self.assertEqual(ServerListCache(self.path, self.fetch(['http://other/'])).get(), SERVERS)
+        self.assertEqual(len(self.fetched), 1)
+
+    def test_changed_file_is_read_again(self):
+        cache = ServerListCache(self.path, self.fetch())
+        cache.get()
+        ServerListCache(self.path, self.fetch()).store(['http://other/'])
+        self.assertEqual(cache.get(), ['http://other/'])
+
+    def test_timed_out_list_is_refreshed(self):
+        ServerListCache(self.path, self.fetch()).get()
+        cache = ServerListCache(self.path, self.fetch(['http://other/']), timeoutDays=0)
+        time.sleep(0.01)
+        self.assertEqual(cache.get(), ['http://other/'])
+        self.assertEqual(ServerListCache(self.path, self.fetch()).load(), ['http://other/'])
+
+    def test_failed_refresh_keeps_the_old_list(self):
+        ServerListCache(self.path, self.fetch()).get()
+        cache = ServerListCache(self.path, self.fetch(None), timeoutDays=0)
+        time.sleep(0.01)
+        self.assertEqual(cache.get(), SERVERS)
+
+    def test_failed_fetch_without_a_list(self):
+        self.assertEqual(ServerListCache(self.path, self.fetch(None)).get(), None)
+
+    def test_corrupt_file_is_refreshed(self):
+        with open(self.path, 'w') as f:
+            f.write('{"fetched": ')
+        self.assertEqual(ServerListCache(self.path, self.fetch()).get(), SERVERS)
+
+    def test_concurrent_refreshes_fetch_once(self):
+        results = []
+
+        def get():
+            results.append(ServerListCache(self.path, self.fetch(delay=0.1)).get())
+        threads = [threading.Thread(target=get) for _ in xrange(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [SERVERS] * 4)
+        self.assertEqual(len(self.fetched), 1)
+        # only the list and its lock file are left
+        self.assertEqual(sorted(os.listdir(self.directory)), ['servers', 'servers.lock'])
+
+
+if __name__ == '__main__':
+    unittest.main()
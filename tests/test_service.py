@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the deadline and circuit breaker handling of API.Internals.service
+# ---------------------------------------------------------------------
+
+import time
+import unittest
+
+from mollom_server import ServiceTestCase
+from PyMollom import DeadlineExceededError
+from PyMollom.API import Internals
+from PyMollom.API.ConnectionPool import ConnectionPool
+from PyMollom.API.Retry import CircuitBreaker, RetryPolicy
+
+
+class DeadlineTest(ServiceTestCase):
+
+    def setUp(self):
+        super(DeadlineTest, self).setUp()
+        self.records = []
+        self.metrics.add_callback(self.records.append)
+
+    def test_answer_within_the_deadline(self):
+        answer = Internals.service('public', 'private', 'GET', 'content/1', decode=True, deadline=5.0)
+        self.assertEqual(answer, {})
+
+    def test_slow_server_exceeds_the_deadline(self):
+        self.server.script = lambda request: (200, {}, 0.5)
+        start = time.time()
+        self.assertRaises(DeadlineExceededError, Internals.service, 'public', 'private', 'GET', 'content/1',
+                          deadline=0.1)
+        self.assertTrue(time.time() - start < 0.4)
+        self.assertEqual(self.records[0].error, 'DeadlineExceeded')
+
+    def test_default_deadline(self):
+        self.server.script = lambda request: (200, {}, 0.5)
+        Internals.set_default_deadline(0.1)
+        self.assertRaises(DeadlineExceededError, Internals.service, 'public', 'private', 'GET', 'content/1')
+
+    def test_back_off_past_the_deadline(self):
+        self.server.script = lambda request: (503, {})
+        policy = RetryPolicy()
+        policy.delay = lambda attempt: 5.0
+        start = time.time()
+        self.assertRaises(DeadlineExceededError, Internals.service, 'public', 'private', 'GET', 'content/1',
+                          policy=policy, deadline=1.0)
+        # the call gives up at once, rather than sleeping into the deadline
+        self.assertTrue(time.time() - start < 0.5)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.records[0].error, 'DeadlineExceeded')
+
+
+class BreakerTest(ServiceTestCase):
+
+    def setUp(self):
+        super(BreakerTest, self).setUp()
+        self.policy = RetryPolicy(backoff=0.0, max_retries=0, failure_threshold=1)
+
+    def test_slow_server_counts_against_the_breaker(self):
+        self.server.script = lambda request: (200, {}, 0.5)
+        self.assertRaises(DeadlineExceededError, Internals.service, 'public', 'private', 'GET', 'content/1',
+                          policy=self.policy, deadline=0.1)
+        self.assertEqual(self.policy.breaker('content').state, CircuitBreaker.OPEN)
+
+    def test_waiting_for_a_connection_leaves_the_breaker_alone(self):
+        pool = ConnectionPool(max_per_host=1)
+        Internals.set_connection_pool(pool)
+        (host, port) = self.server.server_address
+        (connection, _) = pool.acquire('http', host, port)
+        self.assertRaises(DeadlineExceededError, Internals.service, 'public', 'private', 'GET', 'content/1',
+                          policy=self.policy, deadline=0.1)
+        self.assertEqual(len(self.server.requests), 0)
+        self.assertEqual(self.policy.breaker('content').state, CircuitBreaker.CLOSED)
+
+        pool.release(connection, 'http', host, port)
+        answer = Internals.service('public', 'private', 'GET', 'content/1', policy=self.policy, decode=True)
+        self.assertEqual(answer, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
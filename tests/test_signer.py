@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the OAuth request signer
+# ---------------------------------------------------------------------
+
+import unittest
+
+from PyMollom.API.Signer import Signer, encode_pairs, escape
+
+URL = 'http://rest.mollom.com/v1/content'
+NONCE = '4572616e48616d6d'
+TIMESTAMP = '1318467427'
+PARAMETERS = {'postBody': 'Hello, world!', 'authorName': u'Ren\xe9', 'checks': ['spam', 'quality']}
+# computed for the same request with the oauth2 library, which the signer replaced
+SIGNATURE = 'XmeKyNZjMxuL4f++8DUtCk9Y7sk='
+
+
+class EscapeTest(unittest.TestCase):
+
+    def test_unreserved_characters_are_kept(self):
+        self.assertEqual(escape('AZaz09-._~'), 'AZaz09-._~')
+
+    def test_reserved_characters_are_encoded(self):
+        self.assertEqual(escape('a b&c=d/e+f%'), 'a%20b%26c%3Dd%2Fe%2Bf%25')
+
+    def test_unicode_is_encoded_as_utf8(self):
+        self.assertEqual(escape(u'Ren\xe9'), 'Ren%C3%A9')
+
+    def test_other_values_are_converted(self):
+        self.assertEqual(escape(12), '12')
+        self.assertEqual(escape(True), 'True')
+
+    def test_list_values_give_a_pair_each(self):
+        self.assertEqual(sorted(encode_pairs({'checks': ['spam', 'quality'], 'a b': 'c'})),
+                         [('a%20b', 'c'), ('checks', 'quality'), ('checks', 'spam')])
+
+
+class SignerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.signer = Signer('public-key', 'private key~')
+
+    def test_signature(self):
+        self.assertEqual(self.signer.signature('POST', URL, PARAMETERS, NONCE, TIMESTAMP), SIGNATURE)
+
+    def test_signature_of_encoded_pairs(self):
+        pairs = encode_pairs(PARAMETERS)
+        self.assertEqual(self.signer.signature('POST', URL, pairs, NONCE, TIMESTAMP), SIGNATURE)
+        # the pairs of the caller are left alone
+        self.assertEqual(pairs, encode_pairs(PARAMETERS))
+
+    def test_signer_can_be_reused(self):
+        self.signer.signature('GET', URL, {}, NONCE, TIMESTAMP)
+        self.assertEqual(self.signer.signature('post', URL, PARAMETERS, NONCE, TIMESTAMP), SIGNATURE)
+
+    def test_signature_depends_on_the_request(self):
+        signatures = set([ self.signer.signature('POST', URL, PARAMETERS, NONCE, TIMESTAMP)
+                         , self.signer.signature('GET', URL, PARAMETERS, NONCE, TIMESTAMP)
+                         , self.signer.signature('POST', URL + '/1', PARAMETERS, NONCE, TIMESTAMP)
+                         , self.signer.signature('POST', URL, {}, NONCE, TIMESTAMP)
+                         , self.signer.signature('POST', URL, PARAMETERS, NONCE + '0', TIMESTAMP)
+                         , self.signer.signature('POST', URL, PARAMETERS, NONCE, '1318467428')
+                         , Signer('public-key', 'other').signature('POST', URL, PARAMETERS, NONCE, TIMESTAMP)
+                         ])
+        self.assertEqual(len(signatures), 7)
+
+    def test_authorization_header(self):
+        header = self.signer.sign('POST', URL, {'postBody': 'Hello, world!'}, NONCE, TIMESTAMP)
+        self.assertEqual(header, 'OAuth realm="", oauth_consumer_key="public-key", oauth_signature_method="HMAC-SHA1", '
+                                 'oauth_version="1.0", oauth_nonce="4572616e48616d6d", oauth_timestamp="1318467427", '
+                                 'oauth_signature="q%2FJKiumLNIm%2BfmqIgwpZu%2BrxjDc%3D"')
+
+    def test_fresh_nonce_and_timestamp(self):
+        first = self.signer.sign('POST', URL, PARAMETERS)
+        second = self.signer.sign('POST', URL, PARAMETERS)
+        self.assertNotEqual(first, second)
+        self.assertTrue('oauth_timestamp="1' in first, first)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the Site API calls
+# ---------------------------------------------------------------------
+
+import time
+import unittest
+
+from mollom_server import ServiceTestCase
+from PyMollom import ConnectionError, DeadlineExceededError, MollomError, NotFound, Unauthorised
+from PyMollom.API import Internals
+from PyMollom.API.Retry import RetryPolicy
+from PyMollom.API.Site import Site
+
+SITE = {'id': 'site-1', 'publicKey': 'public', 'url': 'http://example.com', 'languages': ['en']}
+FIELDS = ('http://example.com', 'admin@example.com', ['en'], 'Drupal', '7.1', 'PyMollom', '0.1')
+
+
+class SiteTest(ServiceTestCase):
+
+    def setUp(self):
+        super(SiteTest, self).setUp()
+        self.site = Site('public', 'private')
+
+    def test_create(self):
+        self.server.script = lambda request: (200, {'site': SITE})
+        site = self.site.create(*FIELDS)
+        self.assertEqual((site.id, site.public_key, site.languages), ('site-1', 'public', ('en',)))
+        self.assertEqual(self.server.requests[0]['path'], '/v1/site')
+        self.assertTrue(self.server.requests[0]['headers']['authorization'].startswith('OAuth'))
+
+    def test_update(self):
+        self.server.script = lambda request: (200, {'site': SITE})
+        self.assertEqual(self.site.update(*FIELDS).url, 'http://example.com')
+        self.assertEqual(self.server.requests[0]['path'], '/v1/site/public')
+
+    def test_error_statuses(self):
+        self.server.script = lambda request: (401, {})
+        self.assertRaises(Unauthorised, self.site.create, *FIELDS)
+        self.server.script = lambda request: (404, {})
+        self.assertRaises(NotFound, self.site.update, *FIELDS)
+
+    def test_server_errors_are_retried(self):
+        self.server.script = lambda request: (503, {})
+        try:
+            self.site.create(*FIELDS)
+            self.fail("no error raised")
+        except MollomError as err:
+            self.assertEqual(err.code, 503)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_deadline_covers_the_whole_call(self):
+        self.server.script = lambda request: (200, {'site': SITE}, 0.5)
+        start = time.time()
+        self.assertRaises(DeadlineExceededError, self.site.create, *(FIELDS + (0.2,)))
+        self.assertTrue(time.time() - start < 0.45)
+
+    def test_calls_are_recorded(self):
+        self.server.script = lambda request: (200, {'site': SITE})
+        self.site.create(*FIELDS)
+        self.assertEqual(self.metrics.requests, {('site', 'POST', 200): 1})
+
+    def test_open_breaker(self):
+        Internals.set_retry_policy(RetryPolicy(max_retries=0, failure_threshold=1))
+        self.server.script = lambda request: (503, {})
+        self.assertRaises(MollomError, self.site.create, *FIELDS)
+        self.assertRaises(ConnectionError, self.site.create, *FIELDS)
+        self.assertEqual(len(self.server.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the verdict cache and its backends
+# ---------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from PyMollom.API.VerdictCache import FileBackend, MemoryBackend, SharedMemoryBackend, VerdictCache, verdict_key
+
+HAM = {'spamClassification': 'ham', 'spamScore': 0.0}
+SPAM = {'spamClassification': 'spam', 'spamScore': 1.0}
+
+
+class BackendTests(object):
+    """The tests every backend passes, mixed into a TestCase that creates the backend
+    in setUp with room for at least 100 entries.
+    """
+
+    def test_round_trip(self):
+        key = verdict_key({'postBody': 'hello'})
+        self.assertEqual(self.backend.get(key), None)
+        self.backend.set(key, '{"a":1}', 123.5)
+        self.assertEqual(self.backend.get(key), ('{"a":1}', 123.5))
+        self.assertEqual(len(self.backend), 1)
+
+    def test_replace(self):
+        key = verdict_key({'postBody': 'hello'})
+        self.backend.set(key, 'first', 1.0)
+        self.backend.set(key, 'second', 2.0)
+        self.assertEqual(self.backend.get(key), ('second', 2.0))
+        self.assertEqual(len(self.backend), 1)
+
+    def test_delete(self):
+        key = verdict_key({'postBody': 'hello'})
+        self.backend.set(key, 'value', 1.0)
+        self.backend.delete(key)
+        self.assertEqual(self.backend.get(key), None)
+        self.assertEqual(len(self.backend), 0)
+        self.backend.delete(key)
+
+    def test_cache(self):
+        cache = VerdictCache(self.backend, ttl={'ham': 60, 'spam': 0})
+        cache.put({'postBody': 'fine'}, HAM)
+        cache.put({'postBody': 'buy now'}, SPAM)
+        self.assertEqual(cache.get({'postBody': 'fine'}), HAM)
+        self.assertEqual(cache.get({'postBody': 'buy now'}), None)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'entries': 1})
+
+    def test_expired_verdict_is_dropped(self):
+        cache = VerdictCache(self.backend, ttl=60)
+        cache.put({'postBody': 'fine'}, HAM)
+        key = verdict_key({'postBody': 'fine'})
+        self.backend.set(key, self.backend.get(key)[0], time.time() - 1)
+        self.assertEqual(cache.get({'postBody': 'fine'}), None)
+        self.assertEqual(len(self.backend), 0)
+
+
+class VerdictKeyTest(unittest.TestCase):
+
+    def test_whitespace_is_collapsed(self):
+        self.assertEqual(verdict_key({'postBody': 'a  b\n c '}), verdict_key({'postBody': 'a b c'}))
+
+    def test_fields_are_distinguished(self):
+        self.assertNotEqual(verdict_key({'postBody': 'a'}), verdict_key({'postTitle': 'a'}))
+        self.assertNotEqual(verdict_key({'postBody': 'a', 'postTitle': 'b'}), verdict_key({'postBody': 'ab'}))
+
+    def test_utf8_and_unicode_agree(self):
+        self.assertEqual(verdict_key({'postBody': 'caf\xc3\xa9'}), verdict_key({'postBody': u'caf\xe9'}))
+
+    def test_lists_are_unordered(self):
+        self.assertEqual(verdict_key({'checks': ['spam', 'quality']}), verdict_key({'checks': ('quality', 'spam')}))
+
+
+class MemoryBackendTest(BackendTests, unittest.TestCase):
+
+    def setUp(self):
+        self.backend = MemoryBackend(max_entries=100)
+
+    def test_evicts_least_recently_used(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set('a', 'a', 1.0)
+        backend.set('b', 'b', 1.0)
+        backend.get('a')
+        backend.set('c', 'c', 1.0)
+        self.assertEqual(backend.get('b'), None)
+        self.assertEqual(backend.get('a'), ('a', 1.0))
+        self.assertEqual(len(backend), 2)
+
+
+class SharedMemoryBackendTest(BackendTests, unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'verdicts')
+        self.backend = SharedMemoryBackend(self.path, slots=256, ways=4)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shared_between_instances(self):
+        key = verdict_key({'postBody': 'hello'})
+        self.backend.set(key, 'value', 1.0)
+        self.assertEqual(SharedMemoryBackend(self.path, slots=256, ways=4).get(key), ('value', 1.0))
+
+    def test_set_holds_ways_entries(self):
+        backend = SharedMemoryBackend(self.path, slots=4, ways=4)
+        keys = [verdict_key({'postBody': str(n)}) for n in xrange(5)]
+        for key in keys:
+            backend.set(key, 'value', 1.0)
+        self.assertEqual(len(backend), 4)
+        self.assertEqual(backend.get(keys[0]), None)
+        self.assertEqual(backend.get(keys[4]), ('value', 1.0))
+
+    def test_long_verdict_is_not_cached(self):
+        key = verdict_key({'postBody': 'hello'})
+        self.backend.set(key, 'x' * 211, 1.0)
+        self.assertEqual(self.backend.get(key), None)
+
+
+class FileBackendTest(BackendTests, unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'verdicts.sqlite')
+        self.backend = FileBackend(self.path, max_entries=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_persists(self):
+        key = verdict_key({'postBody': 'hello'})
+        self.backend.set(key, 'value', 1.0)
+        self.assertEqual(FileBackend(self.path).get(key), ('value', 1.0))
+
+    def test_evicts_over_max_entries(self):
+        keys = [verdict_key({'postBody': str(n)}) for n in xrange(250)]
+        for key in keys:
+            self.backend.set(key, 'value', 1.0)
+        # the size is checked after every max_entries / 100 writes
+        self.assertEqual(len(self.backend), 100)
+        self.assertEqual(self.backend.get(keys[0]), None)
+        self.assertEqual(self.backend.get(keys[-1]), ('value', 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2008-2012 Andy Georges
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---------------------------------------------------------------------
+__author__ = "Andy Georges"
+__date__ = "$Oct 18, 2026$"
+# Unit tests of the network index of the local whitelist mirror
+# ---------------------------------------------------------------------
+
+import unittest
+
+from PyMollom.API.Whitelist import Context
+from PyMollom.API.WhitelistIndex import CIDRIndex, WhitelistIndex, parse_address
+
+
+class CIDRIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = CIDRIndex()
+        for network in ('192.168.0.0/16', '10.1.2.3', '172.16.0.0/12', '2001:db8::/32', '::1'):
+            self.assertTrue(self.index.add(network))
+
+    def test_networks(self):
+        self.assertTrue('192.168.12.34' in self.index)
+        self.assertTrue('172.31.255.255' in self.index)
+        self.assertFalse('172.32.0.0' in self.index)
+        self.assertFalse('192.169.0.1' in self.index)
+
+    def test_single_address(self):
+        self.assertTrue('10.1.2.3' in self.index)
+        self.assertFalse('10.1.2.4' in self.index)
+
+    def test_ipv6(self):
+        self.assertTrue('2001:db8:1234::1' in self.index)
+        self.assertTrue('::1' in self.index)
+        self.assertFalse('2001:db9::1' in self.index)
+        self.assertFalse('::2' in self.index)
+
+    def test_families_do_not_mix(self):
+        # ::1 and 0.0.0.1 have the same integer value
+        self.assertFalse('0.0.0.1' in self.index)
+
+    def test_whole_address_space(self):
+        index = CIDRIndex()
+        index.add('0.0.0.0/0')
+        self.assertTrue('8.8.8.8' in index)
+        self.assertFalse('2001:db8::1' in index)
+
+    def test_invalid_networks(self):
+        index = CIDRIndex()
+        self.assertFalse(index.add('not an address'))
+        self.assertFalse(index.add('10.0.0.0/33'))
+        self.assertFalse(index.add('2001:db8::/129'))
+        self.assertFalse(index.add('10.0.0.0/abc'))
+        self.assertFalse(index.add('10.0.0.0/-1'))
+        self.assertFalse(index.add('10.0.0.0/'))
+        self.assertEqual(index.prefixes, {})
+        self.assertFalse('not an address' in self.index)
+        self.assertFalse('' in self.index)
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('0.0.1.2'), (32, 258))
+        self.assertEqual(parse_address(' ::ff '), (128, 255))
+        self.assertEqual(parse_address('300.0.0.1'), None)
+
+
+class WhitelistIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = WhitelistIndex([ {'value': '192.0.2.0/24', 'context': Context.AUTHOR_IP}
+                                    , {'value': 'Alice', 'context': Context.AUTHOR_NAME}
+                                    , {'value': 'Carol@Example.com', 'context': Context.AUTHOR_MAIL}
+                                    , {'value': 'U42', 'context': Context.AUTHOR_ID}
+                                    , {'value': 'mallory', 'context': Context.AUTHOR_NAME, 'status': '0'}
+                                    ])
+
+    def test_match(self):
+        self.assertEqual(self.index.match({'authorIp': '192.0.2.7'}), Context.AUTHOR_IP)
+        self.assertEqual(self.index.match({'authorName': ' alice '}), Context.AUTHOR_NAME)
+        self.assertEqual(self.index.match({'authorMail': 'carol@example.COM'}), Context.AUTHOR_MAIL)
+        self.assertEqual(self.index.match({'authorId': 'U42'}), Context.AUTHOR_ID)
+
+    def test_author_id_is_case_sensitive(self):
+        self.assertEqual(self.index.match({'authorId': 'u42'}), None)
+
+    def test_malformed_entries_are_skipped(self):
+        index = WhitelistIndex([ {'value': '10.0.0.0/abc', 'context': Context.AUTHOR_IP}
+                               , {'value': '10.0.0.0/99', 'context': Context.AUTHOR_IP}
+                               , {'value': '192.0.2.1', 'context': Context.AUTHOR_IP}
+                               ])
+        self.assertEqual(index.match({'authorIp': '192.0.2.1'}), Context.AUTHOR_IP)
+        self.assertEqual(index.match({'authorIp': '10.0.0.1'}), None)
+
+    def test_no_match(self):
+        self.assertEqual(self.index.match({'authorIp': '198.51.100.1', 'authorName': 'Bob'}), None)
+        self.assertEqual(self.index.match({'authorName': 'Mallory'}), None)
+
+
+if __name__ == '__main__':
+    unittest.main()